@@ -1,9 +1,12 @@
 import streamlit as st
-import pandas as pd
 import time
-import base64
 import os
-from datetime import datetime
+
+# Cuma modul ringan di sini (tanpa pandas/numpy): engine, data, aset, evaluasi
+# & riwayat di-import di dalam fungsi yang memakainya, jadi landing page tidak
+# ikut membayar biayanya. Lihat cbr/mulai.py (benchmark: python -m cbr.mulai).
+from cbr.metrik import METRIK, PROFILER, tambah, ukur
+from cbr.mulai import Pemanasan
 
 # --- KONFIGURASI HALAMAN ---
 st.set_page_config(
@@ -116,114 +119,82 @@ st.markdown("""
 # (Fungsi load_css file eksternal dihapus karena sudah digabung di atas biar praktis)
 
 # --- HELPER FUNCTIONS ---
-def get_img_as_base64(kasus_type):
-    filename = "2banner_laptop.jpeg" if kasus_type == "Laptop" else "1banner_cabai.jpg"
-    img_path = os.path.join(BASE_DIR, "images", filename)
+# Banner di images/ diperkecil ke ukuran tampil (x 250 px) + WebP sekali per
+# proses, ditulis ke static/ dan dilayani Streamlit sebagai file biasa
+# (server.enableStaticServing di .streamlit/config.toml), bukan base64 inline.
+@st.cache_resource
+def get_aset():
+    # Disiapkan sekali oleh thread pemanasan (cuma banner yang dipakai domain)
+    return get_pemanasan().aset()
+
+def get_banner_html(kasus_type):
+    filename = get_registry().domain(kasus_type).banner
+    if not filename:
+        return None
     try:
-        with open(img_path, "rb") as f:
-            data = f.read()
-        return base64.b64encode(data).decode()
+        from cbr.aset import data_uri, tag_picture
+        with ukur("banner"):
+            if st.get_option("server.enableStaticServing") and filename in get_aset():
+                return tag_picture(get_aset()[filename])
+            # Static serving mati: inline versi kecilnya saja
+            return f'<img src="{data_uri(os.path.join(BASE_DIR, "images", filename))}" alt="">'
     except:
         return None
 
 # --- DATABASE MANAGEMENT ---
-@st.cache_data
-def load_data(kasus_type):
-    data_folder = os.path.join(BASE_DIR, "data")
-    try:
-        if kasus_type == "Laptop":
-            df_gejala = pd.read_csv(os.path.join(data_folder, "gejala_laptop.csv"))
-            df_solusi = pd.read_csv(os.path.join(data_folder, "solusi_laptop.csv"))
-            df_kasus = pd.read_csv(os.path.join(data_folder, "kasus_laptop.csv"))
-        else:
-            df_gejala = pd.read_csv(os.path.join(data_folder, "gejala_cabai.csv"))
-            df_solusi = pd.read_csv(os.path.join(data_folder, "solusi_cabai.csv"))
-            df_kasus = pd.read_csv(os.path.join(data_folder, "kasus_cabai.csv"))
-        
-        df_kasus.dropna(subset=['id_kasus', 'solusi_final'], inplace=True)
-        df_gejala['id_gejala'] = df_gejala['id_gejala'].astype(str)
-        df_kasus['id_kasus'] = df_kasus['id_kasus'].astype(str)
-        df_kasus['solusi_final'] = df_kasus['solusi_final'].astype(str)
-        
-        return df_gejala, df_solusi, df_kasus
-    except:
-        return None, None, None
+# Satu pemanasan per proses, dimulai dari landing page: import engine + load
+# index domain pertama + siapkan banner di thread background. Halaman
+# diagnosis menunggu di sini kalau pemanasan belum selesai.
+@st.cache_resource
+def get_pemanasan():
+    return Pemanasan(os.path.join(BASE_DIR, "data"), folder_gambar=os.path.join(BASE_DIR, "images"),
+                     folder_static=os.path.join(BASE_DIR, "static"))
+
+# Cache hasil diagnosis satu per proses (dipakai bersama semua sesi)
+@st.cache_resource
+def get_query_cache():
+    return get_pemanasan().query_cache()
+
+# Daftar domain dari data/domains.json + file CSV di folder data. Index tiap
+# domain di-load saat pertama dipilih, dibuang (LRU) kalau melebihi anggaran
+# memori. Versi katalog dicek & baris kasus baru dibaca tiap kali diambil.
+@st.cache_resource
+def get_registry():
+    return get_pemanasan().registry()
 
-def simpan_kasus_baru(pilihan_kasus, gejala_baru_ids, solusi_benar_id, df_kasus):
-    data_folder = os.path.join(BASE_DIR, "data")
-    prefix = "K" if pilihan_kasus == "Laptop" else "KC"
-    file_path = os.path.join(data_folder, f"kasus_{'laptop' if pilihan_kasus == 'Laptop' else 'cabai'}.csv")
-    
+def load_data(kasus_type):
     try:
-        last_id = df_kasus.iloc[-1]['id_kasus']
-        last_number = int(''.join(filter(str.isdigit, last_id)))
-        new_id = f"{prefix}{last_number + 1:02d}"
+        with ukur("load"):
+            return get_registry().casebase(kasus_type)
     except:
-        new_id = f"{prefix}01"
+        return None
 
-    gejala_str = ",".join(gejala_baru_ids)
-    new_row = {'id_kasus': new_id, 'gejala_terkait': gejala_str, 'solusi_final': solusi_benar_id}
-    
+def simpan_kasus_baru(pilihan_kasus, gejala_baru_ids, solusi_benar_id, cb):
     try:
-        df_lama = pd.read_csv(file_path)
-        df_baru = pd.concat([df_lama, pd.DataFrame([new_row])], ignore_index=True)
-        df_baru.to_csv(file_path, index=False)
+        prefix = get_registry().prefix(pilihan_kasus)
+        # Append satu baris + fsync, index di memori ikut ter-update
+        with ukur("simpan_kasus"):
+            new_id = cb.append_kasus(prefix, gejala_baru_ids, solusi_benar_id)
+        tambah("kasus_baru")
+        get_query_cache().invalidasi(cb)
         return new_id
     except Exception as e:
         st.error(f"Gagal simpan: {e}")
         return None
 
-# --- ENGINE CBR ---
-def hitung_similarity(user_gejala, df_kasus, df_gejala):
-    results = []
-    total_bobot_user = 0
-    for u_gejala in user_gejala:
-        bobot_data = df_gejala[df_gejala['id_gejala'] == u_gejala]['bobot'].values
-        if len(bobot_data) > 0: total_bobot_user += int(bobot_data[0])
-
-    for index, row in df_kasus.iterrows():
-        kasus_gejala_list = str(row['gejala_terkait']).split(',')
-        match_bobot = 0
-        total_bobot_kasus = 0
-        
-        for k_gejala in kasus_gejala_list:
-            bobot_data = df_gejala[df_gejala['id_gejala'] == k_gejala]['bobot'].values
-            if len(bobot_data) > 0:
-                bobot = int(bobot_data[0])
-                total_bobot_kasus += bobot
-                if k_gejala in user_gejala: match_bobot += bobot
-        
-        pembagi = (total_bobot_kasus + total_bobot_user) / 2
-        similarity = (match_bobot / pembagi) * 100 if pembagi > 0 else 0
-            
-        results.append({
-            'id_kasus': row['id_kasus'],
-            'similarity': similarity,
-            'solusi_id': row['solusi_final'],
-            'gejala_kasus': kasus_gejala_list
-        })
-    results.sort(key=lambda x: x['similarity'], reverse=True)
-    return results
-
 # --- FITUR HISTORY LOG ---
+HIST_PATH = os.path.join(BASE_DIR, "data", "riwayat_diagnosis.csv")
+
+# Satu writer per proses; tulis ke disk dilakukan thread background per batch
+@st.cache_resource
+def get_history_writer():
+    from cbr.riwayat import HistoryWriter
+    return HistoryWriter(HIST_PATH)
+
 def catat_riwayat(kasus_type, gejala_input, hasil_diagnosa, skor):
-    file_path = os.path.join(BASE_DIR, "data", "riwayat_diagnosis.csv")
-    if not os.path.exists(file_path):
-        df_init = pd.DataFrame(columns=["Tanggal", "Studi Kasus", "Gejala", "Hasil", "Akurasi"])
-        df_init.to_csv(file_path, index=False)
-    
-    new_log = {
-        "Tanggal": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-        "Studi Kasus": kasus_type,
-        "Gejala": ", ".join(gejala_input),
-        "Hasil": hasil_diagnosa,
-        "Akurasi": f"{skor:.1f}%"
-    }
-    try:
-        df_log = pd.read_csv(file_path)
-        df_log = pd.concat([df_log, pd.DataFrame([new_log])], ignore_index=True)
-        df_log.to_csv(file_path, index=False)
-    except: pass
+    from cbr.riwayat import buat_record
+    with ukur("log"):
+        get_history_writer().catat(buat_record(kasus_type, gejala_input, hasil_diagnosa, skor))
 
 # =========================================================
 # HALAMAN 1: LANDING PAGE
@@ -299,14 +270,21 @@ def show_main_app():
             
         st.title("🎛️ System Control")
         st.subheader("📊 Statistik Data")
-        pilihan_kasus = st.selectbox("Studi Kasus:", ["Laptop", "Tanaman Cabai"])
-        df_gejala, df_solusi, df_kasus = load_data(pilihan_kasus)
+        # Manifest/folder data rusak -> daftar kosong, tampil "Data Error"
+        try:
+            daftar_domain = list(get_registry().daftar())
+        except:
+            daftar_domain = []
+        pilihan_kasus = st.selectbox("Studi Kasus:", daftar_domain)
+        cb = load_data(pilihan_kasus)
         
-        if df_gejala is not None:
+        if cb is not None:
             c1, c2 = st.columns(2)
-            c1.metric("Gejala", len(df_gejala))
-            c2.metric("Kasus", len(df_kasus))
+            c1.metric("Gejala", len(cb.opsi_gejala))
+            c2.metric("Kasus", len(cb))
             st.success(f"✅ Database {pilihan_kasus} Aktif")
+            stat = get_query_cache().statistik()
+            st.caption(f"Cache diagnosis: {stat['hit']} hit / {stat['miss']} miss ({stat['hit_rate']:.0f}%)")
         else:
             st.error("❌ Data Error!")
 
@@ -323,24 +301,19 @@ def show_main_app():
             else:
                 st.warning("Menu terkunci.")
 
-    if df_gejala is not None:
+    if cb is not None:
         # Pakai container putih transparan biar konten kebaca jelas
         with st.container(border=True):
             if menu == "Diagnosis (User)":
                 # --- LOGIKA BANNER BARU (ANTI GAGAL & CSS INJECT) ---
                 
-                # 1. Coba ambil gambar lokal (base64)
-                img_base64 = get_img_as_base64(pilihan_kasus)
+                # 1. Coba ambil gambar lokal (file static hasil kompres)
+                img_tag = get_banner_html(pilihan_kasus)
                 
-                # 2. Tentukan Sumber Gambar
-                if img_base64:
-                    image_src = f"data:image/jpg;base64,{img_base64}"
-                else:
-                    # Link Online (Unsplash) sebagai cadangan
-                    if pilihan_kasus == "Laptop":
-                        image_src = "https://images.unsplash.com/photo-1597424214155-37764c8c0d52?q=80&w=2070&auto=format&fit=crop"
-                    else:
-                        image_src = "https://images.unsplash.com/photo-1591485355790-6cb16cf6196f?q=80&w=2070&auto=format&fit=crop"
+                # 2. Link Online (dari manifest domain) sebagai cadangan
+                if img_tag is None:
+                    image_src = get_registry().domain(pilihan_kasus).banner_url
+                    img_tag = f'<img src="{image_src}">' if image_src else ""
 
                 # 3. Render HTML + CSS langsung di sini
                 # Perhatikan tanda {{ dan }} di CSS itu WAJIB ada dua biar kebaca Python
@@ -355,6 +328,11 @@ def show_main_app():
                         margin-bottom: 25px;
                         box-shadow: 0 4px 10px rgba(0,0,0,0.2);
                     }}
+                    .custom-banner picture {{
+                        display: block;
+                        width: 100%;
+                        height: 100%;
+                    }}
                     .custom-banner img {{
                         width: 100%;
                         height: 100%;
@@ -390,7 +368,7 @@ def show_main_app():
                 </style>
 
                 <div class="custom-banner">
-                    <img src="{image_src}">
+                    {img_tag}
                     <div class="custom-overlay">
                         <div class="custom-text">Diagnosis: {pilihan_kasus}</div>
                         <div class="custom-subtext">AI Expert System with Active Learning</div>
@@ -399,10 +377,7 @@ def show_main_app():
                 """, unsafe_allow_html=True)
 
                 st.subheader("📝 Observasi Gejala")
-                opsi_tampilan = [f"{row['nama_gejala']} ({row['id_gejala']})" for i, row in df_gejala.iterrows()]
-                mapping_gejala = {f"{row['nama_gejala']} ({row['id_gejala']})": row['id_gejala'] for i, row in df_gejala.iterrows()}
-                
-                input_pilihan = st.multiselect("Gejala yang ditemukan:", options=opsi_tampilan)
+                input_pilihan = st.multiselect("Gejala yang ditemukan:", options=cb.opsi_gejala)
                 
                 if 'hasil' not in st.session_state: st.session_state['hasil'] = None
 
@@ -411,17 +386,15 @@ def show_main_app():
                     if not input_pilihan:
                         st.warning("⚠️ Pilih minimal satu gejala.")
                     else:
-                        user_ids = [mapping_gejala[x] for x in input_pilihan]
-                        with st.spinner('Sedang berpikir...'):
-                            time.sleep(0.5)
-                            hasil = hitung_similarity(user_ids, df_kasus, df_gejala)
+                        user_ids = [cb.mapping_gejala[x] for x in input_pilihan]
+                        with st.spinner('Sedang berpikir...'), ukur("retrieve"):
+                            hasil = get_query_cache().retrieve_top_k(user_ids, cb, k=1)
+                        tambah("diagnosa")
                         
                         if len(hasil) > 0:
                             top = hasil[0]
-                            try:
-                                sol_row = df_solusi[df_solusi['id_solusi'] == top['solusi_id']]
-                                sol_text = sol_row['nama_solusi'].values[0] if not sol_row.empty else "Solusi tidak ditemukan."
-                            except: sol_text = "Error data."
+                            with ukur("lookup"):
+                                sol_text = cb.solusi.get(top['solusi_id'], "Solusi tidak ditemukan.")
                             
                             st.session_state['hasil'] = {'top': top, 'input': input_pilihan, 'ids': user_ids, 'solusi': sol_text}
                             catat_riwayat(pilihan_kasus, input_pilihan, sol_text, top['similarity'])
@@ -447,11 +420,9 @@ def show_main_app():
 
                     st.markdown("---")
                     with st.expander("⚠️ Jawaban Salah? Ajari Saya (Active Learning)"):
-                        list_sol = [f"{r['nama_solusi']} ({r['id_solusi']})" for i, r in df_solusi.iterrows()]
-                        map_sol = {f"{r['nama_solusi']} ({r['id_solusi']})": r['id_solusi'] for i, r in df_solusi.iterrows()}
-                        sol_benar = st.selectbox("Solusi Seharusnya:", options=list_sol)
+                        sol_benar = st.selectbox("Solusi Seharusnya:", options=cb.opsi_solusi)
                         if st.button("💾 Simpan Pengetahuan Baru"):
-                            new_id = simpan_kasus_baru(pilihan_kasus, res['ids'], map_sol[sol_benar], df_kasus)
+                            new_id = simpan_kasus_baru(pilihan_kasus, res['ids'], cb.mapping_solusi[sol_benar], cb)
                             if new_id:
                                 st.success(f"Terima kasih! Pengetahuan tersimpan (ID: {new_id})")
                                 time.sleep(1.5)
@@ -460,31 +431,85 @@ def show_main_app():
             elif menu == "Evaluasi (Admin)":
                 st.header("📊 Evaluation Dashboard")
                 if is_admin:
+                    from cbr.evaluasi import evaluasi
+                    c1, c2, c3 = st.columns(3)
+                    mode = c1.radio("Mode Uji:", ["Leave-One-Out", "K-Fold"])
+                    n_fold = c2.number_input("Jumlah Fold:", min_value=2, max_value=20, value=5, disabled=mode != "K-Fold")
+                    top_k = c3.number_input("Top-K:", min_value=1, max_value=10, value=3)
                     if st.button("▶️ JALANKAN SELF-TESTING"):
-                        benar = 0
-                        total = len(df_kasus)
-                        logs = []
-                        bar = st.progress(0)
-                        for i, row in df_kasus.iterrows():
-                            test_ids = str(row['gejala_terkait']).split(',')
-                            res = hitung_similarity(test_ids, df_kasus, df_gejala)
-                            match = row['solusi_final'] == res[0]['solusi_id']
-                            if match: benar += 1
-                            logs.append({"ID": row['id_kasus'], "Real": row['solusi_final'], "Pred": res[0]['solusi_id'], "Match": "✅" if match else "❌"})
-                            time.sleep(0.01)
-                            bar.progress((i+1)/total)
-                        st.metric("Akurasi Model", f"{(benar/total)*100:.1f}%" if total > 0 else "0%")
-                        st.dataframe(pd.DataFrame(logs))
+                        with st.spinner("Menghitung matriks similarity..."):
+                            hasil_eval = evaluasi(cb, mode="kfold" if mode == "K-Fold" else "loo", n_fold=int(n_fold), k=int(top_k))
+                        if hasil_eval is None:
+                            st.metric("Akurasi Model", "0%")
+                        else:
+                            c1, c2 = st.columns(2)
+                            c1.metric("Akurasi Model", f"{hasil_eval['akurasi']:.1f}%")
+                            c2.metric(f"Top-{hasil_eval['top_k']} Hit Rate", f"{hasil_eval['top_k_hit']:.1f}%")
+                            st.subheader("Confusion Matrix (per Solusi)")
+                            st.dataframe(hasil_eval['confusion'])
+                            st.dataframe(hasil_eval['logs'])
+
+                    # --- INSTRUMENTASI (OPT-IN) ---
+                    with st.expander("🔬 Instrumentasi & Profiling"):
+                        METRIK.aktif = st.toggle("Aktifkan timer per tahap", value=METRIK.aktif)
+                        st.code(METRIK.prometheus(), language="text")
+                        c1, c2 = st.columns(2)
+                        if c1.button("Reset Metrik"):
+                            METRIK.reset()
+                            st.rerun()
+                        if not PROFILER.jalan:
+                            if c2.button("▶️ Mulai Profiler Sampling"):
+                                PROFILER.mulai()
+                                st.rerun()
+                        elif c2.button("⏹️ Hentikan Profiler"):
+                            PROFILER.hentikan()
+                            st.rerun()
+                        if PROFILER.sampel:
+                            st.caption(f"{PROFILER.sampel} sampel (format collapsed, buka di speedscope / flamegraph.pl)")
+                            st.download_button("Unduh Stack", PROFILER.collapsed(), file_name="cbr-profil.txt")
                 else: st.error("Akses Ditolak.")
 
             elif menu == "Riwayat (Admin)":
                 st.header("📜 Riwayat Diagnosis")
                 if is_admin:
-                    hist_path = os.path.join(BASE_DIR, "data", "riwayat_diagnosis.csv")
-                    if os.path.exists(hist_path):
-                        st.dataframe(pd.read_csv(hist_path), use_container_width=True)
+                    from cbr.analitik import BATAS_RENDAH, hapus_analitik, perbarui, ringkasan
+                    from cbr.riwayat import baca_halaman, daftar_segmen, hapus_riwayat
+                    writer = get_history_writer()
+                    try:
+                        writer.flush()
+                    except:
+                        pass
+                    if writer.galat_terakhir:
+                        st.warning(f"Penulisan riwayat gagal ({writer.gagal}x, dicoba ulang otomatis): {writer.galat_terakhir}")
+                    if daftar_segmen(HIST_PATH):
+                        # Agregat di-update inkremental (cuma baris baru), tampilan dari agregat saja
+                        info = ringkasan(perbarui(HIST_PATH))
+                        c1, c2, c3 = st.columns(3)
+                        c1.metric("Total Diagnosis", info['total'])
+                        c2.metric(f"Skor < {BATAS_RENDAH:.0f}%", f"{info['rasio_rendah']:.1f}%")
+                        c3.metric("Studi Kasus", len(info['per_domain']))
+                        st.subheader("Diagnosis per Hari")
+                        st.bar_chart(info['per_hari'])
+                        c1, c2 = st.columns(2)
+                        with c1:
+                            st.subheader("Distribusi Skor")
+                            st.bar_chart(info['histogram'])
+                        with c2:
+                            st.subheader("Ringkasan per Studi Kasus")
+                            st.dataframe(info['per_domain'], hide_index=True)
+                        st.subheader("Kombinasi Gejala Terbanyak")
+                        st.dataframe(info['kombinasi'], hide_index=True, use_container_width=True)
+                        with st.expander(f"Diagnosis skor rendah (< {BATAS_RENDAH:.0f}%) terbaru"):
+                            st.dataframe(info['rendah_terbaru'], hide_index=True, use_container_width=True)
+
+                        st.subheader("Log Lengkap")
+                        halaman = st.number_input("Halaman (terbaru dulu):", min_value=1, value=1, step=1)
+                        df_hist, ada_lagi = baca_halaman(HIST_PATH, int(halaman))
+                        st.dataframe(df_hist, use_container_width=True)
+                        if ada_lagi: st.caption("Masih ada riwayat lebih lama di halaman berikutnya.")
                         if st.button("Hapus Riwayat"):
-                            os.remove(hist_path)
+                            hapus_riwayat(HIST_PATH)
+                            hapus_analitik(HIST_PATH)
                             st.success("Riwayat dihapus.")
                             st.rerun()
                     else: st.info("Belum ada riwayat.")
@@ -498,7 +523,11 @@ def show_main_app():
 if 'page' not in st.session_state:
     st.session_state['page'] = 'landing'
 
-if st.session_state['page'] == 'landing':
-    show_landing_page()
-else:
-    show_main_app()
\ No newline at end of file
+# Pemanasan jalan di background sejak run pertama (landing page ikut render)
+get_pemanasan()
+
+with ukur("render"):
+    if st.session_state['page'] == 'landing':
+        show_landing_page()
+    else:
+        show_main_app()
\ No newline at end of file
@@ -0,0 +1,284 @@
+import csv
+import gzip
+import hashlib
+import io
+import json
+import os
+import shutil
+import tempfile
+import threading
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+
+from cbr.riwayat import KOLOM, daftar_segmen
+
+try:
+    import fcntl
+except ImportError:  # Windows: cukup lock antar thread
+    fcntl = None
+
+# Kolom "Gejala" = "Nama gejala (G07), Nama lain (G06)"; id = isi kurung terakhir tiap item
+POLA_ID = r"\(([^()]+)\)(?=,\s|$)"
+BATAS_RENDAH = 50.0
+BIN_SKOR = list(range(0, 101, 10))
+MAKS_KOMBINASI = 20000
+KEPALA = 4096
+UKURAN_CHUNK = 50000
+# Diagnosis skor rendah terbaru yang disimpan di agregat (untuk tampilan)
+MAKS_RENDAH = 100
+# Naikkan kalau isi agregat berubah: agregat lama dihitung ulang dari awal
+VERSI_AGREGAT = 3
+
+_lock = threading.Lock()
+
+
+# --- LOKASI FILE TURUNAN ---
+# riwayat_diagnosis.analitik.json  -> agregat + posisi baca tiap sumber
+# Halaman Riwayat cuma membaca agregat ini (plus baca_halaman untuk log
+# mentah), jadi tidak ada salinan kolom riwayat yang ikut ditulis.
+def _path_agregat(path):
+    return os.path.splitext(path)[0] + ".analitik.json"
+
+
+def _dir_kolom(path):
+    # Sidecar parquet versi lama (agregat versi 2); dihapus saat reset
+    return os.path.splitext(path)[0] + ".kolom"
+
+
+def _agregat_kosong():
+    return {
+        "versi": VERSI_AGREGAT,
+        "segmen": [],
+        "aktif": None,
+        "total": 0,
+        "per_hari": {},
+        "per_domain": {},
+        "histogram": {},
+        "kombinasi": {},
+        "rendah_terbaru": [],
+    }
+
+
+def _hash_kepala(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+# --- PARSE + AGREGASI SATU CHUNK (VECTORIZED) ---
+def _rapikan(df):
+    skor = pd.to_numeric(df["Akurasi"].astype(str).str.rstrip("%"), errors="coerce")
+    kombinasi = df["Gejala"].fillna("").astype(str).str.findall(POLA_ID).map(lambda ids: ",".join(sorted(set(ids))))
+    return pd.DataFrame({
+        "tanggal": pd.to_datetime(df["Tanggal"], errors="coerce"),
+        "domain": df["Studi Kasus"].fillna("-").astype(str),
+        "kombinasi": kombinasi,
+        "hasil": df["Hasil"].fillna("").astype(str),
+        "skor": skor.astype("float32"),
+    })
+
+
+def _tambah(agregat, rapi):
+    agregat["total"] += len(rapi)
+    hari = rapi["tanggal"].dt.strftime("%Y-%m-%d").fillna("-")
+    for (domain, tgl), n in rapi.groupby([rapi["domain"], hari]).size().items():
+        kunci = f"{domain}|{tgl}"
+        agregat["per_hari"][kunci] = agregat["per_hari"].get(kunci, 0) + int(n)
+
+    skor = rapi["skor"].to_numpy(dtype=np.float64)
+    ada = ~np.isnan(skor)
+    # Bin 10 poin; skor 100 masuk bin terakhir (90-100)
+    bin_ = np.minimum(np.floor(np.where(ada, skor, 0) / 10), len(BIN_SKOR) - 2).astype(int)
+    for domain, idx in rapi.groupby("domain").indices.items():
+        d = agregat["per_domain"].setdefault(domain, {"n": 0, "n_skor": 0, "jumlah_skor": 0.0, "rendah": 0})
+        ada_d = ada[idx]
+        d["n"] += len(idx)
+        d["n_skor"] += int(ada_d.sum())
+        d["jumlah_skor"] += float(skor[idx][ada_d].sum())
+        d["rendah"] += int((skor[idx][ada_d] < BATAS_RENDAH).sum())
+        h = agregat["histogram"].setdefault(domain, [0] * (len(BIN_SKOR) - 1))
+        for b, n in zip(*np.unique(bin_[idx][ada_d], return_counts=True)):
+            h[b] += int(n)
+
+    kombinasi = agregat["kombinasi"]
+    for (domain, komb), n in rapi.groupby(["domain", "kombinasi"]).size().items():
+        kunci = f"{domain}|{komb}"
+        kombinasi[kunci] = kombinasi.get(kunci, 0) + int(n)
+    if len(kombinasi) > MAKS_KOMBINASI:
+        # Batasi ukuran: kombinasi yang jarang dibuang (hitungannya jadi
+        # perkiraan bawah kalau kombinasi itu muncul lagi nanti)
+        agregat["kombinasi"] = dict(Counter(kombinasi).most_common(MAKS_KOMBINASI // 2))
+
+    # Ring diagnosis skor rendah terbaru (data diproses urut waktu tulis)
+    rendah = rapi[rapi["skor"] < BATAS_RENDAH].tail(MAKS_RENDAH)
+    if len(rendah):
+        baru = [[t, d, k, h, round(float(s), 1)] for t, d, k, h, s in zip(
+            rendah["tanggal"].dt.strftime("%Y-%m-%d %H:%M:%S").fillna("-"), rendah["domain"],
+            rendah["kombinasi"], rendah["hasil"], rendah["skor"])]
+        agregat["rendah_terbaru"] = (agregat["rendah_terbaru"] + baru)[-MAKS_RENDAH:]
+
+
+def _proses_stream(agregat, f, lewati):
+    # f: stream byte, posisi sudah di awal data yang belum diproses
+    opsi = {"names": KOLOM, "header": None, "skiprows": 1 if lewati == 0 else 0, "chunksize": UKURAN_CHUNK}
+    try:
+        for df in pd.read_csv(f, **opsi):
+            _tambah(agregat, _rapikan(df))
+    except pd.errors.EmptyDataError:
+        pass
+
+
+# --- UPDATE INKREMENTAL ---
+def _bungkus_lock(path):
+    # Satu proses yang update dalam satu waktu (beberapa sesi/worker Streamlit)
+    if fcntl is None:
+        return None
+    f = open(_path_agregat(path) + ".lock", "a")
+    fcntl.flock(f, fcntl.LOCK_EX)
+    return f
+
+
+def muat_agregat(path):
+    try:
+        with open(_path_agregat(path), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return _agregat_kosong()
+
+
+def _simpan_agregat(path, agregat):
+    target = _path_agregat(path)
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(target) or ".", suffix=".tmp")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump(agregat, f, ensure_ascii=False)
+    os.replace(tmp, target)
+
+
+def perbarui(path):
+    # Baca cuma data yang belum pernah diproses: segmen .gz baru (dari yang
+    # paling lama) lalu ekor file aktif mulai offset terakhir. Segmen hasil
+    # rotasi file aktif dikenali dari hash kepalanya, jadi bagian yang sudah
+    # dihitung dilewati. Kalau ada sumber yang hilang/ditulis ulang, semua
+    # dihitung ulang dari awal.
+    with _lock:
+        kunci = _bungkus_lock(path)
+        try:
+            agregat = _perbarui(path, muat_agregat(path))
+            if agregat is None:
+                agregat = _perbarui(path, _reset(path))
+            _simpan_agregat(path, agregat)
+            return agregat
+        finally:
+            if kunci is not None:
+                kunci.close()
+
+
+def _perbarui(path, agregat):
+    if agregat.get("versi") != VERSI_AGREGAT:
+        return None
+    sumber = daftar_segmen(path)
+    gz = sorted(s for s in sumber if s != path)
+    if not set(agregat["segmen"]) <= {os.path.basename(s) for s in gz}:
+        return None
+
+    for seg in gz:
+        if os.path.basename(seg) in agregat["segmen"]:
+            continue
+        lewati = 0
+        with gzip.open(seg, "rb") as f:
+            info = agregat["aktif"]
+            if info is not None and _hash_kepala(f.read(info["panjang_kepala"])) == info["kepala"]:
+                lewati = info["offset"]
+                agregat["aktif"] = None
+            f.seek(lewati)
+            _proses_stream(agregat, f, lewati)
+        agregat["segmen"].append(os.path.basename(seg))
+
+    info = agregat["aktif"]
+    if path not in sumber:
+        # File aktif hilang tanpa jadi segmen (dihapus manual)
+        return None if info is not None and info["offset"] else agregat
+    with open(path, "rb") as f:
+        if info is not None and _hash_kepala(f.read(info["panjang_kepala"])) != info["kepala"]:
+            # File aktif diganti/dipotong tanpa lewat rotasi
+            return None
+        info = info or {"kepala": _hash_kepala(b""), "panjang_kepala": 0, "offset": 0}
+        ukuran = os.path.getsize(path)
+        if ukuran < info["offset"]:
+            return None
+        f.seek(info["offset"])
+        potongan = f.read(ukuran - info["offset"])
+        # Baris terakhir tanpa newline cuma dipakai kalau sudah utuh (file
+        # bawaan repo tidak diakhiri newline); sisanya tunggu update berikutnya
+        akhir = potongan.rfind(b"\n") + 1
+        if akhir < len(potongan) and _baris_utuh(potongan[akhir:]):
+            akhir = len(potongan)
+        if akhir:
+            _proses_stream(agregat, io.BytesIO(potongan[:akhir]), info["offset"])
+            info["offset"] += akhir
+        # Bagian sebelum offset tidak berubah lagi (append-only) -> aman di-hash
+        f.seek(0)
+        data_kepala = f.read(min(KEPALA, info["offset"]))
+        info["kepala"], info["panjang_kepala"] = _hash_kepala(data_kepala), len(data_kepala)
+    agregat["aktif"] = info
+    return agregat
+
+
+def _baris_utuh(data):
+    try:
+        baris = next(csv.reader([data.decode("utf-8")]))
+    except (UnicodeDecodeError, StopIteration, csv.Error):
+        return False
+    return len(baris) == len(KOLOM) and baris[-1].endswith("%")
+
+
+def _reset(path):
+    shutil.rmtree(_dir_kolom(path), ignore_errors=True)
+    return _agregat_kosong()
+
+
+def hapus_analitik(path):
+    shutil.rmtree(_dir_kolom(path), ignore_errors=True)
+    for p in (_path_agregat(path), _path_agregat(path) + ".lock"):
+        if os.path.exists(p):
+            os.remove(p)
+
+
+# --- BACA (UNTUK HALAMAN RIWAYAT) ---
+def ringkasan(agregat, top=10):
+    # Semua dari agregat: biayanya tidak ikut jumlah baris riwayat
+    per_hari = pd.DataFrame(
+        [(*k.split("|", 1), n) for k, n in agregat["per_hari"].items()], columns=["domain", "tanggal", "jumlah"])
+    per_hari = per_hari.pivot_table(index="tanggal", columns="domain", values="jumlah", aggfunc="sum", fill_value=0)
+
+    label_bin = [f"{a}-{b}" for a, b in zip(BIN_SKOR[:-1], BIN_SKOR[1:])]
+    histogram = pd.DataFrame(agregat["histogram"], index=label_bin)
+
+    per_domain = pd.DataFrame([{
+        "Studi Kasus": domain,
+        "Diagnosis": d["n"],
+        "Rata-rata Skor": round(d["jumlah_skor"] / d["n_skor"], 1) if d["n_skor"] else None,
+        f"Skor < {BATAS_RENDAH:.0f}%": d["rendah"],
+        "Rasio Rendah (%)": round(d["rendah"] / d["n_skor"] * 100, 1) if d["n_skor"] else None,
+    } for domain, d in agregat["per_domain"].items()])
+
+    kombinasi = pd.DataFrame(
+        [(*k.split("|", 1), n) for k, n in Counter(agregat["kombinasi"]).most_common(top)],
+        columns=["Studi Kasus", "Kombinasi Gejala", "Jumlah"])
+
+    # Terbaru dulu; maksimal MAKS_RENDAH baris
+    rendah_terbaru = pd.DataFrame(agregat["rendah_terbaru"][::-1],
+                                  columns=["tanggal", "domain", "kombinasi", "hasil", "skor"])
+
+    rendah = sum(d["rendah"] for d in agregat["per_domain"].values())
+    n_skor = sum(d["n_skor"] for d in agregat["per_domain"].values())
+    return {
+        "total": agregat["total"],
+        "rasio_rendah": rendah / n_skor * 100 if n_skor else 0.0,
+        "per_hari": per_hari,
+        "histogram": histogram,
+        "per_domain": per_domain,
+        "kombinasi": kombinasi,
+        "rendah_terbaru": rendah_terbaru,
+    }
+
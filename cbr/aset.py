@@ -0,0 +1,114 @@
+import base64
+import functools
+import glob
+import hashlib
+import io
+import os
+import tempfile
+
+from PIL import Image, features
+
+# --- ASET GAMBAR (BANNER) ---
+# Banner tampil di kotak lebar penuh x 250 px (object-fit: cover). Gambar asli
+# diperkecil & di-crop tengah ke kotak itu, lalu dikompres ulang ke WebP (kalau
+# Pillow mendukung) + JPEG progresif sebagai cadangan. Hasil disimpan di folder
+# static Streamlit dengan hash isi di nama file, jadi browser boleh cache lama
+# dan URL otomatis berubah kalau gambar sumber diganti.
+TINGGI_BANNER = 250
+LEBAR_BANNER = 1200
+KUALITAS = 80
+EKSTENSI = (".jpg", ".jpeg", ".png", ".webp")
+_NAMA_EKSTENSI = {"webp": ".webp", "jpeg": ".jpg"}
+_MIME = {"webp": "image/webp", "jpeg": "image/jpeg"}
+
+
+@functools.lru_cache(maxsize=64)
+def _kompres(path, mtime_ns, ukuran, tinggi, lebar, kualitas):
+    # mtime_ns & ukuran cuma bagian kunci memo (file diganti -> proses ulang)
+    with Image.open(path) as img:
+        img = img.convert("RGB")
+        w, h = img.size
+        skala = min(1.0, max(lebar / w, tinggi / h))
+        if skala < 1:
+            img = img.resize((max(1, round(w * skala)), max(1, round(h * skala))), Image.LANCZOS)
+        w, h = img.size
+        kw, kh = min(w, lebar), min(h, tinggi)
+        kiri, atas = (w - kw) // 2, (h - kh) // 2
+        img = img.crop((kiri, atas, kiri + kw, atas + kh))
+
+        hasil = {}
+        if features.check("webp"):
+            buf = io.BytesIO()
+            img.save(buf, "WEBP", quality=kualitas, method=4)
+            hasil["webp"] = buf.getvalue()
+        buf = io.BytesIO()
+        img.save(buf, "JPEG", quality=kualitas, optimize=True, progressive=True)
+        hasil["jpeg"] = buf.getvalue()
+    return hasil
+
+
+def kompres_banner(path, tinggi=TINGGI_BANNER, lebar=LEBAR_BANNER, kualitas=KUALITAS):
+    st = os.stat(path)
+    return _kompres(os.path.abspath(path), st.st_mtime_ns, st.st_size, tinggi, lebar, kualitas)
+
+
+def _tulis_atomik(path, data):
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    with os.fdopen(fd, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+def siapkan(path, folder_static, **opsi):
+    # Tulis versi kecil ke folder static (kalau belum ada), hapus versi lama
+    # gambar yang sama. Hasil: {"webp": nama_file, "jpeg": nama_file}
+    os.makedirs(folder_static, exist_ok=True)
+    stem = os.path.splitext(os.path.basename(path))[0]
+    nama = {}
+    for fmt, data in kompres_banner(path, **opsi).items():
+        ext = _NAMA_EKSTENSI[fmt]
+        file = f"{stem}.{hashlib.sha256(data).hexdigest()[:12]}{ext}"
+        target = os.path.join(folder_static, file)
+        if not os.path.exists(target):
+            _tulis_atomik(target, data)
+        for lama in glob.glob(os.path.join(glob.escape(folder_static), f"{glob.escape(stem)}.*{ext}")):
+            if lama != target:
+                os.remove(lama)
+        nama[fmt] = file
+    return nama
+
+
+def siapkan_folder(folder_gambar, folder_static, nama=None, **opsi):
+    # `nama`: cuma file ini yang diproses (mis. banner yang dipakai domain);
+    # None = semua gambar di folder
+    aset = {}
+    for path in sorted(glob.glob(os.path.join(glob.escape(folder_gambar), "*"))):
+        if nama is not None and os.path.basename(path) not in nama:
+            continue
+        if path.lower().endswith(EKSTENSI):
+            try:
+                aset[os.path.basename(path)] = siapkan(path, folder_static, **opsi)
+            except OSError:
+                # Gambar rusak/tidak terbaca: dilewati, UI pakai cadangan online
+                continue
+    return aset
+
+
+@functools.lru_cache(maxsize=64)
+def _data_uri(path, mtime_ns, ukuran):
+    hasil = kompres_banner(path)
+    fmt = "webp" if "webp" in hasil else "jpeg"
+    return f"data:{_MIME[fmt]};base64,{base64.b64encode(hasil[fmt]).decode()}"
+
+
+def data_uri(path):
+    # Cadangan kalau static serving Streamlit tidak aktif: tetap versi kecil
+    st = os.stat(path)
+    return _data_uri(os.path.abspath(path), st.st_mtime_ns, st.st_size)
+
+
+def tag_picture(nama, url_dasar="app/static"):
+    img = f'<img src="{url_dasar}/{nama["jpeg"]}" alt="">'
+    if "webp" in nama:
+        return f'<picture><source srcset="{url_dasar}/{nama["webp"]}" type="image/webp">{img}</picture>'
+    return img
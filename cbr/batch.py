@@ -0,0 +1,183 @@
+import argparse
+import csv
+import itertools
+import json
+import os
+import sys
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from cbr.domain import data_paths
+from cbr.engine import top_k_baris
+from cbr.evaluasi import _Indeks, _match_query, _top_k_argmax
+from cbr.kompilasi import load_casebase
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data")
+# Batas elemen buffer skor per sub-blok query (float64, ~64 MB)
+MAKS_ELEMEN_BLOK = 8_000_000
+# k kecil: k kali argmax (seri -> posisi pertama) lebih murah dari top_k_baris
+MAKS_K_ARGMAX = 8
+
+
+# --- SKOR SATU CHUNK QUERY x SEMUA KASUS ---
+# Match lewat posting list gejala (CSC) + matmul kecil untuk gejala populer,
+# sama seperti evaluasi: biaya ~ panjang posting, bukan query x kasus x
+# katalog. Index CSC dibangun sekali per batch (lihat diagnosa_batch) lalu
+# dipakai semua chunk. Query diproses per sub-blok supaya buffer skor
+# (sub-blok x kasus) tidak lebih dari maks_elemen_blok elemen.
+def skor_chunk(daftar_gejala, snap, k=1, idx=None, maks_elemen_blok=MAKS_ELEMEN_BLOK):
+    b = len(daftar_gejala)
+    n = snap.n
+    if n == 0 or k <= 0:
+        return np.empty((b, 0), dtype=np.float64), np.empty((b, 0), dtype=np.int64)
+    if idx is None:
+        idx = _Indeks(snap)
+
+    # Seperti engine._query: keanggotaan untuk match, tapi gejala dobel di
+    # input tetap dihitung dobel di total bobot user
+    total_user = np.zeros(b, dtype=np.float64)
+    pasangan = set()
+    for q, ids in enumerate(daftar_gejala):
+        for g in ids:
+            pos = snap.gejala_pos.get(g)
+            if pos is not None:
+                total_user[q] += snap.bobot[pos]
+                pasangan.add((q, pos))
+    pasangan = np.array(sorted(pasangan), dtype=np.int64).reshape(-1, 2)
+
+    k = min(k, n)
+    top_skor = np.empty((b, k), dtype=np.float64)
+    top_row = np.empty((b, k), dtype=np.int64)
+    langkah = max(1, maks_elemen_blok // n)
+    batas = np.searchsorted(pasangan[:, 0], np.arange(0, b + langkah, langkah))
+    for blok, q0 in enumerate(range(0, b, langkah)):
+        q1 = min(q0 + langkah, b)
+        p = pasangan[batas[blok]:batas[blok + 1]]
+        sim = _match_query(snap, idx, p[:, 0] - q0, p[:, 1], q1 - q0)
+
+        # Urutan operasi sama dengan engine._dice supaya skornya identik
+        pembagi = np.add(snap.total_bobot_kasus[None, :], total_user[q0:q1, None])
+        pembagi /= 2
+        if snap.total_bobot_kasus.min() + total_user[q0:q1].min() > 0:
+            np.divide(sim, pembagi, out=sim)
+        else:
+            np.divide(sim, pembagi, out=sim, where=pembagi > 0)
+            sim[pembagi <= 0] = 0
+        sim *= 100
+
+        if k <= MAKS_K_ARGMAX:
+            pos, skor = _top_k_argmax(sim, k)
+        else:
+            pos = top_k_baris(sim, k)
+            skor = np.take_along_axis(sim, pos, axis=1)
+        top_skor[q0:q1] = skor
+        top_row[q0:q1] = pos
+    return top_skor, top_row
+
+
+def _hasil_chunk(chunk, snap, k, idx=None):
+    top_skor, top_row = skor_chunk([ids for _, ids in chunk], snap, k, idx)
+    return _format_hasil(chunk, snap, top_skor, top_row)
+
+
+def _format_hasil(chunk, snap, top_skor, top_row):
+    hasil = []
+    for (qid, ids), skor, rows in zip(chunk, top_skor, top_row):
+        hasil.append({
+            "id": qid,
+            "gejala": ids,
+            "hasil": [{
+                "id_kasus": snap.id_kasus[r],
+                "solusi_id": snap.solusi_id[r],
+                "solusi": str(snap.solusi.get(snap.solusi_id[r], "Solusi tidak ditemukan.")),
+                "similarity": float(s)
+            } for s, r in zip(skor, rows)]
+        })
+    return hasil
+
+
+# --- API BATCH ---
+def diagnosa_batch(queries, cb, k=1, chunk=1024, workers=None):
+    # queries: iterable (id, [id_gejala, ...]). Hasil di-yield berurutan
+    # sesuai input, chunk diproses paralel di thread pool (numpy lepas GIL).
+    snap = cb.snapshot()
+    idx = _Indeks(snap) if snap.n else None
+    workers = workers or os.cpu_count() or 1
+    it = iter(queries)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        antre = deque()
+        while True:
+            while len(antre) < workers * 2:
+                potong = list(itertools.islice(it, chunk))
+                if not potong:
+                    break
+                antre.append(pool.submit(_hasil_chunk, potong, snap, k, idx))
+            if not antre:
+                break
+            yield from antre.popleft().result()
+
+
+# --- INPUT CSV / JSONL ---
+def baca_input(path):
+    # JSONL: tiap baris list id gejala, atau {"id": ..., "gejala": [...]}
+    # CSV: kolom gejala / gejala_terkait (dipisah koma), kolom id opsional
+    f = sys.stdin if path == "-" else open(path, newline="", encoding="utf-8")
+    try:
+        if path == "-" or path.endswith((".jsonl", ".json", ".ndjson")):
+            for i, baris in enumerate(f, 1):
+                baris = baris.strip()
+                if not baris:
+                    continue
+                obj = json.loads(baris)
+                if isinstance(obj, dict):
+                    yield obj.get("id", i), list(obj.get("gejala", obj.get("gejala_terkait", [])))
+                else:
+                    yield i, list(obj)
+        else:
+            reader = csv.DictReader(f)
+            kolom = next((c for c in ("gejala", "gejala_terkait") if c in reader.fieldnames), reader.fieldnames[0])
+            kolom_id = next((c for c in ("id", "id_query", "id_kasus") if c in reader.fieldnames), None)
+            for i, row in enumerate(reader, 1):
+                ids = [g.strip() for g in (row[kolom] or "").split(",") if g.strip()]
+                yield (row[kolom_id] if kolom_id else i), ids
+    finally:
+        if f is not sys.stdin:
+            f.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Diagnosis batch CBR dari file CSV/JSONL")
+    parser.add_argument("input", help="file .csv / .jsonl berisi daftar id gejala, '-' untuk stdin (JSONL)")
+    parser.add_argument("-o", "--output", default="-", help="file JSONL hasil (default stdout)")
+    parser.add_argument("-k", type=int, default=1, help="jumlah solusi teratas per query")
+    parser.add_argument("--domain", help="nama domain (lihat data/domains.json; default: domain pertama)")
+    parser.add_argument("--data-dir", default=DATA_DIR)
+    parser.add_argument("--chunk", type=int, default=1024)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--shard", type=int, default=None,
+                        help="pecah case base ke N proses (shared memory); untuk case base sangat besar")
+    args = parser.parse_args(argv)
+
+    cb = load_casebase(*data_paths(args.data_dir, args.domain))
+    out = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+    pool = None
+    try:
+        if args.shard:
+            from cbr.paralel import PoolShard
+            pool = PoolShard(cb, args.shard)
+            hasil_batch = pool.diagnosa_batch(baca_input(args.input), args.k, args.chunk)
+        else:
+            hasil_batch = diagnosa_batch(baca_input(args.input), cb, args.k, args.chunk, args.workers)
+        for hasil in hasil_batch:
+            out.write(json.dumps(hasil, ensure_ascii=False) + "\n")
+    finally:
+        if pool is not None:
+            pool.tutup()
+        if out is not sys.stdout:
+            out.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,224 @@
+import argparse
+import csv
+import json
+import os
+import platform
+import resource
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+import numpy as np
+
+from cbr.batch import diagnosa_batch
+from cbr.cache import QueryCache
+from cbr.casebase import CaseBase
+from cbr.engine import hitung_similarity, retrieve_top_k
+from cbr.kompilasi import kompilasi, load_casebase
+from cbr.riwayat import HistoryWriter, buat_record
+
+
+# --- GENERATOR DATA SINTETIS (SKEMA CSV SAMA DENGAN data/) ---
+def peluang_gejala(n_gejala, skew):
+    # Zipf: gejala ke-i muncul ~ 1 / i^skew (skew 0 = seragam)
+    p = 1 / np.arange(1, n_gejala + 1) ** skew
+    return p / p.sum()
+
+
+def buat_data_sintetis(folder, n_gejala=300, n_kasus=20000, n_solusi=50, skew=1.1, maks_gejala=5, seed=0):
+    rng = np.random.default_rng(seed)
+    ids = [f"G{i + 1:04d}" for i in range(n_gejala)]
+    p = peluang_gejala(n_gejala, skew)
+    paths = tuple(os.path.join(folder, f"{nama}_sintetis.csv") for nama in ("gejala", "solusi", "kasus"))
+
+    with open(paths[0], "w", newline="", encoding="utf-8") as f:
+        w = csv.writer(f, lineterminator="\n")
+        w.writerow(["id_gejala", "nama_gejala", "bobot"])
+        for i, b in zip(ids, rng.integers(1, 6, n_gejala)):
+            w.writerow([i, f"Gejala sintetis {i}", int(b)])
+    with open(paths[1], "w", newline="", encoding="utf-8") as f:
+        w = csv.writer(f, lineterminator="\n")
+        w.writerow(["id_solusi", "nama_solusi"])
+        for s in range(n_solusi):
+            w.writerow([f"S{s + 1:03d}", f"Solusi sintetis {s + 1}"])
+    with open(paths[2], "w", newline="", encoding="utf-8") as f:
+        w = csv.writer(f, lineterminator="\n")
+        w.writerow(["id_kasus", "gejala_terkait", "solusi_final"])
+        for k in range(n_kasus):
+            gejala = rng.choice(n_gejala, rng.integers(1, maks_gejala + 1), replace=False, p=p)
+            w.writerow([f"K{k + 1:02d}", ",".join(ids[g] for g in gejala), f"S{rng.integers(1, n_solusi + 1):03d}"])
+    return paths
+
+
+def buat_query(cb, n, skew, maks_gejala=5, seed=1):
+    rng = np.random.default_rng(seed)
+    p = peluang_gejala(len(cb.gejala_ids), skew)
+    return [[cb.gejala_ids[g] for g in rng.choice(len(p), rng.integers(1, maks_gejala + 1), replace=False, p=p)]
+            for _ in range(n)]
+
+
+# --- PENGUKURAN ---
+def _ringkas(durasi):
+    d = np.asarray(durasi) * 1000
+    return {"n": len(d), "mean_ms": float(d.mean()), "p50_ms": float(np.percentile(d, 50)),
+            "p90_ms": float(np.percentile(d, 90)), "p99_ms": float(np.percentile(d, 99)),
+            "max_ms": float(d.max()), "throughput_per_s": float(len(d) / (d.sum() / 1000)) if d.sum() > 0 else None}
+
+
+def _ukur(fungsi, argumen):
+    durasi = []
+    for a in argumen:
+        t = time.perf_counter()
+        fungsi(a)
+        durasi.append(time.perf_counter() - t)
+    return _ringkas(durasi)
+
+
+def ukur_shard(cb, queries, daftar_shard, k=1):
+    # Skala PoolShard: latensi satu query besar + throughput batch per jumlah
+    # shard. Speedup relatif ke baris pertama (biasanya shard=1).
+    from cbr.paralel import PoolShard
+
+    hasil = []
+    for shard in daftar_shard:
+        t = time.perf_counter()
+        with PoolShard(cb, shard) as pool:
+            mulai_s = time.perf_counter() - t
+            pool.retrieve_top_k(queries[0], k)
+            satu = _ukur(lambda q: pool.retrieve_top_k(q, k), queries[:max(1, len(queries) // 10)])
+            t = time.perf_counter()
+            for _ in pool.diagnosa_batch(enumerate(queries), k):
+                pass
+            durasi = time.perf_counter() - t
+            n_shard = pool.shard
+        hasil.append({"shard": n_shard, "mulai_s": mulai_s, "query_p50_ms": satu["p50_ms"],
+                      "batch_per_s": len(queries) / durasi if durasi else None})
+    for h in hasil:
+        h["speedup_query"] = hasil[0]["query_p50_ms"] / h["query_p50_ms"] if h["query_p50_ms"] else None
+        h["speedup_batch"] = h["batch_per_s"] / hasil[0]["batch_per_s"] if hasil[0]["batch_per_s"] else None
+    return hasil
+
+
+def jalankan(n_gejala=300, n_kasus=20000, n_solusi=50, skew=1.1, n_query=500, n_append=200, k=1, seed=0,
+             shard=()):
+    folder = tempfile.mkdtemp(prefix="cbr-bench-")
+    try:
+        paths = buat_data_sintetis(folder, n_gejala, n_kasus, n_solusi, skew, seed=seed)
+        hasil = {"parameter": {"n_gejala": n_gejala, "n_kasus": n_kasus, "n_solusi": n_solusi, "skew": skew,
+                               "n_query": n_query, "n_append": n_append, "k": k, "seed": seed,
+                               "shard": list(shard)}}
+
+        # Load + memori puncak (tracemalloc ikut menghitung alokasi numpy)
+        tracemalloc.start()
+        t = time.perf_counter()
+        cb = CaseBase.from_csv(*paths)
+        hasil["load_s"] = time.perf_counter() - t
+        hasil["load_peak_mb"] = tracemalloc.get_traced_memory()[1] / 2 ** 20
+        tracemalloc.stop()
+
+        t = time.perf_counter()
+        kompilasi(*paths)
+        hasil["kompilasi_s"] = time.perf_counter() - t
+        t = time.perf_counter()
+        load_casebase(*paths)
+        hasil["load_biner_s"] = time.perf_counter() - t
+
+        queries = buat_query(cb, n_query, skew, seed=seed + 1)
+        hasil["retrieve_top_k"] = _ukur(lambda q: retrieve_top_k(q, cb, k), queries)
+        cache = QueryCache()
+        for q in queries:
+            cache.retrieve_top_k(q, cb, k)
+        hasil["retrieve_cache_hit"] = _ukur(lambda q: cache.retrieve_top_k(q, cb, k), queries)
+        hasil["hitung_similarity"] = _ukur(lambda q: hitung_similarity(q, cb), queries[:max(1, n_query // 10)])
+
+        t = time.perf_counter()
+        for _ in diagnosa_batch(enumerate(queries), cb, k):
+            pass
+        durasi = time.perf_counter() - t
+        hasil["batch"] = {"n": n_query, "total_s": durasi, "throughput_per_s": n_query / durasi if durasi else None}
+        if shard:
+            hasil["shard"] = ukur_shard(cb, queries, shard, k)
+
+        rng = np.random.default_rng(seed + 2)
+        hasil["append_kasus"] = _ukur(lambda q: cb.append_kasus("K", q, f"S{rng.integers(1, n_solusi + 1):03d}"),
+                                      buat_query(cb, n_append, skew, seed=seed + 3))
+
+        writer = HistoryWriter(os.path.join(folder, "riwayat_diagnosis.csv"))
+        hasil["catat_riwayat"] = _ukur(lambda q: writer.catat(buat_record("Sintetis", q, "x", 50.0)), queries)
+        t = time.perf_counter()
+        writer.tutup()
+        hasil["catat_riwayat"]["drain_s"] = time.perf_counter() - t
+
+        # ru_maxrss: KB di Linux, byte di macOS
+        maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        hasil["peak_rss_mb"] = maxrss / (2 ** 20 if sys.platform == "darwin" else 2 ** 10)
+        hasil["meta"] = {"waktu": datetime.now().isoformat(timespec="seconds"), "python": platform.python_version(),
+                         "numpy": np.__version__, "platform": platform.platform(), "cpu": os.cpu_count()}
+        return hasil
+    finally:
+        shutil.rmtree(folder, ignore_errors=True)
+
+
+# --- BANDINGKAN DENGAN RUN SEBELUMNYA ---
+METRIK_BANDING = [("load_s",), ("load_peak_mb",), ("load_biner_s",), ("retrieve_top_k", "p50_ms"),
+                  ("retrieve_top_k", "p99_ms"), ("retrieve_cache_hit", "p50_ms"), ("hitung_similarity", "p50_ms"),
+                  ("batch", "total_s"), ("append_kasus", "p50_ms"), ("append_kasus", "p99_ms"),
+                  ("catat_riwayat", "p99_ms")]
+
+
+def _ambil(d, kunci):
+    for k in kunci:
+        if not isinstance(d, dict) or k not in d:
+            return None
+        d = d[k]
+    return d
+
+
+def bandingkan(lama, baru, toleransi=0.2):
+    # Regresi = metrik (semua "lebih kecil lebih baik") naik > toleransi
+    laporan = []
+    for kunci in METRIK_BANDING:
+        a, b = _ambil(lama, kunci), _ambil(baru, kunci)
+        if not a or b is None:
+            continue
+        rasio = b / a
+        laporan.append({"metrik": ".".join(kunci), "lama": a, "baru": b, "rasio": rasio, "regresi": rasio > 1 + toleransi})
+    return laporan
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark engine CBR dengan case base sintetis")
+    parser.add_argument("--gejala", type=int, default=300)
+    parser.add_argument("--kasus", type=int, default=20000)
+    parser.add_argument("--solusi", type=int, default=50)
+    parser.add_argument("--skew", type=float, default=1.1, help="skew Zipf frekuensi gejala (0 = seragam)")
+    parser.add_argument("--query", type=int, default=500)
+    parser.add_argument("--append", type=int, default=200)
+    parser.add_argument("-k", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--shard", default="", help="daftar jumlah shard untuk uji skala PoolShard, mis. 1,2,4,8")
+    parser.add_argument("-o", "--output", help="simpan hasil JSON ke file ini")
+    parser.add_argument("--banding", help="file JSON run sebelumnya untuk cek regresi")
+    parser.add_argument("--toleransi", type=float, default=0.2)
+    args = parser.parse_args(argv)
+
+    shard = [int(s) for s in args.shard.split(",") if s.strip()]
+    hasil = jalankan(args.gejala, args.kasus, args.solusi, args.skew, args.query, args.append, args.k, args.seed, shard)
+    if args.banding:
+        with open(args.banding, encoding="utf-8") as f:
+            hasil["banding"] = bandingkan(json.load(f), hasil, args.toleransi)
+
+    teks = json.dumps(hasil, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(teks + "\n")
+    print(teks)
+    if any(b["regresi"] for b in hasil.get("banding", [])):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
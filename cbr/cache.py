@@ -0,0 +1,77 @@
+import threading
+import time
+from collections import OrderedDict
+
+from cbr.engine import retrieve_top_k
+
+
+# --- CACHE HASIL QUERY (LRU + TTL) ---
+# Kunci = (token case base, jumlah kasus, gejala urut & unik, k). Query
+# dikanonkan dulu (urut & unik) dan yang diskor engine juga versi kanon itu,
+# jadi urutan/duplikat input tidak bikin miss dan hasil cache selalu sama
+# dengan hitungan langsung. (Engine sendiri menghitung gejala dobel dua kali.)
+# Kasus baru menaikkan jumlah kasus, jadi entri lama otomatis tidak terpakai.
+class QueryCache:
+    def __init__(self, maks_entri=4096, ttl=3600.0):
+        self.maks_entri = maks_entri
+        self.ttl = ttl
+        self.hit = 0
+        self.miss = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def kanonik(user_gejala):
+        return tuple(sorted(set(user_gejala)))
+
+    @staticmethod
+    def kunci(user_gejala, cb, k):
+        return cb.versi + (QueryCache.kanonik(user_gejala), k)
+
+    def ambil(self, kunci):
+        with self._lock:
+            entri = self._data.get(kunci)
+            if entri is not None and (self.ttl is None or time.monotonic() - entri[0] < self.ttl):
+                self._data.move_to_end(kunci)
+                self.hit += 1
+                return entri[1]
+            if entri is not None:
+                del self._data[kunci]
+            self.miss += 1
+            return None
+
+    def simpan(self, kunci, hasil):
+        with self._lock:
+            self._data[kunci] = (time.monotonic(), hasil)
+            self._data.move_to_end(kunci)
+            while len(self._data) > self.maks_entri:
+                self._data.popitem(last=False)
+
+    def hitung(self, user_gejala, cb, k=1):
+        # Versi dibaca sebelum skor dihitung (tanpa lock case base): hasil
+        # paling tidak sebaru kuncinya, tidak pernah tercatat di versi yang
+        # lebih baru dari data yang diskor
+        kunci = self.kunci(user_gejala, cb, k)
+        hasil = retrieve_top_k(list(kunci[-2]), cb, k)
+        self.simpan(kunci, hasil)
+        return hasil
+
+    def retrieve_top_k(self, user_gejala, cb, k=1):
+        # Hasil (list dict) dipakai bersama antar sesi, jangan diubah pemanggil
+        hasil = self.ambil(self.kunci(user_gejala, cb, k))
+        return hasil if hasil is not None else self.hitung(user_gejala, cb, k)
+
+    def invalidasi(self, cb=None):
+        # Buang entri milik case base ini (atau semua kalau cb None)
+        with self._lock:
+            if cb is None:
+                self._data.clear()
+                return
+            for kunci in [x for x in self._data if x[0] == cb.token]:
+                del self._data[kunci]
+
+    def statistik(self):
+        with self._lock:
+            total = self.hit + self.miss
+            return {"entri": len(self._data), "hit": self.hit, "miss": self.miss,
+                    "hit_rate": self.hit / total * 100 if total else 0.0}
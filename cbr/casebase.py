@@ -0,0 +1,303 @@
+import itertools
+import os
+import sys
+import threading
+from collections import Counter
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+
+from cbr.storage import buka_storage
+
+
+# --- ARRAY YANG BISA DITAMBAH (AMORTIZED O(1)) ---
+# Buffer awal boleh hasil mmap (read-only); append pertama menyalin ke memori.
+# asanyarray: buffer mmap tetap np.memmap, jadi view-nya masih bisa dikenali
+# (domain.perkiraan_memori tidak menghitung halaman milik page cache).
+class _GrowArray:
+    def __init__(self, values, dtype=None):
+        self._buf = np.asanyarray(values, dtype=dtype)
+        self.n = len(self._buf)
+
+    def append(self, values):
+        values = np.asarray(values, dtype=self._buf.dtype)
+        if not len(values):
+            return
+        butuh = self.n + len(values)
+        if butuh > len(self._buf):
+            baru = np.empty(max(butuh, 2 * len(self._buf), 16), dtype=self._buf.dtype)
+            baru[:self.n] = self._buf[:self.n]
+            self._buf = baru
+        self._buf[self.n:butuh] = values
+        self.n = butuh
+
+    @property
+    def view(self):
+        return self._buf[:self.n]
+
+
+# --- KOLOM STRING LAZY (UNTUK CASE BASE HASIL MMAP) ---
+# Bagian awal dibaca dari array biner saat diakses, kasus baru di list biasa.
+# Jadi load tidak perlu decode jutaan string di awal.
+class _Kolom:
+    def __init__(self, n):
+        self._n = n
+        self.ekstra = []
+
+    def __len__(self):
+        return self._n + len(self.ekstra)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        if i < self._n:
+            return self._ambil(int(i))
+        return self.ekstra[i - self._n]
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def append(self, nilai):
+        self.ekstra.append(nilai)
+
+
+class _KolomString(_Kolom):
+    def __init__(self, blob, offset):
+        super().__init__(len(offset) - 1)
+        self.blob = blob
+        self.offset = offset
+
+    def _ambil(self, i):
+        return bytes(self.blob[self.offset[i]:self.offset[i + 1]]).decode('utf-8')
+
+
+class _KolomKode(_Kolom):
+    def __init__(self, kode, tabel):
+        super().__init__(len(kode))
+        self.kode = kode
+        self.tabel = tabel
+
+    def _ambil(self, i):
+        return self.tabel[self.kode[i]]
+
+
+class _KolomGejala(_Kolom):
+    # Gejala kasus direkonstruksi dari CSR. Kasus yang punya id gejala di luar
+    # katalog (tidak masuk CSR) disimpan mentah di `mentah`.
+    def __init__(self, n, cb, mentah):
+        super().__init__(n)
+        self.cb = cb
+        self.mentah = mentah
+
+    def _ambil(self, i):
+        if i in self.mentah:
+            return self.mentah[i]
+        cb = self.cb
+        return [cb.gejala_ids[j] for j in cb.indices[cb.indptr[i]:cb.indptr[i + 1]]]
+
+
+# --- CASE BASE (INDEX TERKOMPILASI) ---
+# Semua yang dulu dihitung ulang tiap rerun Streamlit (split gejala_terkait,
+# dict opsi/mapping, lookup solusi) dibangun sekali di sini per versi CSV.
+class CaseBase:
+    _urutan = itertools.count(1)
+
+    def __init__(self, df_gejala, df_solusi, df_kasus):
+        self._set_katalog(
+            list(zip(df_gejala['id_gejala'], df_gejala['nama_gejala'], df_gejala['bobot'])),
+            list(zip(df_solusi['id_solusi'], df_solusi['nama_solusi'])))
+
+        # --- Kasus (gejala sudah di-split sekali) ---
+        self.id_kasus = [str(x) for x in df_kasus['id_kasus']]
+        self.solusi_id = [sys.intern(str(x)) for x in df_kasus['solusi_final']]
+        self.gejala_kasus = [[sys.intern(g) for g in str(x).split(',')] for x in df_kasus['gejala_terkait']]
+
+        # Gejala yang tidak ada di katalog tidak punya bobot -> tidak masuk matriks
+        indptr = [0]
+        indices = []
+        for daftar in self.gejala_kasus:
+            indices.extend(self.gejala_pos[g] for g in daftar if g in self.gejala_pos)
+            indptr.append(len(indices))
+        indices = np.asarray(indices, dtype=np.int64)
+        rows = np.repeat(np.arange(len(self.id_kasus), dtype=np.int64), np.diff(indptr))
+        self._indptr = _GrowArray(indptr, np.int64)
+        self._indices = _GrowArray(indices, np.int64)
+        self._data = _GrowArray(self.bobot[indices], np.int64)
+        self._rows = _GrowArray(rows, np.int64)
+        self._total = _GrowArray(np.bincount(rows, weights=self.bobot[indices], minlength=len(self.id_kasus)), np.float64)
+
+        # Gejala yang ditulis dobel dalam satu kasus ikut dihitung dobel,
+        # jadi batas atas skor perlu tahu kelipatan maksimumnya
+        self.max_kelipatan = 1
+        if len(indices):
+            pasangan = rows * len(self.bobot) + indices
+            self.max_kelipatan = int(np.unique(pasangan, return_counts=True)[1].max())
+        self._bangun_posting()
+
+    def _set_katalog(self, baris_gejala, baris_solusi):
+        # lock: dipegang cuma selama index di memori diubah (tambah_kasus) dan
+        # saat snapshot diambil; skor dihitung dari snapshot tanpa lock.
+        # _lock_sync: satu sync_kasus dalam satu waktu (I/O storage di luar lock)
+        self.lock = threading.RLock()
+        self._lock_sync = threading.Lock()
+        self.token = next(CaseBase._urutan)
+        self.storage = None
+        self.offset_kasus = 0
+        # Index aproksimasi (cbr.lsh.IndeksLSH), dipasang per domain oleh registry
+        self.lsh = None
+        self.baris_gejala = [(str(i), str(nama), int(b)) for i, nama, b in baris_gejala]
+        self.baris_solusi = [(str(i), str(nama)) for i, nama in baris_solusi]
+
+        # --- Katalog gejala ---
+        # Kalau id dobel di katalog, bobot yang dipakai baris pertama
+        self.gejala_ids = []
+        self.gejala_pos = {}
+        bobot = []
+        for id_gejala, _, b in self.baris_gejala:
+            id_gejala = sys.intern(id_gejala)
+            if id_gejala in self.gejala_pos:
+                continue
+            self.gejala_pos[id_gejala] = len(bobot)
+            self.gejala_ids.append(id_gejala)
+            bobot.append(b)
+        self.bobot = np.asarray(bobot, dtype=np.int64)
+
+        # --- Opsi UI ---
+        self.opsi_gejala = [f"{nama} ({id_g})" for id_g, nama, _ in self.baris_gejala]
+        self.mapping_gejala = {f"{nama} ({id_g})": sys.intern(id_g) for id_g, nama, _ in self.baris_gejala}
+
+        self.solusi = {}
+        for id_solusi, nama_solusi in self.baris_solusi:
+            self.solusi.setdefault(id_solusi, nama_solusi)
+        self.opsi_solusi = [f"{nama} ({id_s})" for id_s, nama in self.baris_solusi]
+        self.mapping_solusi = {f"{nama} ({id_s})": id_s for id_s, nama in self.baris_solusi}
+
+    def __len__(self):
+        return len(self.id_kasus)
+
+    @property
+    def versi(self):
+        # Kasus cuma bisa ditambah (append-only), jadi (instance, jumlah kasus)
+        # sudah cukup jadi penanda versi untuk cache hasil query
+        return self.token, len(self.id_kasus)
+
+    # --- Matriks sparse kasus x gejala (CSR, numpy biasa) ---
+    @property
+    def indptr(self):
+        return self._indptr.view
+
+    @property
+    def indices(self):
+        return self._indices.view
+
+    @property
+    def rows(self):
+        return self._rows.view
+
+    @property
+    def data(self):
+        return self._data.view
+
+    @property
+    def total_bobot_kasus(self):
+        return self._total.view
+
+    # --- Inverted index gejala -> posting list kasus (transpose CSR) ---
+    # Kasus baru masuk ke posting_baru dulu, digabung ke array utama
+    # kalau sudah cukup banyak (biaya rebuild jadi amortized).
+    def _bangun_posting(self):
+        urutan = np.argsort(self.indices, kind='stable')
+        self.posting_rows = self.rows[urutan]
+        self.posting_ptr = np.zeros(len(self.bobot) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(self.indices, minlength=len(self.bobot)), out=self.posting_ptr[1:])
+        self.posting_baru = {}
+        self.jumlah_posting_baru = 0
+
+    def tambah_kasus(self, id_kasus, gejala_list, solusi_id):
+        # Update index di tempat: O(jumlah gejala kasus), tanpa rebuild
+        with self.lock:
+            row = len(self.id_kasus)
+            self.id_kasus.append(id_kasus)
+            self.solusi_id.append(sys.intern(solusi_id))
+            self.gejala_kasus.append([sys.intern(g) for g in gejala_list])
+
+            cols = [self.gejala_pos[g] for g in gejala_list if g in self.gejala_pos]
+            self._indices.append(cols)
+            self._data.append(self.bobot[cols])
+            self._indptr.append([self._indices.n])
+            self._rows.append([row] * len(cols))
+            self._total.append([float(self.bobot[cols].sum())])
+            if cols:
+                self.max_kelipatan = max(self.max_kelipatan, max(Counter(cols).values()))
+
+            for j in cols:
+                self.posting_baru.setdefault(j, []).append(row)
+            self.jumlah_posting_baru += len(cols)
+            if self.jumlah_posting_baru > max(1024, len(self.posting_rows) // 8):
+                self._bangun_posting()
+
+    def snapshot(self):
+        # View array pada satu titik waktu (n kasus). Aman dipakai lama (batch,
+        # evaluasi, engine) tanpa menahan lock: append berikutnya menulis di
+        # luar view ini atau ke buffer baru, dan kolom id/solusi cuma bertambah
+        # di ujung. posting_baru bisa ikut bertambah; pembaca menyaring row < n.
+        with self.lock:
+            return SimpleNamespace(
+                n=len(self), bobot=self.bobot, gejala_pos=self.gejala_pos, solusi=self.solusi,
+                indptr=self.indptr, indices=self.indices, data=self.data, rows=self.rows,
+                total_bobot_kasus=self.total_bobot_kasus, id_kasus=self.id_kasus,
+                solusi_id=self.solusi_id, gejala_kasus=self.gejala_kasus,
+                posting_rows=self.posting_rows, posting_ptr=self.posting_ptr, posting_baru=self.posting_baru,
+                max_kelipatan=self.max_kelipatan)
+
+    # --- Sinkron dengan storage kasus (append-only) ---
+    def sync_kasus(self):
+        # Baca cuma kasus yang ditambahkan sejak posisi terakhir (dari proses
+        # ini atau proses lain). False kalau storage ternyata ditulis ulang.
+        if self.storage is None:
+            return True
+        with self._lock_sync:
+            hasil = self.storage.baca_sejak(self.offset_kasus)
+            if hasil is None:
+                return False
+            baris, offset = hasil
+            with self.lock:
+                for id_kasus, gejala_list, solusi_id in baris:
+                    self.tambah_kasus(id_kasus, gejala_list, solusi_id)
+                self.offset_kasus = offset
+            return True
+
+    def append_kasus(self, prefix, gejala_list, solusi_id):
+        # Id dialokasikan atomik oleh storage (flock / transaksi SQLite), index
+        # diupdate lewat sync_kasus supaya kasus dari proses lain ikut masuk
+        # dengan urutan yang sama. Tulis + fsync di luar lock: diagnosis di
+        # domain ini tidak ikut menunggu disk.
+        new_id = self.storage.tambah(prefix, gejala_list, solusi_id)
+        self.sync_kasus()
+        return new_id
+
+    @classmethod
+    def from_csv(cls, path_gejala, path_solusi, path_kasus):
+        # path_kasus boleh .csv atau .db (lihat cbr.storage.buka_storage)
+        df_gejala = pd.read_csv(path_gejala)
+        df_solusi = pd.read_csv(path_solusi)
+        storage = buka_storage(path_kasus)
+        df_kasus, posisi = storage.baca_semua()
+        df_kasus.dropna(subset=['id_kasus', 'solusi_final'], inplace=True)
+        cb = cls(df_gejala, df_solusi, df_kasus)
+        cb.storage = storage
+        cb.offset_kasus = posisi
+        return cb
+
+
+def versi_csv(*paths):
+    # Versi = (mtime, ukuran) tiap file. Cukup os.stat, tidak baca isi file
+    versi = []
+    for p in paths:
+        st = os.stat(p)
+        versi.append((st.st_mtime_ns, st.st_size))
+    return tuple(versi)
@@ -0,0 +1,209 @@
+import glob
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from cbr.casebase import versi_csv
+from cbr.kompilasi import load_casebase
+from cbr.lsh import IndeksLSH
+
+MANIFEST = "domains.json"
+# Kunci entri manifest yang dikenal; kunci lain diabaikan (dengan peringatan
+# di log) supaya salah ketik di domains.json tidak menjatuhkan aplikasi
+KUNCI_MANIFEST = ("slug", "nama", "prefix", "banner", "banner_url", "maks_mb", "gejala", "solusi", "kasus", "lsh")
+log = logging.getLogger(__name__)
+
+
+# --- DAFTAR DOMAIN (MANIFEST + SCAN FOLDER DATA) ---
+# Domain = satu set gejala_<slug>.csv, solusi_<slug>.csv, kasus_<slug>.csv.
+# data/domains.json (opsional) memberi nama tampilan, prefix id, banner, dan
+# batas memori per domain. Set file yang tidak ada di manifest tetap dipakai
+# dengan nama dari slug-nya, jadi domain baru cukup ditaruh file CSV-nya.
+# Kasus boleh berupa kasus_<slug>.db (SQLite, hasil python -m cbr.storage);
+# kalau ada, dipakai menggantikan kasus_<slug>.csv. "lsh": {"band", "baris"}
+# di manifest menyalakan mode retrieval aproksimasi untuk domain itu (lihat
+# cbr.lsh; ukur dulu recall-nya dengan python -m cbr.lsh).
+class Domain:
+    def __init__(self, data_dir, slug, nama=None, prefix=None, banner=None, banner_url=None, maks_mb=None,
+                 gejala=None, solusi=None, kasus=None, lsh=None):
+        self.slug = slug
+        self.lsh = lsh
+        self.nama = nama or slug.replace("_", " ").title()
+        self.prefix = prefix
+        self.banner = banner
+        self.banner_url = banner_url
+        self.maks_mb = maks_mb
+        if kasus is None and os.path.exists(os.path.join(data_dir, f"kasus_{slug}.db")):
+            kasus = f"kasus_{slug}.db"
+        self.paths = tuple(os.path.join(data_dir, f or f"{jenis}_{slug}.csv") for jenis, f in
+                           (("gejala", gejala), ("solusi", solusi), ("kasus", kasus)))
+
+    def ada(self):
+        return all(os.path.exists(p) for p in self.paths)
+
+
+def temukan_domain(data_dir):
+    daftar = OrderedDict()
+    path_manifest = os.path.join(data_dir, MANIFEST)
+    if os.path.exists(path_manifest):
+        with open(path_manifest, encoding="utf-8") as f:
+            for entri in json.load(f).get("domains", []):
+                if not isinstance(entri, dict) or not entri.get("slug"):
+                    log.warning("%s: entri domain tanpa 'slug' dilewati: %r", path_manifest, entri)
+                    continue
+                asing = sorted(set(entri) - set(KUNCI_MANIFEST))
+                if asing:
+                    log.warning("%s: kunci tidak dikenal di domain %r diabaikan: %s",
+                                path_manifest, entri["slug"], ", ".join(asing))
+                dom = Domain(data_dir, **{kunci: entri[kunci] for kunci in KUNCI_MANIFEST if kunci in entri})
+                daftar[dom.nama] = dom
+    dikenal = {os.path.splitext(os.path.basename(dom.paths[2]))[0] for dom in daftar.values()}
+    slug_baru = set()
+    for ext in (".csv", ".db"):
+        for path in glob.glob(os.path.join(glob.escape(data_dir), f"kasus_*{ext}")):
+            stem = os.path.basename(path)[:-len(ext)]
+            if stem not in dikenal:
+                slug_baru.add(stem[len("kasus_"):])
+    for slug in sorted(slug_baru):
+        dom = Domain(data_dir, slug)
+        if dom.ada() and dom.nama not in daftar:
+            daftar[dom.nama] = dom
+    return daftar
+
+
+def nama_domain(daftar, nama=None):
+    # Tanpa nama: domain pertama (urutan manifest, lalu slug dari scan)
+    if nama is None:
+        nama = next(iter(daftar), None)
+        if nama is None:
+            raise KeyError("Belum ada domain di folder data")
+    if nama not in daftar:
+        raise KeyError(f"Domain tidak dikenal: {nama}")
+    return nama
+
+
+def data_paths(data_dir, nama=None):
+    daftar = temukan_domain(data_dir)
+    return daftar[nama_domain(daftar, nama)].paths
+
+
+def _prefix_dari_kasus(cb):
+    # Domain tanpa prefix di manifest: ikut huruf depan id kasus yang sudah ada
+    if len(cb):
+        prefix = str(cb.id_kasus[0]).rstrip("0123456789")
+        if prefix:
+            return prefix
+    return "K"
+
+
+def perkiraan_memori(cb):
+    # Perkiraan memori resident (byte). Array yang masih berupa mmap .cbrbin
+    # tidak dihitung karena halamannya milik page cache dan bisa dilepas OS.
+    total = 0
+    for arr in (cb.indptr, cb.indices, cb.data, cb.rows, cb.total_bobot_kasus, cb.posting_rows, cb.posting_ptr):
+        if not isinstance(arr, np.memmap):
+            total += arr.nbytes
+    for kolom in (cb.id_kasus, cb.solusi_id, cb.gejala_kasus):
+        # Kira-kira 100 byte per objek Python (string/list kecil + slot list)
+        total += 100 * (len(kolom) if isinstance(kolom, list) else len(kolom.ekstra))
+    if cb.lsh is not None:
+        total += cb.lsh.nbytes
+    return total
+
+
+# --- REGISTRY: LOAD MALAS + BATAS MEMORI + EVICTION ---
+class RegistryDomain:
+    def __init__(self, data_dir, anggaran_mb=1024, saat_buang=None):
+        self.data_dir = data_dir
+        self.anggaran = anggaran_mb * 2 ** 20
+        self.saat_buang = saat_buang
+        self._domain = OrderedDict()
+        self._versi_folder = None
+        self._aktif = OrderedDict()
+        self._lock = threading.Lock()
+        self._lock_muat = {}
+
+    def daftar(self):
+        # Scan ulang cuma kalau isi folder data berubah (mtime direktori)
+        with self._lock:
+            versi = (os.stat(self.data_dir).st_mtime_ns, self._mtime_manifest())
+            if versi != self._versi_folder:
+                self._domain = temukan_domain(self.data_dir)
+                self._versi_folder = versi
+            return self._domain
+
+    def _mtime_manifest(self):
+        try:
+            return os.stat(os.path.join(self.data_dir, MANIFEST)).st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def domain(self, nama):
+        dom = self.daftar().get(nama)
+        if dom is None:
+            raise KeyError(f"Domain tidak dikenal: {nama}")
+        return dom
+
+    def casebase(self, nama):
+        dom = self.domain(nama)
+        with self._lock:
+            lock = self._lock_muat.setdefault(nama, threading.Lock())
+        with lock:
+            versi = versi_csv(*dom.paths[:2])
+            with self._lock:
+                entri = self._aktif.get(nama)
+            # Katalog berubah atau file kasus ditulis ulang -> load ulang
+            if entri is not None and entri[0] == versi and entri[1].sync_kasus():
+                with self._lock:
+                    if nama in self._aktif:
+                        self._aktif.move_to_end(nama)
+                return entri[1]
+            if entri is not None:
+                self._buang(nama)
+
+            cb = load_casebase(*dom.paths)
+            if dom.lsh is not None:
+                cb.lsh = IndeksLSH(cb, **dom.lsh)
+            with self._lock:
+                self._aktif[nama] = (versi, cb)
+            self._evict(kecuali=nama)
+            return cb
+
+    def prefix(self, nama):
+        dom = self.domain(nama)
+        return dom.prefix or _prefix_dari_kasus(self.casebase(nama))
+
+    def _buang(self, nama):
+        with self._lock:
+            entri = self._aktif.pop(nama, None)
+        if entri is not None and self.saat_buang is not None:
+            self.saat_buang(entri[1])
+
+    def _evict(self, kecuali=None):
+        # Urutan buang: domain yang melebihi batas maks_mb-nya sendiri dulu,
+        # lalu yang paling lama tidak dipakai, sampai total masuk anggaran.
+        # Domain yang baru dipakai tidak pernah dibuang.
+        with self._lock:
+            ukuran = {nama: perkiraan_memori(cb) for nama, (_, cb) in self._aktif.items()}
+            total = sum(ukuran.values())
+            urutan = sorted((nama for nama in self._aktif if nama != kecuali),
+                            key=lambda nama: not self._lewat_batas(nama, ukuran[nama]))
+        for nama in urutan:
+            if total <= self.anggaran and not self._lewat_batas(nama, ukuran[nama]):
+                break
+            self._buang(nama)
+            total -= ukuran[nama]
+
+    def _lewat_batas(self, nama, ukuran):
+        dom = self._domain.get(nama)
+        return dom is not None and dom.maks_mb is not None and ukuran > dom.maks_mb * 2 ** 20
+
+    def statistik(self):
+        with self._lock:
+            return {nama: {"kasus": len(cb), "memori_mb": perkiraan_memori(cb) / 2 ** 20,
+                           "lsh": None if cb.lsh is None else cb.lsh.statistik()}
+                    for nama, (_, cb) in self._aktif.items()}
@@ -0,0 +1,146 @@
+import heapq
+
+import numpy as np
+
+
+# --- SKOR SIMILARITY (VECTORIZED) ---
+# Semua skor dihitung dari cb.snapshot(): lock case base cuma dipegang saat
+# snapshot diambil, jadi banyak request di satu domain bisa jalan paralel
+# (numpy lepas GIL) dan append kasus tidak menahan diagnosis.
+def _query(user_gejala, cb):
+    query = np.zeros(len(cb.bobot), dtype=np.int64)
+    total_bobot_user = 0
+    for g in user_gejala:
+        pos = cb.gejala_pos.get(g)
+        if pos is not None:
+            total_bobot_user += int(cb.bobot[pos])
+            query[pos] = 1
+    return query, total_bobot_user
+
+
+def _dice(match_bobot, total_bobot_kasus, total_bobot_user):
+    # Dice berbobot: match / ((total_kasus + total_user) / 2) * 100
+    pembagi = (total_bobot_kasus + total_bobot_user) / 2
+    similarity = np.zeros(len(match_bobot), dtype=np.float64)
+    ada = pembagi > 0
+    similarity[ada] = (match_bobot[ada] / pembagi[ada]) * 100
+    return similarity
+
+
+def _hasil(cb, rows, similarity):
+    return [{
+        'id_kasus': cb.id_kasus[i],
+        'similarity': float(s),
+        'solusi_id': cb.solusi_id[i],
+        'gejala_kasus': cb.gejala_kasus[i]
+    } for i, s in zip(rows, similarity)]
+
+
+def _skor(user_gejala, snap):
+    query, total_bobot_user = _query(user_gejala, snap)
+    # Satu sparse dot product: match_bobot[i] = sum(data[i, j] * query[j])
+    match_bobot = np.bincount(snap.rows, weights=snap.data * query[snap.indices], minlength=snap.n)
+    return _dice(match_bobot, snap.total_bobot_kasus, total_bobot_user)
+
+
+def hitung_similarity(user_gejala, cb):
+    snap = cb.snapshot()
+    similarity = _skor(user_gejala, snap)
+    # Stable sort biar urutan kasus yang skornya sama tetap ikut urutan CSV
+    urutan = np.argsort(-similarity, kind='stable')
+    return _hasil(snap, urutan, similarity[urutan])
+
+
+# --- TOP-K PER BARIS (VECTORIZED) ---
+def top_k_baris(sim, k):
+    # sim: (b, m). Hasil posisi (b, k) urut skor turun; skor seri -> posisi
+    # kecil dulu, sama seperti stable sort di hitung_similarity.
+    b, m = sim.shape
+    k = min(k, m)
+    t = -np.partition(-sim, k - 1, axis=1)[:, k - 1]
+    lebih = sim > t[:, None]
+    sama = sim == t[:, None]
+    kurang = k - lebih.sum(axis=1)
+    pilih = lebih | (sama & (np.cumsum(sama, axis=1) <= kurang[:, None]))
+    pos = np.nonzero(pilih)[1].reshape(b, k)
+    urut = np.lexsort((pos, -np.take_along_axis(sim, pos, axis=1)), axis=1)
+    return np.take_along_axis(pos, urut, axis=1)
+
+
+# --- TOP-K (INVERTED INDEX + MAXSCORE) ---
+def _posting(snap, j):
+    # Posting list gejala j sampai row snap.n (kasus baru sesudahnya diabaikan)
+    utama = snap.posting_rows[snap.posting_ptr[j]:snap.posting_ptr[j + 1]]
+    baru = snap.posting_baru.get(j)
+    if not baru:
+        return utama
+    baru = np.asarray(baru, dtype=np.int64)
+    return np.concatenate([utama, baru[baru < snap.n]])
+
+
+def _match_kandidat(cb, kandidat, query):
+    # Hitung match persis untuk kandidat saja, langsung dari baris CSR-nya
+    panjang = cb.indptr[kandidat + 1] - cb.indptr[kandidat]
+    pemilik = np.repeat(np.arange(len(kandidat)), panjang)
+    offset = np.arange(panjang.sum()) - np.repeat(np.cumsum(panjang) - panjang, panjang)
+    posisi = np.repeat(cb.indptr[kandidat], panjang) + offset
+    return np.bincount(pemilik, weights=cb.data[posisi] * query[cb.indices[posisi]], minlength=len(kandidat))
+
+
+def retrieve_top_k(user_gejala, cb, k=1, eksak=False):
+    # Hasilnya sama persis dengan hitung_similarity(user_gejala, cb)[:k],
+    # tapi yang discan cuma posting list gejala yang dipilih user. Domain
+    # dengan mode aproksimasi (cb.lsh) lewat index LSH, kecuali eksak=True.
+    if k <= 0:
+        return []
+    if cb.lsh is not None and not eksak:
+        return cb.lsh.retrieve_top_k(user_gejala, k)
+    return _retrieve_top_k(user_gejala, cb.snapshot(), k)
+
+
+def _retrieve_top_k(user_gejala, cb, k):
+    # cb di sini snapshot (cb.snapshot()), bukan CaseBase
+    query, total_bobot_user = _query(user_gejala, cb)
+
+    # Gejala query diproses dari bobot terbesar (MaxScore). Sisa bobot yang
+    # belum diproses = batas atas match untuk kasus yang belum pernah terlihat.
+    terms = sorted(np.flatnonzero(query), key=lambda j: -cb.bobot[j])
+    sisa = sum(int(cb.bobot[j]) for j in terms)
+    bisa_stop = len(cb.bobot) == 0 or cb.bobot.min() >= 0
+
+    kandidat = np.empty(0, dtype=np.int64)
+    match = np.empty(0, dtype=np.float64)
+    for j in terms:
+        posting = _posting(cb, j)
+        gabung, balik = np.unique(np.concatenate([kandidat, posting]), return_inverse=True)
+        bobot = np.concatenate([match, np.full(len(posting), float(cb.bobot[j]))])
+        kandidat, match = gabung, np.bincount(balik, weights=bobot, minlength=len(gabung))
+        sisa -= int(cb.bobot[j])
+
+        if bisa_stop and len(kandidat) >= k:
+            # Skor parsial = batas bawah (match cuma bisa naik). Kasus baru
+            # paling tinggi dapat 200*R/(R+U) dengan R = sisa bobot query.
+            batas_bawah = _dice(match, cb.total_bobot_kasus[kandidat], total_bobot_user)
+            theta = np.partition(batas_bawah, len(batas_bawah) - k)[len(batas_bawah) - k]
+            r = sisa * cb.max_kelipatan
+            batas_atas = (r / ((r + total_bobot_user) / 2)) * 100 if r + total_bobot_user > 0 else 0
+            if batas_atas < theta:
+                break
+
+    # Gejala sisa (biasanya yang populer & bobot kecil) tidak perlu discan,
+    # cukup lengkapi skor kandidat lewat baris CSR masing-masing.
+    similarity = _dice(_match_kandidat(cb, kandidat, query), cb.total_bobot_kasus[kandidat], total_bobot_user)
+
+    # Heap terbatas ukuran k; seri diurutkan by posisi kasus seperti stable sort
+    top = heapq.nsmallest(k, zip(-similarity, kandidat.tolist()))
+    top = [(-s, i) for s, i in top if s < 0]
+
+    # Kalau kandidat berskor > 0 kurang dari k, sisanya kasus skor 0 urut CSV
+    if len(top) < k:
+        dipakai = {i for _, i in top}
+        for i in range(cb.n):
+            if len(top) >= k:
+                break
+            if i not in dipakai:
+                top.append((0.0, i))
+    return _hasil(cb, [i for _, i in top], [s for s, _ in top])
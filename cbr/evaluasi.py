@@ -0,0 +1,140 @@
+import numpy as np
+import pandas as pd
+
+
+# --- MATRIKS SIMILARITY KASUS x KASUS (PER BLOK) ---
+# Query = gejala kasus itu sendiri, jadi match = C @ C^T. Gejala jarang
+# dihitung lewat pasangan posting list (biaya ~ panjang_posting^2), gejala
+# populer (posting panjang) lewat matmul dense kecil supaya tidak meledak.
+class _Indeks:
+    def __init__(self, snap, rasio_populer=0.05):
+        ng = len(snap.bobot)
+        urutan = np.argsort(snap.indices, kind='stable')
+        self.kolom_csc = snap.rows[urutan]
+        self.ptr_csc = np.zeros(ng + 1, dtype=np.int64)
+        np.cumsum(np.bincount(snap.indices, minlength=ng), out=self.ptr_csc[1:])
+
+        self.populer = np.diff(self.ptr_csc) > max(64, rasio_populer * snap.n)
+        self.pos_populer = np.cumsum(self.populer) - 1
+        h = int(self.populer.sum())
+        # Baris = gejala populer, kolom = kasus, isi = bobot x kemunculan
+        self.dense = np.zeros((h, snap.n))
+        pilih = self.populer[snap.indices]
+        np.add.at(self.dense, (self.pos_populer[snap.indices[pilih]], snap.rows[pilih]), snap.data[pilih])
+
+
+def _match_query(snap, idx, q_rows, q_cols, b):
+    # Match b query x semua kasus. Pasangan (q_rows, q_cols) harus unik.
+    # Hasil float64 (b, n), dipakai in-place oleh pemanggil.
+    n = snap.n
+    populer = idx.populer[q_cols]
+    r, c = q_rows[~populer], q_cols[~populer]
+    panjang = idx.ptr_csc[c + 1] - idx.ptr_csc[c]
+    offset = np.arange(panjang.sum()) - np.repeat(np.cumsum(panjang) - panjang, panjang)
+    pasangan_kasus = idx.kolom_csc[np.repeat(idx.ptr_csc[c], panjang) + offset]
+    pasangan_query = np.repeat(r, panjang)
+    bobot = np.repeat(snap.bobot[c], panjang)
+
+    # Dihitung in-place di satu buffer b x n (blok ini yang paling mahal).
+    # bincount tanpa pasangan sama sekali mengembalikan int64, jadi di-cast
+    sim = np.bincount(pasangan_query * n + pasangan_kasus, weights=bobot, minlength=b * n).reshape(b, n)
+    sim = sim.astype(np.float64, copy=False)
+    if len(idx.dense):
+        q_populer = np.zeros((b, len(idx.dense)))
+        q_populer[q_rows[populer], idx.pos_populer[q_cols[populer]]] = 1
+        sim += q_populer @ idx.dense
+    return sim
+
+
+def _blok_similarity(snap, idx, q0, q1):
+    ng = max(len(snap.bobot), 1)
+    b = q1 - q0
+    lo, hi = snap.indptr[q0], snap.indptr[q1]
+    q_rows = snap.rows[lo:hi].astype(np.int64) - q0
+    q_cols = snap.indices[lo:hi]
+    # Query pakai keanggotaan (gejala dobel di query dihitung sekali)
+    kunci = np.unique(q_rows * ng + q_cols)
+    sim = _match_query(snap, idx, kunci // ng, kunci % ng, b)
+
+    pembagi = np.add(snap.total_bobot_kasus[None, :], snap.total_bobot_kasus[q0:q1, None])
+    pembagi /= 2
+    if snap.total_bobot_kasus.min() > 0:
+        np.divide(sim, pembagi, out=sim)
+    else:
+        np.divide(sim, pembagi, out=sim, where=pembagi > 0)
+    sim *= 100
+    return sim
+
+
+def _top_k_argmax(sim, k):
+    # k kecil: k kali argmax lebih murah daripada partition penuh. argmax ambil
+    # posisi pertama kalau seri, sama seperti stable sort. sim ikut diubah.
+    b = len(sim)
+    baris = np.arange(b)
+    pos = np.empty((b, k), dtype=np.int64)
+    skor = np.empty((b, k))
+    for i in range(k):
+        pos[:, i] = sim.argmax(axis=1)
+        skor[:, i] = sim[baris, pos[:, i]]
+        sim[baris, pos[:, i]] = -np.inf
+    return pos, skor
+
+
+def evaluasi(cb, mode="loo", n_fold=5, k=3, seed=42, maks_elemen_blok=8_000_000, dukungan=None, aktif=None):
+    # mode "loo": kasus diuji tanpa dirinya sendiri (diagonal di-mask)
+    # mode "kfold": kasus diuji tanpa semua kasus di fold yang sama
+    # dukungan: jumlah kasus asli yang diwakili tiap kasus (hasil kompaksi,
+    #   lihat cbr.pemeliharaan). Akurasi dibobot dukungan, dan di mode loo
+    #   kasus berdukungan > 1 tidak di-mask karena kembarannya masih ada.
+    # aktif: mask kasus yang boleh jadi referensi; sisanya cuma diuji
+    snap = cb.snapshot()
+    n = snap.n
+    if n == 0:
+        return None
+
+    fold = np.arange(n)
+    bobot = np.ones(n) if dukungan is None else np.asarray(dukungan[:n], dtype=np.float64)
+    if mode == "kfold":
+        fold = np.random.default_rng(seed).permutation(n) % n_fold
+
+    idx = _Indeks(snap)
+    solusi = np.asarray(snap.solusi_id[:n], dtype=object)
+    id_kasus = np.asarray(snap.id_kasus[:n], dtype=object)
+    pred = np.empty(n, dtype=object)
+    skor = np.zeros(n)
+    ref = np.empty(n, dtype=object)
+    hit = np.zeros(n, dtype=bool)
+    langkah = max(1, maks_elemen_blok // n)
+    for q0 in range(0, n, langkah):
+        q1 = min(q0 + langkah, n)
+        sim = _blok_similarity(snap, idx, q0, q1)
+        if mode == "kfold":
+            sim[fold[q0:q1, None] == fold[None, :]] = -np.inf
+        else:
+            diri = np.flatnonzero(bobot[q0:q1] <= 1)
+            sim[diri, diri + q0] = -np.inf
+        if aktif is not None:
+            sim[:, ~np.asarray(aktif[:n], dtype=bool)] = -np.inf
+
+        pos, top_skor = _top_k_argmax(sim, min(k, n))
+        valid = np.isfinite(top_skor)
+        sol_top = np.where(valid, solusi[pos], None)
+
+        pred[q0:q1] = sol_top[:, 0]
+        skor[q0:q1] = np.where(valid[:, 0], top_skor[:, 0], 0)
+        ref[q0:q1] = np.where(valid[:, 0], id_kasus[pos[:, 0]], None)
+        hit[q0:q1] = (sol_top == solusi[q0:q1, None]).any(axis=1)
+
+    benar = pred == solusi
+    logs = pd.DataFrame({
+        "ID": id_kasus, "Real": solusi, "Pred": pred, "Ref Case": ref,
+        "Similarity": np.round(skor, 1), "Match": np.where(benar, "✅", "❌")
+    })
+    confusion = pd.crosstab(pd.Series(solusi, name="Real"), pd.Series(pred, name="Pred").fillna("-"))
+    return {
+        "akurasi": float(np.average(benar, weights=bobot)) * 100,
+        "top_k": k,
+        "top_k_hit": float(np.average(hit, weights=bobot)) * 100,
+        "confusion": confusion,
+        "logs": logs
+    }
@@ -0,0 +1,231 @@
+import argparse
+import hashlib
+import json
+import os
+import struct
+import tempfile
+
+import numpy as np
+
+from cbr.casebase import CaseBase, _GrowArray, _KolomGejala, _KolomKode, _KolomString
+from cbr.storage import buka_storage
+
+# --- FORMAT BINER CASE BASE (.cbrbin) ---
+# [MAGIC 8 byte][panjang header uint64][header JSON][array-array, rata 64 byte]
+# Header berisi katalog (kecil), versi file sumber, dan lokasi tiap array.
+# Array dibuka pakai np.memmap read-only, jadi beberapa worker di satu host
+# berbagi page cache yang sama dan load tidak ikut lambat saat kasus bertambah.
+MAGIC = b"CBRBIN02"
+RATA = 64
+
+
+def path_biner(path_kasus):
+    return os.path.splitext(path_kasus)[0] + ".cbrbin"
+
+
+def _sha256(path, mulai=0, sampai=None):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        f.seek(mulai)
+        sisa = (sampai - mulai) if sampai is not None else None
+        while sisa is None or sisa > 0:
+            potong = f.read(1 << 20 if sisa is None else min(1 << 20, sisa))
+            if not potong:
+                break
+            h.update(potong)
+            if sisa is not None:
+                sisa -= len(potong)
+    return h.hexdigest()
+
+
+def _versi_sumber(path_gejala, path_solusi, storage, offset_kasus):
+    versi = {}
+    for nama, p in (("gejala", path_gejala), ("solusi", path_solusi)):
+        st = os.stat(p)
+        versi[nama] = {"mtime_ns": st.st_mtime_ns, "size": st.st_size, "sha256": _sha256(p)}
+    # Sidik storage di posisi kompilasi (CSV: hash 64 KB sebelum offset),
+    # cukup untuk deteksi storage ditulis ulang tanpa membaca semuanya
+    versi["kasus"] = {"offset": offset_kasus, "sidik": storage.sidik(offset_kasus)}
+    return versi
+
+
+def _dtype_indeks(n):
+    return np.uint16 if n <= np.iinfo(np.uint16).max else np.int32
+
+
+# --- TULIS ---
+def tulis_biner(cb, path_bin, versi):
+    n = len(cb)
+    # Snapshot index saat ini (posting_baru digabung dulu)
+    with cb.lock:
+        cb._bangun_posting()
+        solusi_tabel = sorted(set(cb.solusi_id))
+        kode_solusi = {s: i for i, s in enumerate(solusi_tabel)}
+        id_bytes = [x.encode("utf-8") for x in cb.id_kasus]
+        id_offset = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum([len(b) for b in id_bytes], out=id_offset[1:])
+
+        mentah = {}
+        for i in range(n):
+            dikenal = [cb.gejala_ids[j] for j in cb.indices[cb.indptr[i]:cb.indptr[i + 1]]]
+            if cb.gejala_kasus[i] != dikenal:
+                mentah[str(i)] = list(cb.gejala_kasus[i])
+
+        tipe_row = np.int32 if n < 2 ** 31 else np.int64
+        arrays = {
+            "indptr": np.asarray(cb.indptr, dtype=np.int64),
+            "indices": np.asarray(cb.indices, dtype=_dtype_indeks(len(cb.bobot))),
+            "data": np.asarray(cb.data, dtype=np.int32),
+            "rows": np.asarray(cb.rows, dtype=tipe_row),
+            "total_bobot_kasus": np.asarray(cb.total_bobot_kasus, dtype=np.float64),
+            "posting_rows": np.asarray(cb.posting_rows, dtype=tipe_row),
+            "posting_ptr": np.asarray(cb.posting_ptr, dtype=np.int64),
+            "solusi_kode": np.asarray([kode_solusi[s] for s in cb.solusi_id], dtype=np.int32),
+            "id_blob": np.frombuffer(b"".join(id_bytes), dtype=np.uint8),
+            "id_offset": id_offset,
+        }
+        header = {
+            "versi": versi,
+            "n_kasus": n,
+            "max_kelipatan": cb.max_kelipatan,
+            "gejala": cb.baris_gejala,
+            "solusi": cb.baris_solusi,
+            "solusi_tabel": solusi_tabel,
+            "gejala_mentah": mentah,
+            "arrays": {},
+        }
+
+    # Offset array dihitung setelah ukuran header diketahui
+    posisi = 0
+    for nama, arr in arrays.items():
+        header["arrays"][nama] = {"dtype": arr.dtype.str, "shape": list(arr.shape), "offset": posisi}
+        posisi += -(-arr.nbytes // RATA) * RATA
+    teks = json.dumps(header, ensure_ascii=False).encode("utf-8")
+    awal_data = -(-(len(MAGIC) + 8 + len(teks)) // RATA) * RATA
+
+    # Tulis ke file sementara lalu os.replace: pembaca lama tetap pegang inode lama
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path_bin) or ".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(MAGIC + struct.pack("<Q", len(teks)) + teks)
+            for nama, arr in arrays.items():
+                f.seek(awal_data + header["arrays"][nama]["offset"])
+                f.write(arr.tobytes())
+            f.truncate(awal_data + posisi)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path_bin)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+# --- BACA (MMAP, ZERO-COPY) ---
+def baca_header(path_bin):
+    with open(path_bin, "rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"Bukan file case base biner: {path_bin}")
+        panjang = struct.unpack("<Q", f.read(8))[0]
+        header = json.loads(f.read(panjang).decode("utf-8"))
+    header["_awal_data"] = -(-(len(MAGIC) + 8 + panjang) // RATA) * RATA
+    return header
+
+
+def buka_biner(path_bin, storage=None, header=None):
+    header = header or baca_header(path_bin)
+    arrays = {}
+    for nama, info in header["arrays"].items():
+        shape = tuple(info["shape"])
+        if shape[0] == 0:
+            arrays[nama] = np.empty(shape, dtype=np.dtype(info["dtype"]))
+        else:
+            arrays[nama] = np.memmap(path_bin, dtype=np.dtype(info["dtype"]), mode="r",
+                                     offset=header["_awal_data"] + info["offset"], shape=shape)
+
+    cb = CaseBase.__new__(CaseBase)
+    cb._set_katalog(header["gejala"], header["solusi"])
+    n = header["n_kasus"]
+    cb.id_kasus = _KolomString(arrays["id_blob"], arrays["id_offset"])
+    cb.solusi_id = _KolomKode(arrays["solusi_kode"], header["solusi_tabel"])
+    cb.gejala_kasus = _KolomGejala(n, cb, {int(i): g for i, g in header["gejala_mentah"].items()})
+    cb.max_kelipatan = header["max_kelipatan"]
+    cb._indptr = _GrowArray(arrays["indptr"])
+    cb._indices = _GrowArray(arrays["indices"])
+    cb._data = _GrowArray(arrays["data"])
+    cb._rows = _GrowArray(arrays["rows"])
+    cb._total = _GrowArray(arrays["total_bobot_kasus"])
+    cb.posting_rows = arrays["posting_rows"]
+    cb.posting_ptr = arrays["posting_ptr"]
+    cb.posting_baru = {}
+    cb.jumlah_posting_baru = 0
+    if storage is not None:
+        cb.storage = storage
+        cb.offset_kasus = header["versi"]["kasus"]["offset"]
+    return cb
+
+
+# --- VALIDASI & LOAD ---
+def _masih_valid(header, path_gejala, path_solusi, storage):
+    versi = header["versi"]
+    for nama, p in (("gejala", path_gejala), ("solusi", path_solusi)):
+        st = os.stat(p)
+        v = versi[nama]
+        if st.st_size != v["size"]:
+            return False
+        # mtime beda tapi isi sama (mis. habis git checkout) tetap valid
+        if st.st_mtime_ns != v["mtime_ns"] and _sha256(p) != v["sha256"]:
+            return False
+    offset = versi["kasus"]["offset"]
+    if storage.posisi_akhir() < offset:
+        return False
+    return storage.sidik(offset) == versi["kasus"]["sidik"]
+
+
+def kompilasi(path_gejala, path_solusi, path_kasus, path_bin=None):
+    path_bin = path_bin or path_biner(path_kasus)
+    cb = CaseBase.from_csv(path_gejala, path_solusi, path_kasus)
+    tulis_biner(cb, path_bin, _versi_sumber(path_gejala, path_solusi, cb.storage, cb.offset_kasus))
+    return path_bin
+
+
+def load_casebase(path_gejala, path_solusi, path_kasus, path_bin=None, maks_ekor=0.25):
+    # Pakai file biner kalau masih cocok dengan CSV sumber; baris kasus yang
+    # di-append setelah kompilasi dibaca lewat sync_kasus. Kompilasi ulang
+    # kalau katalog berubah, file kasus ditulis ulang, atau ekornya sudah besar.
+    path_bin = path_bin or path_biner(path_kasus)
+    storage = buka_storage(path_kasus)
+    try:
+        header = baca_header(path_bin)
+        valid = _masih_valid(header, path_gejala, path_solusi, storage)
+        offset = header["versi"]["kasus"]["offset"]
+        if valid and storage.posisi_akhir() - offset > max(storage.ekor_minimum, maks_ekor * offset):
+            valid = False
+    except (OSError, ValueError, KeyError):
+        valid = False
+    if not valid:
+        try:
+            kompilasi(path_gejala, path_solusi, path_kasus, path_bin)
+            header = baca_header(path_bin)
+        except OSError:
+            # Folder data read-only: tetap jalan dari CSV
+            return CaseBase.from_csv(path_gejala, path_solusi, path_kasus)
+    cb = buka_biner(path_bin, storage, header)
+    cb.sync_kasus()
+    return cb
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Kompilasi CSV case base ke format biner .cbrbin")
+    parser.add_argument("--domain", action="append", help="nama domain (default: semua domain di folder data)")
+    parser.add_argument("--data-dir", default=os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data"))
+    args = parser.parse_args(argv)
+    from cbr.domain import temukan_domain
+
+    daftar = temukan_domain(args.data_dir)
+    for domain in args.domain or list(daftar):
+        print(f"{domain}: {kompilasi(*daftar[domain].paths)}")
+
+
+if __name__ == "__main__":
+    main()
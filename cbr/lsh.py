@@ -0,0 +1,229 @@
+import argparse
+import heapq
+import json
+import threading
+import time
+from types import SimpleNamespace
+
+import numpy as np
+
+from cbr.engine import _dice, _hasil, _match_kandidat, _query, _retrieve_top_k, retrieve_top_k
+
+KOSONG = np.iinfo(np.uint32).max
+
+
+# --- MODE APROKSIMASI: WEIGHTED MINHASH + LSH BANDING ---
+# Bobot gejala integer, jadi weighted MinHash = MinHash biasa atas himpunan
+# yang tiap gejalanya diulang `bobot` kali. Peluang dua kasus punya nilai
+# MinHash sama = Jaccard berbobot J = match / (W_a + W_b - match), dan Dice
+# berbobot = 2J / (1 + J), jadi urutannya sama. Signature (band x baris
+# nilai) dipecah per band; kasus yang satu band-nya sama persis dengan query
+# jadi kandidat, lalu semua kandidat diskor ulang persis (_dice).
+#   band naik  -> recall naik, kandidat (latensi) naik
+#   baris naik -> kandidat makin sedikit, recall untuk kasus mirip-jauh turun
+# Kandidat berskor > 0 kurang dari k -> jatuh ke pencarian eksak.
+# Index dibangun dari snapshot dan disimpan sebagai satu objek `_indeks`
+# yang tidak pernah diubah. Bangun ulang (ekor sudah besar) jalan di thread
+# background lalu `_indeks` diganti sekaligus; selama itu query memakai index
+# lama dan kasus ekor (row >= _indeks.n) tetap diskor persis.
+class IndeksLSH:
+    def __init__(self, cb, band=20, baris=3, seed=0, blok=65536):
+        self.cb = cb
+        self.band = band
+        self.baris = baris
+        self.seed = seed
+        self.blok = blok
+        self.n_query = 0
+        self.n_kandidat = 0
+        self.n_eksak = 0
+        self.n_bangun = 0
+        self._lock = threading.Lock()
+        self._thread = None
+        self._indeks = self._bangun(cb.snapshot())
+
+    def _bangun(self, snap):
+        mulai = time.perf_counter()
+        h = self.band * self.baris
+        rng = np.random.default_rng(self.seed)
+        # MinHash per gejala = min dari `bobot` nilai acak (satu per salinan)
+        hash_gejala = np.full((len(snap.bobot), h), KOSONG, dtype=np.uint32)
+        for j, w in enumerate(snap.bobot.tolist()):
+            if w > 0:
+                hash_gejala[j] = rng.integers(0, KOSONG, size=(w, h), dtype=np.uint32).min(axis=0)
+        indeks = SimpleNamespace(
+            hash_gejala=hash_gejala, n=snap.n,
+            pengali=rng.integers(1, 2 ** 63, size=(self.band, self.baris), dtype=np.uint64) | np.uint64(1))
+
+        kunci = np.empty((self.band, snap.n), dtype=np.uint32)
+        for r0 in range(0, snap.n, self.blok):
+            r1 = min(r0 + self.blok, snap.n)
+            kunci[:, r0:r1] = self._kunci(indeks, self._signature(indeks, snap, r0, r1)).T
+        # Per band: kunci terurut + row-nya, lookup pakai searchsorted
+        indeks.urutan = np.argsort(kunci, axis=1, kind="stable").astype(np.int32)
+        indeks.kunci = np.take_along_axis(kunci, indeks.urutan, axis=1)
+        indeks.detik_bangun = time.perf_counter() - mulai
+        return indeks
+
+    def _bangun_ulang(self):
+        try:
+            indeks = self._bangun(self.cb.snapshot())
+            self._indeks = indeks
+            self.n_bangun += 1
+        finally:
+            with self._lock:
+                self._thread = None
+
+    def _cek_ekor(self, n):
+        # Ekor sudah besar -> bangun ulang di background (amortized, seperti
+        # posting list); paling banyak satu thread bangun sekaligus
+        if n - self._indeks.n <= max(1024, self._indeks.n // 8):
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._bangun_ulang, name="cbr-lsh-bangun", daemon=True)
+                self._thread.start()
+
+    def tunggu(self, timeout=None):
+        with self._lock:
+            thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+        return self._thread is None
+
+    @property
+    def n(self):
+        return self._indeks.n
+
+    @property
+    def detik_bangun(self):
+        return self._indeks.detik_bangun
+
+    def _signature(self, indeks, snap, r0, r1):
+        sig = np.full((r1 - r0, self.band * self.baris), KOSONG, dtype=np.uint32)
+        lo, hi = snap.indptr[r0], snap.indptr[r1]
+        ada = np.diff(snap.indptr[r0:r1 + 1]) > 0
+        if hi > lo:
+            # reduceat cuma atas baris yang punya gejala (segmen kosong tidak didukung)
+            awal = (snap.indptr[r0:r1] - lo)[ada]
+            sig[ada] = np.minimum.reduceat(indeks.hash_gejala[snap.indices[lo:hi]], awal, axis=0)
+        return sig
+
+    def _kunci(self, indeks, sig):
+        # (m, band*baris) -> (m, band); overflow uint64 memang disengaja
+        s = sig.reshape(len(sig), self.band, self.baris).astype(np.uint64)
+        return ((s * indeks.pengali[None]).sum(axis=2) >> np.uint64(32)).astype(np.uint32)
+
+    @property
+    def nbytes(self):
+        indeks = self._indeks
+        return indeks.kunci.nbytes + indeks.urutan.nbytes + indeks.hash_gejala.nbytes
+
+    def kandidat(self, user_gejala, snap=None, indeks=None):
+        snap = self.cb.snapshot() if snap is None else snap
+        indeks = self._indeks if indeks is None else indeks
+        cols = sorted({snap.gejala_pos[g] for g in user_gejala if g in snap.gejala_pos})
+        if not cols:
+            return None
+        kunci = self._kunci(indeks, indeks.hash_gejala[cols].min(axis=0)[None])[0]
+        bagian = []
+        for j in range(self.band):
+            a = np.searchsorted(indeks.kunci[j], kunci[j], "left")
+            b = np.searchsorted(indeks.kunci[j], kunci[j], "right")
+            if b > a:
+                bagian.append(indeks.urutan[j, a:b])
+        # Kasus yang ditambahkan setelah index dibangun selalu ikut diskor
+        bagian.append(np.arange(indeks.n, snap.n, dtype=np.int32))
+        return np.unique(np.concatenate(bagian)).astype(np.int64)
+
+    def retrieve_top_k(self, user_gejala, k=1):
+        # Tanpa cb.lock: skor dari snapshot, index dibaca sekali (bisa diganti
+        # thread bangun ulang kapan saja, snapshot selalu >= index.n)
+        indeks = self._indeks
+        snap = self.cb.snapshot()
+        self._cek_ekor(snap.n)
+        self.n_query += 1
+        kandidat = self.kandidat(user_gejala, snap, indeks)
+        if kandidat is not None and len(kandidat):
+            self.n_kandidat += len(kandidat)
+            query, total_bobot_user = _query(user_gejala, snap)
+            similarity = _dice(_match_kandidat(snap, kandidat, query), snap.total_bobot_kasus[kandidat],
+                               total_bobot_user)
+            top = heapq.nsmallest(k, zip(-similarity, kandidat.tolist()))
+            top = [(-s, i) for s, i in top if s < 0]
+            if len(top) >= k:
+                return _hasil(snap, [i for _, i in top], [s for s, _ in top])
+        self.n_eksak += 1
+        return _retrieve_top_k(user_gejala, snap, k)
+
+    def statistik(self):
+        return {"band": self.band, "baris": self.baris, "kasus_terindeks": self.n, "memori_mb": self.nbytes / 2 ** 20,
+                "bangun_s": self.detik_bangun, "bangun_ulang": self.n_bangun, "query": self.n_query,
+                "kandidat_rata": self.n_kandidat / self.n_query if self.n_query else 0.0,
+                "jatuh_ke_eksak": self.n_eksak}
+
+
+# --- LAPORAN RECALL vs ENGINE EKSAK ---
+# Recall@k sadar-seri: hasil aproksimasi dihitung benar kalau skornya >=
+# skor ke-k hasil eksak (kasus lain dengan skor sama sama baiknya).
+def ukur_recall(cb, queries, k=5, **param):
+    indeks = IndeksLSH(cb, **param)
+    recall, top1, durasi_eksak, durasi_lsh = [], [], [], []
+    for q in queries:
+        t = time.perf_counter()
+        eksak = retrieve_top_k(q, cb, k, eksak=True)
+        durasi_eksak.append(time.perf_counter() - t)
+        t = time.perf_counter()
+        aproks = indeks.retrieve_top_k(q, k)
+        durasi_lsh.append(time.perf_counter() - t)
+        if not eksak:
+            continue
+        batas = eksak[-1]["similarity"]
+        recall.append(min(len(eksak), sum(h["similarity"] >= batas for h in aproks)) / len(eksak))
+        top1.append(bool(aproks) and aproks[0]["similarity"] == eksak[0]["similarity"])
+    stat = indeks.statistik()
+    p50_eksak = float(np.median(durasi_eksak)) * 1000 if durasi_eksak else 0.0
+    p50_lsh = float(np.median(durasi_lsh)) * 1000 if durasi_lsh else 0.0
+    return {
+        **stat, "k": k, "n_query": len(recall),
+        "recall_at_k": float(np.mean(recall)) if recall else None,
+        "top1_sama": float(np.mean(top1)) if top1 else None,
+        "kandidat_persen": 100 * stat["kandidat_rata"] / max(len(cb), 1),
+        "eksak_p50_ms": p50_eksak, "lsh_p50_ms": p50_lsh,
+        "speedup": p50_eksak / p50_lsh if p50_lsh else None,
+    }
+
+
+def main(argv=None):
+    from cbr.batch import DATA_DIR, baca_input
+    from cbr.domain import nama_domain, temukan_domain
+    from cbr.kompilasi import load_casebase
+
+    parser = argparse.ArgumentParser(description="Ukur recall & latensi mode LSH dibanding engine eksak")
+    parser.add_argument("--domain", help="nama domain (default: domain pertama)")
+    parser.add_argument("--data-dir", default=DATA_DIR)
+    parser.add_argument("--band", default="20", help="satu nilai atau daftar, mis. 10,20,40")
+    parser.add_argument("--baris", default="3", help="satu nilai atau daftar, mis. 2,3,4")
+    parser.add_argument("-k", type=int, default=5)
+    parser.add_argument("--query", type=int, default=500, help="jumlah query sampel (dari gejala kasus yang ada)")
+    parser.add_argument("--input", help="file query .csv/.jsonl (format cbr.batch) sebagai ganti sampel")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    daftar = temukan_domain(args.data_dir)
+    args.domain = nama_domain(daftar, args.domain)
+    cb = load_casebase(*daftar[args.domain].paths)
+    if args.input:
+        queries = [ids for _, ids in baca_input(args.input)]
+    else:
+        rng = np.random.default_rng(args.seed)
+        queries = [list(cb.gejala_kasus[int(i)]) for i in rng.integers(0, len(cb), min(args.query, len(cb)))]
+    # Tiap kombinasi satu baris JSON; pilih yang recall-nya cukup lalu
+    # pasang di data/domains.json: "lsh": {"band": .., "baris": ..}
+    for band in (int(b) for b in args.band.split(",")):
+        for baris in (int(r) for r in args.baris.split(",")):
+            print(json.dumps({"domain": args.domain, **ukur_recall(cb, queries, args.k, band=band, baris=baris,
+                                                                   seed=args.seed)}))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,192 @@
+import atexit
+import contextlib
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+
+# --- INSTRUMENTASI (OPT-IN) ---
+# Mati secara default: ukur() mengembalikan context kosong, jadi biaya di jalur
+# panas cuma satu cek boolean. Nyalakan lewat env atau aktifkan():
+#   CBR_METRIK=1                timer & counter per tahap (load, retrieve, ...)
+#   CBR_METRIK_FILE=path.jsonl  tambah snapshot JSONL tiap CBR_METRIK_INTERVAL detik
+#   CBR_PROFIL=path.txt         profiler sampling jalan sejak start, stack ditulis saat exit
+BUCKET = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+_KOSONG = contextlib.nullcontext()
+
+
+class _Timer:
+    __slots__ = ("metrik", "nama", "mulai")
+
+    def __init__(self, metrik, nama):
+        self.metrik = metrik
+        self.nama = nama
+
+    def __enter__(self):
+        self.mulai = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.metrik.catat(self.nama, time.perf_counter() - self.mulai)
+        return False
+
+
+class Metrik:
+    def __init__(self, aktif=False):
+        self.aktif = aktif
+        self._lock = threading.Lock()
+        self._tahap = {}
+        self._counter = Counter()
+
+    def ukur(self, nama):
+        return _Timer(self, nama) if self.aktif else _KOSONG
+
+    def catat(self, nama, durasi):
+        with self._lock:
+            t = self._tahap.get(nama)
+            if t is None:
+                t = self._tahap[nama] = {"n": 0, "total_s": 0.0, "maks_s": 0.0, "bucket": [0] * len(BUCKET)}
+            t["n"] += 1
+            t["total_s"] += durasi
+            t["maks_s"] = max(t["maks_s"], durasi)
+            for i, batas in enumerate(BUCKET):
+                if durasi <= batas:
+                    t["bucket"][i] += 1
+                    break
+
+    def tambah(self, nama, n=1):
+        if self.aktif:
+            with self._lock:
+                self._counter[nama] += n
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "tahap": {nama: dict(t, bucket=list(t["bucket"])) for nama, t in self._tahap.items()},
+                "counter": dict(self._counter),
+            }
+
+    def reset(self):
+        with self._lock:
+            self._tahap.clear()
+            self._counter.clear()
+
+    def prometheus(self):
+        # Format teks eksposisi Prometheus (histogram kumulatif per tahap)
+        snap = self.snapshot()
+        baris = ["# HELP cbr_tahap_detik Durasi tiap tahap diagnosis", "# TYPE cbr_tahap_detik histogram"]
+        for nama, t in sorted(snap["tahap"].items()):
+            kumulatif = 0
+            for batas, n in zip(BUCKET, t["bucket"]):
+                kumulatif += n
+                baris.append(f'cbr_tahap_detik_bucket{{tahap="{nama}",le="{batas}"}} {kumulatif}')
+            baris.append(f'cbr_tahap_detik_bucket{{tahap="{nama}",le="+Inf"}} {t["n"]}')
+            baris.append(f'cbr_tahap_detik_sum{{tahap="{nama}"}} {t["total_s"]}')
+            baris.append(f'cbr_tahap_detik_count{{tahap="{nama}"}} {t["n"]}')
+        baris += ["# HELP cbr_total Counter kejadian", "# TYPE cbr_total counter"]
+        for nama, n in sorted(snap["counter"].items()):
+            baris.append(f'cbr_total{{nama="{nama}"}} {n}')
+        return "\n".join(baris) + "\n"
+
+
+# --- SNAPSHOT JSONL BERKALA ---
+class PenulisJsonl:
+    def __init__(self, metrik, path, interval=10.0):
+        self.metrik = metrik
+        self.path = path
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._jalan, name="metrik-jsonl", daemon=True)
+        self._thread.start()
+        atexit.register(self.tutup)
+
+    def _jalan(self):
+        while not self._stop.wait(self.interval):
+            self.tulis()
+
+    def tulis(self):
+        baris = json.dumps({"waktu": datetime.now().isoformat(timespec="seconds"), "pid": os.getpid(),
+                            **self.metrik.snapshot()}) + "\n"
+        fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, baris.encode("utf-8"))
+        finally:
+            os.close(fd)
+
+    def tutup(self):
+        if self._thread.is_alive():
+            self._stop.set()
+            self._thread.join(timeout=5)
+            self.tulis()
+
+
+# --- PROFILER SAMPLING ---
+# Tiap interval ambil stack semua thread (sys._current_frames), hasilnya format
+# "collapsed" (frame;frame;frame jumlah) yang bisa langsung dibaca flamegraph.pl
+# / speedscope. Tidak perlu memasang hook di kode yang diprofil.
+class ProfilerSampling:
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self.stack = Counter()
+        self.sampel = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def jalan(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def mulai(self):
+        if self.jalan:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._jalan, name="profiler-sampling", daemon=True)
+        self._thread.start()
+
+    def _jalan(self):
+        sendiri = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            nama_thread = {t.ident: t.name for t in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == sendiri:
+                    continue
+                bagian = []
+                while frame is not None:
+                    kode = frame.f_code
+                    bagian.append(f"{kode.co_name} ({os.path.basename(kode.co_filename)}:{kode.co_firstlineno})")
+                    frame = frame.f_back
+                bagian.append(nama_thread.get(ident, str(ident)))
+                self.stack[";".join(reversed(bagian))] += 1
+            self.sampel += 1
+
+    def hentikan(self):
+        if self.jalan:
+            self._stop.set()
+            self._thread.join(timeout=5)
+        return self.collapsed()
+
+    def collapsed(self):
+        return "".join(f"{s} {n}\n" for s, n in self.stack.most_common())
+
+    def tulis(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(self.collapsed())
+
+
+# --- INSTANCE PROSES ---
+METRIK = Metrik(aktif=os.environ.get("CBR_METRIK", "") not in ("", "0"))
+PROFILER = ProfilerSampling()
+
+ukur = METRIK.ukur
+tambah = METRIK.tambah
+
+if os.environ.get("CBR_METRIK_FILE"):
+    METRIK.aktif = True
+    PenulisJsonl(METRIK, os.environ["CBR_METRIK_FILE"], float(os.environ.get("CBR_METRIK_INTERVAL", "10")))
+
+if os.environ.get("CBR_PROFIL"):
+    PROFILER.mulai()
+    atexit.register(lambda: (PROFILER.hentikan(), PROFILER.tulis(os.environ["CBR_PROFIL"])))
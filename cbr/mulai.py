@@ -0,0 +1,206 @@
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from cbr.metrik import METRIK
+
+# Modul ini sengaja cuma import stdlib + cbr.metrik: app.py mengimpornya
+# saat landing page, jadi pandas/numpy/engine belum boleh ikut ter-load.
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data")
+
+
+# --- STARTUP MALAS: PEMANASAN DI THREAD BACKGROUND ---
+# Selagi landing page tampil, thread ini import engine + modul data (pandas,
+# numpy), membuat registry & cache query, lalu load index domain pertama
+# (atau `domain`) dan menyiapkan banner yang dipakai domain di manifest.
+# Halaman diagnosis tinggal ambil registry()/query_cache()/aset(); kalau
+# pemanasan belum selesai, ia menunggu.
+# Load index domain yang sama dari dua thread aman: registry mengunci per
+# domain, jadi thread kedua menunggu lalu memakai hasil yang pertama.
+class Pemanasan:
+    def __init__(self, data_dir=DATA_DIR, domain=None, folder_gambar=None, folder_static=None):
+        self.data_dir = data_dir
+        self.domain = domain
+        self.folder_gambar = folder_gambar
+        self.folder_static = folder_static
+        self.waktu = {}
+        self.galat = None
+        self._registry = None
+        self._cache = None
+        self._aset = {}
+        self._siap = threading.Event()
+        self._mulai = time.perf_counter()
+        self._thread = threading.Thread(target=self._jalan, name="cbr-pemanasan", daemon=True)
+        self._thread.start()
+
+    def _catat(self, nama, mulai):
+        durasi = time.perf_counter() - mulai
+        self.waktu[nama] = round(durasi, 4)
+        if METRIK.aktif:
+            METRIK.catat(f"pemanasan_{nama}", durasi)
+
+    def _jalan(self):
+        try:
+            t = time.perf_counter()
+            from cbr.cache import QueryCache
+            from cbr.domain import RegistryDomain
+            self._catat("import_s", t)
+            self._cache = QueryCache()
+            self._registry = RegistryDomain(self.data_dir, saat_buang=self._cache.invalidasi)
+            self._siap.set()
+
+            daftar = self._registry.daftar()
+            nama = self.domain if self.domain in daftar else next(iter(daftar), None)
+            if nama is not None:
+                t = time.perf_counter()
+                self._registry.casebase(nama)
+                self._catat("index_s", t)
+            if self.folder_gambar and self.folder_static:
+                from cbr.aset import siapkan_folder
+                t = time.perf_counter()
+                banner = {dom.banner for dom in daftar.values() if dom.banner}
+                self._aset = siapkan_folder(self.folder_gambar, self.folder_static, nama=banner)
+                self._catat("aset_s", t)
+        except Exception as e:
+            self.galat = e
+        finally:
+            self._siap.set()
+            self._catat("total_s", self._mulai)
+
+    @property
+    def selesai(self):
+        return not self._thread.is_alive()
+
+    def tunggu(self, timeout=None):
+        self._thread.join(timeout)
+        return self.selesai
+
+    def registry(self):
+        self._siap.wait()
+        if self._registry is None:
+            raise RuntimeError(f"Pemanasan gagal: {self.galat!r}")
+        return self._registry
+
+    def query_cache(self):
+        self.registry()
+        return self._cache
+
+    def aset(self):
+        # Peta banner -> file di folder static; kosong kalau pemanasan gagal
+        # (UI jatuh ke data URI / gambar online)
+        self.tunggu()
+        return self._aset
+
+    def statistik(self):
+        return {"selesai": self.selesai, "galat": None if self.galat is None else repr(self.galat), **self.waktu}
+
+
+# --- BENCHMARK COLD START ---
+# Tiap run = interpreter baru (subprocess), meniru replika baru yang start:
+#   landing_s           import yang dibutuhkan landing page (streamlit + modul ini)
+#   registry_s          sampai registry siap (import engine/pandas di thread)
+#   index_s             sampai index domain ter-load (tunggu pemanasan)
+#   diagnosa_pertama_s  satu retrieve_top_k lewat cache query
+#   ke_diagnosa_s       total dari awal proses sampai hasil diagnosis pertama
+# Run pertama tanpa .cbrbin (kompilasi dari CSV, replika benar-benar baru),
+# run berikutnya memakai .cbrbin hasil run pertama.
+_SKRIP = r"""
+import json, sys, time
+t0 = time.perf_counter()
+import streamlit
+from cbr.mulai import Pemanasan
+landing = time.perf_counter()
+pandas_di_landing = "pandas" in sys.modules
+data_dir, domain = sys.argv[1], sys.argv[2] or None
+p = Pemanasan(data_dir, domain)
+reg = p.registry()
+cache = p.query_cache()
+registry = time.perf_counter()
+nama = domain or next(iter(reg.daftar()))
+cb = reg.casebase(nama)
+index = time.perf_counter()
+hasil = cache.retrieve_top_k(list(cb.gejala_kasus[0]), cb, k=1)
+diagnosa = time.perf_counter()
+p.tunggu()
+print(json.dumps({
+    "domain": nama, "kasus": len(cb), "hasil": bool(hasil), "pandas_di_landing": pandas_di_landing,
+    "landing_s": landing - t0, "registry_s": registry - landing, "index_s": index - registry,
+    "diagnosa_pertama_s": diagnosa - index, "ke_diagnosa_s": diagnosa - t0, "pemanasan": p.statistik(),
+}))
+"""
+FASE = ("landing_s", "registry_s", "index_s", "diagnosa_pertama_s", "ke_diagnosa_s", "proses_s")
+
+
+def _jalankan_sekali(data_dir, domain):
+    akar = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [akar, os.environ.get("PYTHONPATH")])))
+    t = time.perf_counter()
+    keluaran = subprocess.run([sys.executable, "-c", _SKRIP, data_dir, domain or ""], env=env, cwd=akar,
+                              check=True, capture_output=True, text=True).stdout
+    hasil = json.loads(keluaran.strip().splitlines()[-1])
+    # Termasuk start interpreter & shutdown
+    hasil["proses_s"] = time.perf_counter() - t
+    return hasil
+
+
+def ukur_startup(data_dir=DATA_DIR, domain=None, ulang=5):
+    # Data disalin ke folder sementara tanpa .cbrbin: file asli tidak tersentuh
+    with tempfile.TemporaryDirectory(prefix="cbr-startup-") as tmp:
+        salinan = os.path.join(tmp, "data")
+        shutil.copytree(data_dir, salinan, ignore=shutil.ignore_patterns("*.cbrbin", "*.lock", "riwayat_*"))
+        dingin = _jalankan_sekali(salinan, domain)
+        hangat = [_jalankan_sekali(salinan, domain) for _ in range(ulang)]
+    return {
+        "domain": dingin["domain"],
+        "kasus": dingin["kasus"],
+        "pandas_di_landing": dingin["pandas_di_landing"] or any(h["pandas_di_landing"] for h in hangat),
+        "dingin": {f: round(dingin[f], 4) for f in FASE},
+        "hangat_p50": {f: round(statistics.median(h[f] for h in hangat), 4) for f in FASE} if hangat else None,
+        "pemanasan_dingin": dingin["pemanasan"],
+    }
+
+
+def cek_anggaran(hasil, anggaran_landing=None, anggaran_diagnosa=None):
+    # Anggaran dicek terhadap run dingin (kasus terburuk replika baru)
+    lewat = []
+    if hasil["pandas_di_landing"]:
+        lewat.append("pandas ter-import saat landing page")
+    if anggaran_landing is not None and hasil["dingin"]["landing_s"] > anggaran_landing:
+        lewat.append(f"landing_s {hasil['dingin']['landing_s']:.3f} > {anggaran_landing}")
+    if anggaran_diagnosa is not None and hasil["dingin"]["ke_diagnosa_s"] > anggaran_diagnosa:
+        lewat.append(f"ke_diagnosa_s {hasil['dingin']['ke_diagnosa_s']:.3f} > {anggaran_diagnosa}")
+    return lewat
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark cold start: waktu import & waktu sampai diagnosis pertama")
+    parser.add_argument("--domain", help="domain yang didiagnosis (default: domain pertama)")
+    parser.add_argument("--data-dir", default=DATA_DIR)
+    parser.add_argument("--ulang", type=int, default=5, help="jumlah run hangat (pakai .cbrbin)")
+    parser.add_argument("--anggaran-landing", type=float, default=1.5, help="batas detik import landing page")
+    parser.add_argument("--anggaran-diagnosa", type=float, default=5.0,
+                        help="batas detik dari start proses sampai diagnosis pertama")
+    parser.add_argument("-o", "--output", help="simpan hasil JSON ke file ini")
+    args = parser.parse_args(argv)
+
+    hasil = ukur_startup(args.data_dir, args.domain, args.ulang)
+    hasil["anggaran"] = {"landing_s": args.anggaran_landing, "ke_diagnosa_s": args.anggaran_diagnosa}
+    hasil["lewat_anggaran"] = cek_anggaran(hasil, args.anggaran_landing, args.anggaran_diagnosa)
+    teks = json.dumps(hasil, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(teks + "\n")
+    print(teks)
+    if hasil["lewat_anggaran"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,252 @@
+import atexit
+import contextlib
+import itertools
+import multiprocessing as mp
+import os
+import queue
+import threading
+import traceback
+from multiprocessing import shared_memory
+from types import SimpleNamespace
+
+import numpy as np
+
+from cbr.batch import _format_hasil, skor_chunk
+from cbr.engine import _dice, _hasil, _query, top_k_baris
+from cbr.evaluasi import _Indeks
+
+# Worker sudah paralel antar proses, BLAS di dalamnya cukup satu thread
+VAR_BLAS = ("OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS", "VECLIB_MAXIMUM_THREADS")
+
+
+# --- SHARD CSR DI SHARED MEMORY ---
+# Satu shard = rentang baris kasus [r0, r1) yang dipotong dari CSR, semua
+# array-nya dikemas dalam satu blok shared memory. Worker cuma attach
+# (tanpa salin), jadi memori total tetap ~1x ukuran index.
+def potong_shard(snap, r0, r1):
+    lo, hi = snap.indptr[r0], snap.indptr[r1]
+    return {
+        "indptr": snap.indptr[r0:r1 + 1] - lo,
+        "indices": snap.indices[lo:hi],
+        "data": snap.data[lo:hi],
+        "rows": snap.rows[lo:hi] - r0,
+        "total": snap.total_bobot_kasus[r0:r1],
+    }
+
+
+def _kemas(arrays):
+    layout = []
+    ukuran = 0
+    for nama, arr in arrays.items():
+        layout.append((nama, arr.dtype.str, arr.shape, ukuran))
+        ukuran += -(-arr.nbytes // 64) * 64
+    shm = shared_memory.SharedMemory(create=True, size=max(ukuran, 1))
+    for (_, dtype, shape, offset), arr in zip(layout, arrays.values()):
+        np.ndarray(shape, dtype, shm.buf, offset)[...] = arr
+    return shm, layout
+
+
+def _snap_shard(arrays, bobot, gejala_pos):
+    return SimpleNamespace(n=len(arrays["total"]), bobot=bobot, gejala_pos=gejala_pos,
+                           indptr=arrays["indptr"], indices=arrays["indices"], data=arrays["data"],
+                           rows=arrays["rows"], total_bobot_kasus=arrays["total"])
+
+
+def _top_k_satu(snap, user_gejala, k):
+    # Skor persis seperti engine._skor (bincount + _dice), top-k seri -> row kecil
+    query, total_bobot_user = _query(user_gejala, snap)
+    match = np.bincount(snap.rows, weights=snap.data * query[snap.indices], minlength=snap.n)
+    sim = _dice(match, snap.total_bobot_kasus, total_bobot_user)
+    pos = top_k_baris(sim[None, :], k)
+    return np.take_along_axis(sim[None, :], pos, axis=1), pos
+
+
+def _skor(snap, jenis, daftar_gejala, k, idx=None):
+    if snap.n == 0:
+        return np.empty((len(daftar_gejala), 0)), np.empty((len(daftar_gejala), 0), dtype=np.int64)
+    if jenis == "satu":
+        return _top_k_satu(snap, daftar_gejala[0], k)
+    return skor_chunk(daftar_gejala, snap, k, idx)
+
+
+def _worker(indeks, masuk, keluar, nama_shm, layout, r0, bobot, gejala_pos):
+    shm = shared_memory.SharedMemory(name=nama_shm)
+    try:
+        snap = _snap_shard({nama: np.ndarray(shape, dtype, shm.buf, offset)
+                            for nama, dtype, shape, offset in layout}, bobot, gejala_pos)
+        # Index CSC untuk batch dibangun sekali per worker, dipakai semua tugas
+        idx = _Indeks(snap) if snap.n else None
+        while True:
+            tugas = masuk.get()
+            if tugas is None:
+                break
+            id_tugas, jenis, daftar_gejala, k = tugas
+            try:
+                skor, row = _skor(snap, jenis, daftar_gejala, k, idx)
+                keluar.put((id_tugas, indeks, skor, row + r0))
+            except Exception:
+                keluar.put((id_tugas, indeks, None, traceback.format_exc()))
+        del snap, idx
+    finally:
+        shm.close()
+
+
+@contextlib.contextmanager
+def _blas_satu_thread():
+    # Env dibaca numpy saat import di proses anak (start method spawn)
+    lama = {v: os.environ.get(v) for v in VAR_BLAS}
+    os.environ.update({v: "1" for v in VAR_BLAS})
+    try:
+        yield
+    finally:
+        for v, nilai in lama.items():
+            if nilai is None:
+                os.environ.pop(v, None)
+            else:
+                os.environ[v] = nilai
+
+
+def _gabung(hasil, k):
+    # hasil per shard urut row, jadi posisi gabungan = urutan row untuk skor seri
+    skor = np.concatenate([s for s, _ in hasil], axis=1)
+    row = np.concatenate([r for _, r in hasil], axis=1)
+    if skor.shape[1] == 0:
+        return skor, row
+    pos = top_k_baris(skor, k)
+    return np.take_along_axis(skor, pos, axis=1), np.take_along_axis(row, pos, axis=1)
+
+
+# --- POOL PROSES PER SHARD ---
+# Case base dipecah jadi `shard` rentang baris dengan jumlah gejala (nnz)
+# seimbang, satu proses per shard. Query di-broadcast ke semua shard, tiap
+# shard mengembalikan top-k lokal, lalu digabung di sini. Hasilnya identik
+# dengan hitung_similarity(...)[:k] / diagnosa_batch satu proses. Kasus yang
+# ditambahkan setelah pool dibuat diskor di proses ini (ekor), jadi pool
+# tidak perlu dibangun ulang tiap append.
+class PoolShard:
+    def __init__(self, cb, shard=None, konteks="spawn"):
+        self.cb = cb
+        snap = cb.snapshot()
+        self.n = snap.n
+        shard = max(1, min(shard or os.cpu_count() or 1, snap.n))
+        nnz = int(snap.indptr[snap.n])
+        batas = np.searchsorted(snap.indptr[:snap.n + 1], np.linspace(0, nnz, shard + 1))
+        batas[0], batas[-1] = 0, snap.n
+        self.batas = [int(b) for b in np.unique(batas)] if snap.n else []
+
+        ctx = mp.get_context(konteks)
+        self._keluar = ctx.Queue()
+        self._masuk = []
+        self._proses = []
+        self._shm = []
+        self._id = itertools.count()
+        self._lock = threading.Lock()
+        self._tertunda = {}
+        with _blas_satu_thread():
+            for i, (r0, r1) in enumerate(zip(self.batas, self.batas[1:])):
+                shm, layout = _kemas(potong_shard(snap, r0, r1))
+                masuk = ctx.Queue()
+                p = ctx.Process(target=_worker, name=f"cbr-shard-{i}", daemon=True,
+                                args=(i, masuk, self._keluar, shm.name, layout, r0, snap.bobot, snap.gejala_pos))
+                p.start()
+                self._shm.append(shm)
+                self._masuk.append(masuk)
+                self._proses.append(p)
+        atexit.register(self.tutup)
+
+    @property
+    def shard(self):
+        return len(self._proses)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.tutup()
+        return False
+
+    def tutup(self):
+        for masuk, p in zip(self._masuk, self._proses):
+            if p.is_alive():
+                masuk.put(None)
+        for p in self._proses:
+            p.join(timeout=5)
+            if p.is_alive():
+                p.terminate()
+        for shm in self._shm:
+            shm.close()
+            shm.unlink()
+        self._proses, self._masuk, self._shm = [], [], []
+
+    # --- Kirim / terima ---
+    def _kirim(self, jenis, daftar_gejala, k):
+        id_tugas = next(self._id)
+        for masuk in self._masuk:
+            masuk.put((id_tugas, jenis, daftar_gejala, k))
+        return id_tugas
+
+    def _terima(self, id_tugas):
+        while len(self._tertunda.get(id_tugas, ())) < self.shard:
+            try:
+                id_lain, indeks, skor, row = self._keluar.get(timeout=1)
+            except queue.Empty:
+                if not all(p.is_alive() for p in self._proses):
+                    raise RuntimeError("Worker shard berhenti")
+                continue
+            if skor is None:
+                raise RuntimeError(f"Worker shard {indeks} gagal:\n{row}")
+            self._tertunda.setdefault(id_lain, {})[indeks] = (skor, row)
+        hasil = self._tertunda.pop(id_tugas)
+        return [hasil[i] for i in range(self.shard)]
+
+    def _ekor(self, jenis, daftar_gejala, k):
+        # Kasus baru setelah pool dibuat: diskor langsung di proses ini
+        snap = self.cb.snapshot()
+        if snap.n <= self.n:
+            return []
+        arrays = potong_shard(snap, self.n, snap.n)
+        skor, row = _skor(_snap_shard(arrays, snap.bobot, snap.gejala_pos), jenis, daftar_gejala, k)
+        return [(skor, row + self.n)]
+
+    def _hitung(self, jenis, daftar_gejala, k, id_tugas=None):
+        if id_tugas is None:
+            id_tugas = self._kirim(jenis, daftar_gejala, k) if self._proses else None
+        hasil = self._terima(id_tugas) if id_tugas is not None else []
+        hasil += self._ekor(jenis, daftar_gejala, k)
+        if not hasil:
+            b = len(daftar_gejala)
+            return np.empty((b, 0)), np.empty((b, 0), dtype=np.int64)
+        return _gabung(hasil, k)
+
+    # --- API ---
+    def retrieve_top_k(self, user_gejala, k=1):
+        # Sama dengan engine.retrieve_top_k / hitung_similarity(...)[:k]
+        if k <= 0:
+            return []
+        with self._lock:
+            skor, row = self._hitung("satu", [list(user_gejala)], k)
+        return _hasil(self.cb, row[0].tolist(), skor[0])
+
+    def skor_batch(self, daftar_gejala, k=1):
+        # Sama dengan batch.skor_chunk(daftar_gejala, cb.snapshot(), k)
+        with self._lock:
+            return self._hitung("batch", [list(g) for g in daftar_gejala], k)
+
+    def diagnosa_batch(self, queries, k=1, chunk=1024, antre=2):
+        # Sama dengan batch.diagnosa_batch; `antre` chunk dikirim duluan
+        # supaya worker tidak menganggur menunggu hasil digabung
+        it = iter(queries)
+        with self._lock:
+            jalan = []
+            while True:
+                while len(jalan) < antre:
+                    potong = list(itertools.islice(it, chunk))
+                    if not potong:
+                        break
+                    daftar = [list(ids) for _, ids in potong]
+                    jalan.append((potong, self._kirim("batch", daftar, k) if self._proses else None))
+                if not jalan:
+                    break
+                potong, id_tugas = jalan.pop(0)
+                skor, row = self._hitung("batch", [ids for _, ids in potong], k, id_tugas)
+                yield from _format_hasil(potong, self.cb.snapshot(), skor, row)
@@ -0,0 +1,255 @@
+import argparse
+import json
+import os
+import time
+from collections import Counter
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from cbr.casebase import CaseBase
+from cbr.evaluasi import _blok_similarity, _Indeks, _top_k_argmax, evaluasi
+from cbr.kompilasi import load_casebase
+
+MAKS_ELEMEN_BLOK = 8_000_000
+
+
+# --- KANONISASI & GABUNG DUPLIKAT ---
+# Kasus dari "Simpan Pengetahuan Baru" sering persis sama dengan kasus lama.
+# Gejala tiap kasus dikanonkan (spasi dibuang, dobel dibuang, urut katalog)
+# lalu kasus dengan gejala + solusi sama digabung jadi satu wakil dengan
+# dukungan = jumlah kasus asli. Wakil = kemunculan pertama (urutan = urutan
+# seri di engine tidak berubah). Baris terakhir tidak ikut digabung supaya
+# id kasus berikutnya (dihitung dari baris terakhir) tidak mundur.
+# Dukungan TIDAK disimpan di file kasus (kolomnya tetap id_kasus,
+# gejala_terkait, solusi_final). Setelah `--tulis`, gabung_duplikat cuma
+# melihat wakilnya, jadi tiap wakil kembali berdukungan 1; angka aslinya
+# tinggal di laporan <kasus>.kompaksi.csv dan kasus aslinya di file cadangan.
+def kanonik(gejala_list, gejala_pos):
+    unik = {g.strip() for g in gejala_list if g.strip()}
+    return sorted(unik, key=lambda g: (g not in gejala_pos, gejala_pos.get(g, 0), g))
+
+
+def gabung_duplikat(cb):
+    # Hasil: (DataFrame wakil, index wakil untuk tiap kasus asli)
+    snap = cb.snapshot()
+    grup = []
+    posisi = {}
+    wakil = np.empty(snap.n, dtype=np.int64)
+    for i in range(snap.n):
+        kunci = (tuple(kanonik(snap.gejala_kasus[i], snap.gejala_pos)), snap.solusi_id[i])
+        if kunci in posisi and i < snap.n - 1:
+            wakil[i] = posisi[kunci]
+        else:
+            wakil[i] = len(grup)
+            posisi.setdefault(kunci, wakil[i])
+            grup.append((kunci, []))
+        grup[wakil[i]][1].append(i)
+
+    # Gejala sama tapi solusi beda: ditandai, tidak digabung
+    solusi_per_gejala = {}
+    for (gejala, solusi), _ in grup:
+        solusi_per_gejala.setdefault(gejala, set()).add(solusi)
+    baris = []
+    for (gejala, solusi), anggota in grup:
+        baris.append({
+            "id_kasus": snap.id_kasus[anggota[0]],
+            "gejala_terkait": ",".join(gejala),
+            "solusi_final": solusi,
+            "dukungan": len(anggota),
+            "id_digabung": " ".join(snap.id_kasus[i] for i in anggota[1:]),
+            "konflik": len(solusi_per_gejala[gejala]) > 1,
+            "status": "simpan",
+        })
+    df = pd.DataFrame(baris, columns=["id_kasus", "gejala_terkait", "solusi_final", "dukungan",
+                                      "id_digabung", "konflik", "status"])
+    return df, wakil
+
+
+def _casebase(cb, df):
+    return CaseBase(pd.DataFrame(cb.baris_gejala, columns=["id_gejala", "nama_gejala", "bobot"]),
+                    pd.DataFrame(cb.baris_solusi, columns=["id_solusi", "nama_solusi"]), df)
+
+
+# --- PEMANGKASAN (CASE-BASE MAINTENANCE) ---
+# ENN (Wilson editing): buang kasus yang kalah suara k tetangga terdekatnya
+# (kasus "noise"). CNN (Hart): simpan cuma kasus yang dibutuhkan supaya 1-NN
+# terhadap kasus yang disimpan tetap benar untuk semua kandidat.
+# Suara tetangga dibobot dukungan; kasus `wajib` tidak pernah dibuang.
+def enn(cb, dukungan, k=3, wajib=None, maks_elemen_blok=MAKS_ELEMEN_BLOK):
+    snap = cb.snapshot()
+    n = snap.n
+    idx = _Indeks(snap)
+    solusi = np.asarray(snap.solusi_id[:n], dtype=object)
+    simpan = np.ones(n, dtype=bool)
+    langkah = max(1, maks_elemen_blok // max(n, 1))
+    for q0 in range(0, n, langkah):
+        q1 = min(q0 + langkah, n)
+        sim = _blok_similarity(snap, idx, q0, q1)
+        # Kasus berdukungan > 1 boleh jadi tetangga dirinya sendiri (kembarannya)
+        diri = np.flatnonzero(dukungan[q0:q1] <= 1)
+        sim[diri, diri + q0] = -np.inf
+        pos, skor = _top_k_argmax(sim, min(k, n))
+        for i in range(q1 - q0):
+            suara = Counter()
+            for p, s in zip(pos[i], skor[i]):
+                if s > 0:
+                    suara[solusi[p]] += dukungan[p] - (p == q0 + i)
+            if suara and max(suara.values()) > suara.get(solusi[q0 + i], 0):
+                simpan[q0 + i] = False
+    if wajib is not None:
+        simpan[wajib] = True
+    return simpan
+
+
+def cnn(cb, kandidat, wajib=None, maks_elemen_blok=MAKS_ELEMEN_BLOK):
+    snap = cb.snapshot()
+    n = snap.n
+    idx = _Indeks(snap)
+    solusi = np.asarray(snap.solusi_id[:n], dtype=object)
+    simpan = np.zeros(n, dtype=bool)
+    if wajib is not None:
+        simpan[wajib] = True
+    if not simpan.any() and kandidat.any():
+        simpan[np.flatnonzero(kandidat)[0]] = True
+    langkah = max(1, maks_elemen_blok // max(n, 1))
+    berubah = True
+    while berubah:
+        berubah = False
+        for q0 in range(0, n, langkah):
+            q1 = min(q0 + langkah, n)
+            sim = _blok_similarity(snap, idx, q0, q1)
+            # Kasus yang ditambah di blok ini ada di kolom q0..q1; skornya
+            # disalin sebelum kolom di luar simpanan di-mask
+            dalam = sim[:, q0:q1].copy()
+            sim[:, ~simpan] = -np.inf
+            terbaik = sim.argmax(axis=1)
+            skor = sim[np.arange(q1 - q0), terbaik]
+            baru = []
+            for i in np.flatnonzero(kandidat[q0:q1] & ~simpan[q0:q1]):
+                pos, s = terbaik[i], skor[i]
+                for j in baru:
+                    if dalam[i, j - q0] > s or (dalam[i, j - q0] == s and j < pos):
+                        pos, s = j, dalam[i, j - q0]
+                if not np.isfinite(s) or solusi[pos] != solusi[q0 + i]:
+                    simpan[q0 + i] = True
+                    baru.append(q0 + i)
+                    berubah = True
+    return simpan
+
+
+# --- JOB KOMPAKSI ---
+# Akurasi LOO dihitung atas semua kasus asli (dibobot dukungan): kasus
+# tetap diuji walau wakilnya dipangkas, jadi angka "akhir" bisa langsung
+# dibandingkan dengan "awal". Gabung duplikat cuma mengubah jawaban kasus
+# konflik (dulu ditentukan urutan baris yang seri), jadi akurasi tanpa
+# kasus konflik harus sama persis. Pemangkasan dibatalkan kalau akurasinya
+# turun lebih dari `toleransi` poin persen dibanding hasil gabung duplikat.
+def _akurasi(hasil, bobot):
+    if hasil is None or bobot.sum() == 0:
+        return None
+    return round(float(np.average(hasil["logs"]["Match"].to_numpy() == "✅", weights=bobot)) * 100, 4)
+
+
+def kompaksi(cb, pangkas=(), k_enn=3, toleransi=0.0):
+    mulai = time.perf_counter()
+    awal = evaluasi(cb)
+    df, wakil = gabung_duplikat(cb)
+    cb_wakil = _casebase(cb, df)
+    dukungan = df["dukungan"].to_numpy()
+    konflik = df["konflik"].to_numpy()
+    dedup = evaluasi(cb_wakil, dukungan=dukungan)
+
+    simpan = np.ones(len(df), dtype=bool)
+    wajib = len(df) - 1 if len(df) else None
+    dipangkas = {}
+    for metode in pangkas:
+        if metode == "enn":
+            hasil = enn(cb_wakil, dukungan, k_enn, wajib) & simpan
+        elif metode == "cnn":
+            hasil = cnn(cb_wakil, simpan, wajib)
+        else:
+            raise ValueError(f"Metode pangkas tidak dikenal: {metode}")
+        dipangkas[metode] = int(simpan.sum() - hasil.sum())
+        df.loc[simpan & ~hasil, "status"] = metode
+        simpan = hasil
+
+    akhir = dedup
+    ditolak = False
+    if not simpan.all():
+        akhir = evaluasi(cb_wakil, dukungan=dukungan, aktif=simpan)
+        if akhir["akurasi"] < dedup["akurasi"] - toleransi:
+            ditolak = True
+            akhir = dedup
+            simpan[:] = True
+            df["status"] = "simpan"
+
+    n_awal = len(cb)
+    n_akhir = int(simpan.sum())
+    laporan = {
+        "kasus_awal": n_awal,
+        "kasus_unik": len(df),
+        "duplikat_digabung": n_awal - len(df),
+        "grup_konflik": int(df.loc[df["konflik"], "gejala_terkait"].nunique()),
+        "kasus_konflik": int(df.loc[df["konflik"], "dukungan"].sum()),
+        "dipangkas": dipangkas,
+        "pangkas_ditolak": ditolak,
+        "kasus_akhir": n_akhir,
+        "berkurang_persen": round(100 * (1 - n_akhir / n_awal), 2) if n_awal else 0.0,
+        "akurasi_loo": {
+            "awal": _akurasi(awal, np.ones(n_awal)),
+            "dedup": _akurasi(dedup, dukungan),
+            "akhir": _akurasi(akhir, dukungan),
+        },
+        "akurasi_loo_tanpa_konflik": {
+            "awal": _akurasi(awal, (~konflik[wakil]).astype(np.float64)),
+            "dedup": _akurasi(dedup, dukungan * ~konflik),
+            "akhir": _akurasi(akhir, dukungan * ~konflik),
+        },
+        "detik": round(time.perf_counter() - mulai, 3),
+    }
+    return df, laporan
+
+
+def main(argv=None):
+    from cbr.batch import DATA_DIR
+    from cbr.domain import temukan_domain
+
+    parser = argparse.ArgumentParser(
+        description="Kompaksi case base: gabung duplikat, tandai konflik, pangkas (CNN/ENN), laporan akurasi LOO")
+    parser.add_argument("--domain", action="append", help="nama domain (default: semua domain)")
+    parser.add_argument("--data-dir", default=DATA_DIR)
+    parser.add_argument("--pangkas", choices=["enn", "cnn", "enn+cnn"], help="pemangkasan setelah gabung duplikat")
+    parser.add_argument("--k-enn", type=int, default=3)
+    parser.add_argument("--toleransi", type=float, default=0.0, help="batas turun akurasi LOO (poin persen)")
+    parser.add_argument("--tulis", action="store_true",
+                        help="tulis hasil ke file kasus (default: cuma laporan). Kasus lama disalin dulu. "
+                             "Kolom dukungan tidak ikut ditulis: kompaksi berikutnya menghitung tiap wakil "
+                             "sebagai satu kasus (dukungan asli cuma ada di <kasus>.kompaksi.csv)")
+    args = parser.parse_args(argv)
+
+    # Aman dijalankan terjadwal (cron) selagi app jalan: kasus yang masuk
+    # selama kompaksi ikut disalin di ujung, proses lain otomatis load ulang
+    daftar = temukan_domain(args.data_dir)
+    pangkas = args.pangkas.split("+") if args.pangkas else ()
+    for nama in args.domain or list(daftar):
+        paths = daftar[nama].paths
+        cb = load_casebase(*paths)
+        df, laporan = kompaksi(cb, pangkas, args.k_enn, args.toleransi)
+        stem = os.path.splitext(paths[2])[0]
+        df.to_csv(f"{stem}.kompaksi.csv", index=False)
+        if args.tulis and laporan["kasus_akhir"] < laporan["kasus_awal"]:
+            cadangan = f"{stem}.sebelum-kompaksi.{datetime.now().strftime('%Y%m%d-%H%M%S')}.csv"
+            pd.DataFrame({"id_kasus": list(cb.id_kasus), "gejala_terkait": [",".join(g) for g in cb.gejala_kasus],
+                          "solusi_final": list(cb.solusi_id)}).to_csv(cadangan, index=False)
+            laporan["kasus_masuk_selama_kompaksi"] = cb.storage.tulis_ulang(df[df["status"] == "simpan"],
+                                                                            cb.offset_kasus)
+            laporan["cadangan"] = cadangan
+            # Kompilasi ulang .cbrbin sekarang, bukan saat request pertama
+            load_casebase(*paths)
+        print(json.dumps({"domain": nama, **laporan}, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,215 @@
+import atexit
+import csv
+import glob
+import gzip
+import io
+import logging
+import os
+import queue
+import shutil
+import threading
+from datetime import datetime
+
+import pandas as pd
+
+from cbr.storage import kunci_file
+
+KOLOM = ["Tanggal", "Studi Kasus", "Gejala", "Hasil", "Akurasi"]
+log = logging.getLogger(__name__)
+
+
+# --- WRITER RIWAYAT (APPEND-ONLY, BACKGROUND THREAD) ---
+# catat() cuma masuk antrian. Thread writer menulis per batch dengan satu
+# write() O_APPEND, jadi baris dari banyak sesi/proses tidak saling timpa.
+# Tulis gagal (folder hilang, disk penuh, gzip rotasi gagal) tidak mematikan
+# thread: batch-nya disimpan dan dicoba lagi tiap interval_flush, galat
+# dicatat ke log dan ke `gagal` / `galat_terakhir`.
+class HistoryWriter:
+    def __init__(self, path, max_bytes=5 * 1024 * 1024, max_antrian=10000, interval_flush=1.0, batch=500):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.interval_flush = interval_flush
+        self.batch = batch
+        self.antrian = queue.Queue(maxsize=max_antrian)
+        self.dibuang = 0
+        self.gagal = 0
+        self.galat_terakhir = None
+        self._tertunda = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        try:
+            with kunci_file(path):
+                _pulihkan_segmen(path)
+        except OSError:
+            pass
+        self._thread = threading.Thread(target=self._jalan, name="history-writer", daemon=True)
+        self._thread.start()
+        atexit.register(self.tutup)
+
+    def catat(self, record):
+        try:
+            # Antrian penuh = disk lambat; tunggu sebentar lalu buang daripada
+            # bikin request diagnosis ikut nge-hang
+            self.antrian.put(record, timeout=0.5)
+        except queue.Full:
+            self.dibuang += 1
+
+    def _jalan(self):
+        while not self._stop.is_set():
+            try:
+                self.flush(timeout=self.interval_flush)
+            except Exception:
+                # Tunggu sebelum coba lagi supaya tidak muter terus selama gagal
+                self._stop.wait(self.interval_flush)
+        try:
+            self.flush()
+        except Exception:
+            pass
+
+    def flush(self, timeout=0):
+        # Batch yang gagal ditulis dicoba lagi duluan; antrian cuma diambil
+        # sampai ukuran batch, sisanya tetap di antrian (tekanan balik ke catat)
+        records = []
+        if len(self._tertunda) < self.batch:
+            try:
+                if not self._tertunda:
+                    records.append(self.antrian.get(timeout=timeout) if timeout else self.antrian.get_nowait())
+                while len(self._tertunda) + len(records) < self.batch:
+                    records.append(self.antrian.get_nowait())
+            except queue.Empty:
+                pass
+        with self._lock:
+            records = self._tertunda + records
+            self._tertunda = []
+            if not records:
+                return
+            try:
+                self._tulis(records)
+            except Exception as e:
+                self._tertunda = records
+                self.gagal += 1
+                self.galat_terakhir = repr(e)
+                log.exception("Gagal menulis %d baris riwayat ke %s (dicoba lagi)", len(records), self.path)
+                raise
+            self.galat_terakhir = None
+
+    def tutup(self):
+        if self._thread.is_alive():
+            self._stop.set()
+            self._thread.join(timeout=5)
+        try:
+            while not self.antrian.empty() or self._tertunda:
+                self.flush()
+        except Exception:
+            pass
+
+    def _tulis(self, records):
+        # flock: rotasi + append tidak balapan dengan writer di proses lain
+        with kunci_file(self.path):
+            self._rotasi_kalau_perlu(records[0]["Tanggal"][:10])
+            buf = io.StringIO()
+            writer = csv.DictWriter(buf, fieldnames=KOLOM, lineterminator="\n")
+            if not os.path.exists(self.path) or os.path.getsize(self.path) == 0:
+                writer.writeheader()
+            writer.writerows(records)
+            fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                os.write(fd, _akhiri_newline(self.path) + buf.getvalue().encode("utf-8"))
+            finally:
+                os.close(fd)
+
+    # --- ROTASI ---
+    # Segmen lama: riwayat_diagnosis.YYYYmmdd-HHMMSS-ffffff.csv.gz (nama urut = urut waktu)
+    def _rotasi_kalau_perlu(self, tanggal):
+        if not os.path.exists(self.path):
+            return
+        st = os.stat(self.path)
+        hari_file = datetime.fromtimestamp(st.st_mtime).strftime("%Y-%m-%d")
+        if st.st_size < self.max_bytes and hari_file == tanggal:
+            return
+        root, ext = os.path.splitext(self.path)
+        segmen = f"{root}.{datetime.now().strftime('%Y%m%d-%H%M%S-%f')}{ext}"
+        try:
+            os.rename(self.path, segmen)
+        except FileNotFoundError:
+            # Sudah dirotasi proses lain
+            return
+        _pulihkan_segmen(self.path)
+
+
+def _kompres_segmen(segmen):
+    # Kompres ke nama sementara lalu os.replace: .gz yang terlihat selalu utuh,
+    # dan sumber baru dihapus setelah .gz-nya ada
+    tmp = segmen + ".gz.tmp"
+    with open(segmen, "rb") as src, gzip.open(tmp, "wb") as dst:
+        shutil.copyfileobj(src, dst)
+    os.replace(tmp, segmen + ".gz")
+    os.remove(segmen)
+
+
+def _pulihkan_segmen(path):
+    # Segmen .csv yang belum jadi .gz (proses mati di tengah rotasi) dikompres
+    # ulang; kalau .gz-nya sudah ada, sumbernya tinggal dihapus. Dipanggil di
+    # bawah flock file riwayat.
+    root, ext = os.path.splitext(path)
+    for segmen in sorted(glob.glob(f"{glob.escape(root)}.[0-9]*{ext}")):
+        if os.path.exists(segmen + ".gz"):
+            os.remove(segmen)
+        else:
+            _kompres_segmen(segmen)
+
+
+def _akhiri_newline(path):
+    # File bawaan repo tidak diakhiri newline
+    if not os.path.exists(path) or os.path.getsize(path) == 0:
+        return b""
+    with open(path, "rb") as f:
+        f.seek(-1, os.SEEK_END)
+        return b"" if f.read(1) == b"\n" else b"\n"
+
+
+# --- BACA RIWAYAT (LAZY + PAGINATION) ---
+def daftar_segmen(path):
+    # Terbaru dulu: file aktif, lalu segmen .gz dari yang paling baru
+    root, ext = os.path.splitext(path)
+    segmen = sorted(glob.glob(f"{glob.escape(root)}.*{ext}.gz"), reverse=True)
+    return ([path] if os.path.exists(path) else []) + segmen
+
+
+def baca_halaman(path, halaman=1, per_halaman=100):
+    # Halaman 1 = baris terbaru. Segmen dibaca satu per satu dari yang paling
+    # baru sampai baris yang dibutuhkan cukup; segmen lama tidak disentuh.
+    butuh = halaman * per_halaman
+    potongan = []
+    terkumpul = 0
+    ada_lagi = False
+    for seg in daftar_segmen(path):
+        if terkumpul >= butuh:
+            ada_lagi = True
+            break
+        try:
+            df = pd.read_csv(seg, compression="infer")
+        except (pd.errors.EmptyDataError, OSError):
+            continue
+        potongan.append(df.iloc[::-1])
+        terkumpul += len(df)
+    if not potongan:
+        return pd.DataFrame(columns=KOLOM), False
+    semua = pd.concat(potongan, ignore_index=True)
+    mulai = (halaman - 1) * per_halaman
+    return semua.iloc[mulai:butuh].reset_index(drop=True), ada_lagi or len(semua) > butuh
+
+
+def hapus_riwayat(path):
+    for seg in daftar_segmen(path):
+        os.remove(seg)
+
+
+def buat_record(kasus_type, gejala_input, hasil_diagnosa, skor):
+    return {
+        "Tanggal": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "Studi Kasus": kasus_type,
+        "Gejala": ", ".join(gejala_input),
+        "Hasil": hasil_diagnosa,
+        "Akurasi": f"{skor:.1f}%"
+    }
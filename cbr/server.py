@@ -0,0 +1,239 @@
+import argparse
+import asyncio
+import contextlib
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse, PlainTextResponse
+from starlette.routing import Route
+
+from cbr.batch import DATA_DIR, diagnosa_batch
+from cbr.cache import QueryCache
+from cbr.domain import RegistryDomain, nama_domain
+from cbr.metrik import METRIK, tambah, ukur
+
+
+class _Galat(Exception):
+    def __init__(self, pesan, status=400):
+        super().__init__(pesan)
+        self.status = status
+
+
+# --- LAYANAN (SATU INDEX PER DOMAIN AKTIF, DIPAKAI SEMUA REQUEST) ---
+# Event loop asyncio cuma terima/validasi request; hitungan jalan di thread
+# pool yang berbagi CaseBase yang sama (numpy lepas GIL). Query identik yang
+# datang bersamaan digabung jadi satu hitungan (coalescing), hasilnya masuk
+# QueryCache. Kalau pakai beberapa proses uvicorn, index dibuka dari file
+# .cbrbin (mmap) jadi page cache-nya tetap dipakai bersama. Domain di-load
+# malas lewat RegistryDomain (batas memori + eviction).
+class Layanan:
+    def __init__(self, data_dir=DATA_DIR, workers=None, cache=None, interval_sync=1.0, maks_batch=10000,
+                 anggaran_mb=1024):
+        self.pool = ThreadPoolExecutor(max_workers=workers or os.cpu_count() or 1, thread_name_prefix="cbr-worker")
+        self.cache = cache or QueryCache()
+        self.registry = RegistryDomain(data_dir, anggaran_mb, saat_buang=self.cache.invalidasi)
+        self.interval_sync = interval_sync
+        self.maks_batch = maks_batch
+        self._cb = {}
+        self._lock_domain = {}
+        self._jalan = {}
+
+    async def _di_pool(self, fungsi, *args):
+        return await asyncio.get_running_loop().run_in_executor(self.pool, fungsi, *args)
+
+    async def casebase(self, domain):
+        if not isinstance(domain, str) or domain not in self.registry.daftar():
+            raise _Galat(f"Domain tidak dikenal: {domain}", 404)
+        # Registry (sync_kasus, cek versi katalog) dicek paling sering sekali
+        # per interval_sync; di antaranya pakai referensi yang sama
+        async with self._lock_domain.setdefault(domain, asyncio.Lock()):
+            cb, waktu = self._cb.get(domain, (None, 0))
+            if cb is None or time.monotonic() - waktu > self.interval_sync:
+                cb = await self._di_pool(self.registry.casebase, domain)
+                self._cb[domain] = (cb, time.monotonic())
+            return cb
+
+    async def diagnosa(self, domain, gejala, k=1):
+        with ukur("load"):
+            cb = await self.casebase(domain)
+        kunci = QueryCache.kunci(gejala, cb, k)
+        with ukur("retrieve"):
+            hasil = self.cache.ambil(kunci)
+            if hasil is None:
+                tugas = self._jalan.get(kunci)
+                if tugas is None:
+                    tugas = self._jalan[kunci] = asyncio.ensure_future(self._di_pool(self.cache.hitung, gejala, cb, k))
+                    tugas.add_done_callback(lambda _: self._jalan.pop(kunci, None))
+                else:
+                    tambah("coalesced")
+                hasil = await asyncio.shield(tugas)
+        tambah("diagnosa")
+        with ukur("lookup"):
+            return _format(hasil, cb)
+
+    async def diagnosa_batch(self, domain, queries, k=1):
+        if len(queries) > self.maks_batch:
+            raise _Galat(f"Maksimal {self.maks_batch} query per batch", 413)
+        cb = await self.casebase(domain)
+        # Satu thread per batch; paralelisme antar request diatur pool layanan
+        return await self._di_pool(lambda: list(diagnosa_batch(queries, cb, k, workers=1)))
+
+    async def tambah_kasus(self, domain, gejala, solusi_id):
+        cb = await self.casebase(domain)
+        tidak_dikenal = [g for g in gejala if g not in cb.gejala_pos]
+        if tidak_dikenal:
+            raise _Galat(f"Gejala tidak dikenal: {', '.join(tidak_dikenal)}")
+        if solusi_id not in cb.solusi:
+            raise _Galat(f"Solusi tidak dikenal: {solusi_id}")
+        prefix = await self._di_pool(self.registry.prefix, domain)
+        new_id = await self._di_pool(cb.append_kasus, prefix, gejala, solusi_id)
+        self.cache.invalidasi(cb)
+        return new_id
+
+    def tutup(self):
+        self.pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _format(hasil, cb):
+    return [{
+        "id_kasus": h["id_kasus"],
+        "solusi_id": h["solusi_id"],
+        "solusi": str(cb.solusi.get(h["solusi_id"], "Solusi tidak ditemukan.")),
+        "similarity": h["similarity"]
+    } for h in hasil]
+
+
+# --- VALIDASI BODY JSON ---
+def _domain(request, body):
+    # Tanpa "domain": domain pertama di registry (urutan manifest)
+    domain = body.get("domain")
+    if domain is not None and not isinstance(domain, str):
+        raise _Galat("'domain' harus string")
+    try:
+        return nama_domain(request.app.state.layanan.registry.daftar(), domain)
+    except KeyError as e:
+        raise _Galat(e.args[0], 404)
+
+
+async def _body(request):
+    try:
+        body = await request.json()
+    except ValueError:
+        raise _Galat("Body harus JSON")
+    if not isinstance(body, dict):
+        raise _Galat("Body harus objek JSON")
+    return body
+
+
+def _daftar_gejala(nilai, nama="gejala"):
+    if not isinstance(nilai, list) or not nilai or not all(isinstance(g, str) for g in nilai):
+        raise _Galat(f"'{nama}' harus list id gejala (string), minimal satu")
+    return nilai
+
+
+def _k(body):
+    k = body.get("k", 1)
+    if not isinstance(k, int) or isinstance(k, bool) or not 1 <= k <= 100:
+        raise _Galat("'k' harus integer 1..100")
+    return k
+
+
+# --- ENDPOINT ---
+async def health(request):
+    return JSONResponse({"status": "ok", "domain": list(request.app.state.layanan.registry.daftar())})
+
+
+async def statistik(request):
+    layanan = request.app.state.layanan
+    return JSONResponse({
+        "cache": layanan.cache.statistik(),
+        "domain": layanan.registry.statistik(),
+        "sedang_dihitung": len(layanan._jalan)
+    })
+
+
+async def metrics(request):
+    # Format Prometheus; isi tahap kosong kalau instrumentasi belum aktif (CBR_METRIK=1)
+    stat = request.app.state.layanan.cache.statistik()
+    teks = METRIK.prometheus() + "# TYPE cbr_cache gauge\n" + "".join(
+        f'cbr_cache{{nama="{nama}"}} {nilai}\n' for nama, nilai in stat.items())
+    return PlainTextResponse(teks, media_type="text/plain; version=0.0.4")
+
+
+async def diagnosa(request):
+    body = await _body(request)
+    domain = _domain(request, body)
+    gejala = _daftar_gejala(body.get("gejala"))
+    hasil = await request.app.state.layanan.diagnosa(domain, gejala, _k(body))
+    return JSONResponse({"domain": domain, "gejala": gejala, "hasil": hasil})
+
+
+async def diagnosa_batch_endpoint(request):
+    # queries: [[id_gejala, ...], ...] atau [{"id": ..., "gejala": [...]}, ...]
+    body = await _body(request)
+    queries = body.get("queries")
+    if not isinstance(queries, list):
+        raise _Galat("'queries' harus list")
+    daftar = []
+    for i, q in enumerate(queries, 1):
+        if isinstance(q, dict):
+            daftar.append((q.get("id", i), _daftar_gejala(q.get("gejala"), f"queries[{i - 1}].gejala")))
+        else:
+            daftar.append((i, _daftar_gejala(q, f"queries[{i - 1}]")))
+    domain = _domain(request, body)
+    hasil = await request.app.state.layanan.diagnosa_batch(domain, daftar, _k(body))
+    return JSONResponse({"domain": domain, "hasil": hasil})
+
+
+async def tambah_kasus(request):
+    body = await _body(request)
+    domain = _domain(request, body)
+    gejala = _daftar_gejala(body.get("gejala"))
+    solusi_id = body.get("solusi_id")
+    if not isinstance(solusi_id, str):
+        raise _Galat("'solusi_id' harus string")
+    new_id = await request.app.state.layanan.tambah_kasus(domain, gejala, solusi_id)
+    return JSONResponse({"domain": domain, "id_kasus": new_id}, status_code=201)
+
+
+async def _tangani_galat(request, exc):
+    return JSONResponse({"error": str(exc)}, status_code=exc.status)
+
+
+def buat_app(data_dir=DATA_DIR, workers=None, cache=None):
+    layanan = Layanan(data_dir, workers, cache)
+
+    @contextlib.asynccontextmanager
+    async def lifespan(app):
+        app.state.layanan = layanan
+        try:
+            yield
+        finally:
+            layanan.tutup()
+
+    return Starlette(routes=[
+        Route("/health", health),
+        Route("/statistik", statistik),
+        Route("/metrics", metrics),
+        Route("/diagnosa", diagnosa, methods=["POST"]),
+        Route("/diagnosa/batch", diagnosa_batch_endpoint, methods=["POST"]),
+        Route("/kasus", tambah_kasus, methods=["POST"]),
+    ], exception_handlers={_Galat: _tangani_galat}, lifespan=lifespan)
+
+
+def main(argv=None):
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Layanan HTTP diagnosis CBR (JSON)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--data-dir", default=DATA_DIR)
+    parser.add_argument("--workers", type=int, default=None, help="jumlah thread hitung (default: jumlah CPU)")
+    args = parser.parse_args(argv)
+    uvicorn.run(buat_app(args.data_dir, args.workers), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,382 @@
+import argparse
+import contextlib
+import csv
+import hashlib
+import io
+import os
+import sqlite3
+import tempfile
+import threading
+import uuid
+
+import pandas as pd
+
+try:
+    import fcntl
+except ImportError:  # Windows: cuma terkunci antar thread dalam satu proses
+    fcntl = None
+
+KOLOM_KASUS = ["id_kasus", "gejala_terkait", "solusi_final"]
+EKOR_HASH = 64 * 1024
+
+_lock_thread = {}
+_lock_thread_guard = threading.Lock()
+
+
+# --- LOCK FILE ANTAR PROSES (flock pada <path>.lock) ---
+@contextlib.contextmanager
+def kunci_file(path):
+    with _lock_thread_guard:
+        lock = _lock_thread.setdefault(os.path.abspath(path), threading.Lock())
+    with lock:
+        if fcntl is None:
+            yield
+            return
+        with open(path + ".lock", "a") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def nomor_id(id_kasus):
+    # K20 -> 20; id tanpa angka -> None
+    try:
+        return int(''.join(filter(str.isdigit, str(id_kasus))))
+    except ValueError:
+        return None
+
+
+def _id_baru(prefix, id_terakhir):
+    return f"{prefix}{(nomor_id(id_terakhir) or 0) + 1:02d}"
+
+
+# --- BACKEND CSV (APPEND-ONLY + FLOCK) ---
+# Posisi = offset byte. Baca tidak perlu lock (baris cuma ditambah di ujung,
+# baris yang belum lengkap ditunda). Tulis: alokasi id + append dalam satu
+# flock, satu write() O_APPEND + fsync, jadi tidak ada id dobel antar proses.
+class CsvStorage:
+    ekor_minimum = 1 << 20
+
+    def __init__(self, path):
+        self.path = path
+        self._inode = None
+
+    def baca_semua(self):
+        with open(self.path, 'rb') as f:
+            self._inode = _inode(os.fstat(f.fileno()))
+            isi = f.read()
+        df = pd.read_csv(io.BytesIO(isi))
+        return df, len(isi)
+
+    def posisi_akhir(self):
+        return os.path.getsize(self.path)
+
+    def baca_sejak(self, posisi):
+        # None kalau file ternyata ditulis ulang/dipotong. Tulis ulang selalu
+        # lewat os.replace (tulis_ulang), jadi cukup dicek dari inode-nya.
+        st = os.stat(self.path)
+        if self._inode is None:
+            self._inode = _inode(st)
+        ukuran = st.st_size
+        if ukuran < posisi or _inode(st) != self._inode:
+            return None
+        if ukuran == posisi:
+            return [], posisi
+        with open(self.path, 'rb') as f:
+            f.seek(posisi)
+            potongan = f.read(ukuran - posisi)
+        # Baris terakhir yang belum lengkap (belum ada newline) ditunda dulu
+        lengkap = potongan[:potongan.rfind(b'\n') + 1]
+        baris = [b for b in csv.reader(io.StringIO(lengkap.decode('utf-8'))) if len(b) >= 3 and b[0] and b[2]]
+        return [(b[0], b[1].split(','), b[2]) for b in baris], posisi + len(lengkap)
+
+    def sidik(self, posisi):
+        # Hash 64 KB sebelum posisi: cukup untuk tahu file ditulis ulang
+        h = hashlib.sha256()
+        with open(self.path, 'rb') as f:
+            mulai = max(0, posisi - EKOR_HASH)
+            f.seek(mulai)
+            h.update(f.read(posisi - mulai))
+        return h.hexdigest()
+
+    def _ekor(self):
+        # (id baris terakhir, perlu newline di depan?) tanpa baca seluruh file
+        ukuran = os.path.getsize(self.path)
+        with open(self.path, 'rb') as f:
+            f.seek(max(0, ukuran - EKOR_HASH))
+            ekor = f.read()
+        baris = [b for b in ekor.decode('utf-8', 'ignore').splitlines() if b.strip()]
+        id_terakhir = next(csv.reader([baris[-1]]))[0] if baris else None
+        if id_terakhir == KOLOM_KASUS[0]:
+            id_terakhir = None
+        return id_terakhir, bool(ekor) and not ekor.endswith(b'\n')
+
+    def tambah_banyak(self, prefix, daftar):
+        # daftar: [(gejala_list, solusi_id), ...] -> list id baru, satu write
+        with kunci_file(self.path):
+            id_terakhir, butuh_newline = self._ekor()
+            buf = io.StringIO()
+            writer = csv.writer(buf, lineterminator='\n')
+            ids = []
+            for gejala_list, solusi_id in daftar:
+                id_terakhir = _id_baru(prefix, id_terakhir)
+                ids.append(id_terakhir)
+                writer.writerow([id_terakhir, ','.join(gejala_list), solusi_id])
+            # File bawaan repo tidak diakhiri newline
+            data = (b'\n' if butuh_newline else b'') + buf.getvalue().encode('utf-8')
+            fd = os.open(self.path, os.O_WRONLY | os.O_APPEND)
+            try:
+                os.write(fd, data)
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+        return ids
+
+    def tambah(self, prefix, gejala_list, solusi_id):
+        return self.tambah_banyak(prefix, [(gejala_list, solusi_id)])[0]
+
+    def tulis_ulang(self, df, posisi):
+        # Ganti isi file dengan df (hasil kompaksi dari data di posisi).
+        # Kasus yang masuk setelah posisi ikut disalin di ujung apa adanya.
+        with kunci_file(self.path):
+            ekor = self.baca_sejak(posisi)
+            if ekor is None:
+                raise RuntimeError(f"{self.path} berubah sejak dibaca, ulangi kompaksi")
+            buf = io.StringIO()
+            writer = csv.writer(buf, lineterminator='\n')
+            writer.writerow(KOLOM_KASUS)
+            writer.writerows(df[KOLOM_KASUS].astype(str).itertuples(index=False))
+            writer.writerows((i, ','.join(g), s) for i, g, s in ekor[0])
+            fd, tmp = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(self.path)), suffix=".tmp")
+            with os.fdopen(fd, 'wb') as f:
+                f.write(buf.getvalue().encode('utf-8'))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, self.path)
+        return len(ekor[0])
+
+    # Lookup tanpa index: scan file (cadangan; SQLite pakai index)
+    def cari_gejala(self, id_gejala):
+        df, _ = self.baca_semua()
+        cocok = df['gejala_terkait'].astype(str).str.split(',').map(lambda g: id_gejala in g)
+        return df.loc[cocok, 'id_kasus'].astype(str).tolist()
+
+    def cari_solusi(self, id_solusi):
+        df, _ = self.baca_semua()
+        return df.loc[df['solusi_final'].astype(str) == id_solusi, 'id_kasus'].astype(str).tolist()
+
+
+def _inode(st):
+    return st.st_dev, st.st_ino
+
+
+# --- BACKEND SQLITE (WAL) ---
+# Posisi = seq (AUTOINCREMENT, tidak pernah dipakai ulang). Penulis banyak
+# proses aman lewat BEGIN IMMEDIATE + busy_timeout; pembaca WAL tidak
+# terblokir penulis. Gejala per kasus juga disimpan di tabel terpisah yang
+# di-index, jadi cari kasus per gejala/solusi tidak scan seluruh tabel.
+SKEMA = """
+CREATE TABLE IF NOT EXISTS kasus (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    id_kasus TEXT NOT NULL,
+    gejala_terkait TEXT NOT NULL,
+    solusi_final TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS kasus_gejala (
+    seq INTEGER NOT NULL REFERENCES kasus(seq),
+    id_gejala TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS meta (kunci TEXT PRIMARY KEY, nilai TEXT NOT NULL);
+CREATE INDEX IF NOT EXISTS idx_kasus_id ON kasus(id_kasus);
+CREATE INDEX IF NOT EXISTS idx_kasus_solusi ON kasus(solusi_final, seq);
+CREATE INDEX IF NOT EXISTS idx_kasus_gejala ON kasus_gejala(id_gejala, seq);
+"""
+
+
+class SqliteStorage:
+    ekor_minimum = 10000
+
+    def __init__(self, path, timeout=30.0):
+        self.path = path
+        self.timeout = timeout
+        self._lokal = threading.local()
+        self._uuid = None
+        with self._koneksi() as db:
+            db.executescript(SKEMA)
+            db.execute("INSERT OR IGNORE INTO meta VALUES ('uuid', ?)", (uuid.uuid4().hex,))
+
+    def _koneksi(self):
+        # Satu koneksi per thread (objek sqlite3 tidak aman dibagi antar thread)
+        db = getattr(self._lokal, "db", None)
+        if db is None:
+            db = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=FULL")
+            self._lokal.db = db
+        return _Transaksi(db)
+
+    def _cek_uuid(self, db):
+        # uuid diganti tiap tulis_ulang; False kalau beda dari yang dibaca dulu
+        nilai = db.execute("SELECT nilai FROM meta WHERE kunci = 'uuid'").fetchone()[0]
+        if self._uuid is None:
+            self._uuid = nilai
+        return nilai == self._uuid
+
+    def baca_semua(self):
+        with self._koneksi() as db:
+            db.execute("BEGIN")
+            self._uuid = None
+            self._cek_uuid(db)
+            posisi = db.execute("SELECT COALESCE(MAX(seq), 0) FROM kasus").fetchone()[0]
+            df = pd.read_sql_query(
+                "SELECT id_kasus, gejala_terkait, solusi_final FROM kasus WHERE seq <= ? ORDER BY seq", db, params=(posisi,))
+        return df, posisi
+
+    def posisi_akhir(self):
+        with self._koneksi() as db:
+            return db.execute("SELECT COALESCE(MAX(seq), 0) FROM kasus").fetchone()[0]
+
+    def baca_sejak(self, posisi):
+        with self._koneksi() as db:
+            db.execute("BEGIN")
+            if not self._cek_uuid(db):
+                return None
+            rows = db.execute(
+                "SELECT seq, id_kasus, gejala_terkait, solusi_final FROM kasus WHERE seq > ? ORDER BY seq",
+                (posisi,)).fetchall()
+            if not rows and db.execute("SELECT COALESCE(MAX(seq), 0) FROM kasus").fetchone()[0] < posisi:
+                return None
+        if not rows:
+            return [], posisi
+        return [(r[1], r[2].split(','), r[3]) for r in rows], rows[-1][0]
+
+    def sidik(self, posisi):
+        # uuid database + isi baris di posisi: beda kalau database diganti
+        with self._koneksi() as db:
+            nilai = db.execute("SELECT nilai FROM meta WHERE kunci = 'uuid'").fetchone()[0]
+            baris = db.execute("SELECT * FROM kasus WHERE seq = ?", (posisi,)).fetchone()
+        return hashlib.sha256(repr((nilai, posisi, baris)).encode('utf-8')).hexdigest()
+
+    def tambah_banyak(self, prefix, daftar):
+        with self._koneksi() as db:
+            # BEGIN IMMEDIATE: kunci tulis diambil di awal, alokasi id atomik
+            db.execute("BEGIN IMMEDIATE")
+            baris = db.execute("SELECT id_kasus FROM kasus ORDER BY seq DESC LIMIT 1").fetchone()
+            id_terakhir = baris[0] if baris else None
+            ids = []
+            for gejala_list, solusi_id in daftar:
+                id_terakhir = _id_baru(prefix, id_terakhir)
+                ids.append(id_terakhir)
+                seq = db.execute("INSERT INTO kasus (id_kasus, gejala_terkait, solusi_final) VALUES (?, ?, ?)",
+                                 (id_terakhir, ','.join(gejala_list), solusi_id)).lastrowid
+                db.executemany("INSERT INTO kasus_gejala VALUES (?, ?)", [(seq, g) for g in set(gejala_list)])
+        return ids
+
+    def tambah(self, prefix, gejala_list, solusi_id):
+        return self.tambah_banyak(prefix, [(gejala_list, solusi_id)])[0]
+
+    def impor(self, df):
+        # Salin baris apa adanya (id lama dipertahankan), satu transaksi
+        with self._koneksi() as db:
+            db.execute("BEGIN IMMEDIATE")
+            self._sisipkan(db, df[KOLOM_KASUS].astype(str).itertuples(index=False))
+
+    def _sisipkan(self, db, baris):
+        for id_kasus, gejala, solusi in baris:
+            seq = db.execute("INSERT INTO kasus (id_kasus, gejala_terkait, solusi_final) VALUES (?, ?, ?)",
+                             (id_kasus, gejala, solusi)).lastrowid
+            db.executemany("INSERT INTO kasus_gejala VALUES (?, ?)", [(seq, g) for g in set(gejala.split(','))])
+
+    def tulis_ulang(self, df, posisi):
+        # Satu transaksi: hapus semua, isi df + kasus setelah posisi, uuid
+        # baru (proses lain yang sedang sync akan load ulang)
+        with self._koneksi() as db:
+            db.execute("BEGIN IMMEDIATE")
+            if not self._cek_uuid(db):
+                raise RuntimeError(f"{self.path} berubah sejak dibaca, ulangi kompaksi")
+            ekor = db.execute("SELECT id_kasus, gejala_terkait, solusi_final FROM kasus WHERE seq > ? ORDER BY seq",
+                              (posisi,)).fetchall()
+            db.execute("DELETE FROM kasus_gejala")
+            db.execute("DELETE FROM kasus")
+            db.execute("UPDATE meta SET nilai = ? WHERE kunci = 'uuid'", (uuid.uuid4().hex,))
+            self._sisipkan(db, df[KOLOM_KASUS].astype(str).itertuples(index=False))
+            self._sisipkan(db, ekor)
+        return len(ekor)
+
+    def cari_gejala(self, id_gejala):
+        with self._koneksi() as db:
+            return [r[0] for r in db.execute(
+                "SELECT k.id_kasus FROM kasus_gejala g JOIN kasus k ON k.seq = g.seq WHERE g.id_gejala = ? ORDER BY g.seq",
+                (id_gejala,))]
+
+    def cari_solusi(self, id_solusi):
+        with self._koneksi() as db:
+            return [r[0] for r in db.execute(
+                "SELECT id_kasus FROM kasus WHERE solusi_final = ? ORDER BY seq", (id_solusi,))]
+
+
+class _Transaksi:
+    # with: commit kalau ada transaksi terbuka, rollback kalau error
+    def __init__(self, db):
+        self.db = db
+
+    def __enter__(self):
+        return self.db
+
+    def __exit__(self, tipe, *exc):
+        if self.db.in_transaction:
+            self.db.execute("ROLLBACK" if tipe else "COMMIT")
+        return False
+
+
+def buka_storage(path):
+    if path.endswith((".db", ".sqlite", ".sqlite3")):
+        return SqliteStorage(path)
+    return CsvStorage(path)
+
+
+# --- MIGRASI CSV -> SQLITE ---
+def migrasi(path_csv, path_db=None):
+    path_db = path_db or os.path.splitext(path_csv)[0] + ".db"
+    if os.path.exists(path_db):
+        raise FileExistsError(f"Sudah ada: {path_db}")
+    df, _ = CsvStorage(path_csv).baca_semua()
+    df = df.dropna(subset=['id_kasus', 'solusi_final'])
+    tmp = path_db + ".tmp"
+    if os.path.exists(tmp):
+        os.remove(tmp)
+    storage = SqliteStorage(tmp)
+    storage.impor(df)
+    storage._lokal.db.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    storage._lokal.db.close()
+    for ekor in ("-wal", "-shm"):
+        if os.path.exists(tmp + ekor):
+            os.remove(tmp + ekor)
+    os.replace(tmp, path_db)
+    return path_db, len(df)
+
+
+def main(argv=None):
+    from cbr.batch import DATA_DIR
+    from cbr.domain import temukan_domain
+
+    parser = argparse.ArgumentParser(description="Migrasi file kasus CSV ke SQLite (WAL)")
+    parser.add_argument("--domain", action="append", help="nama domain (default: semua domain ber-CSV)")
+    parser.add_argument("--data-dir", default=DATA_DIR)
+    args = parser.parse_args(argv)
+    daftar = temukan_domain(args.data_dir)
+    for nama in args.domain or list(daftar):
+        path_kasus = daftar[nama].paths[2]
+        if not path_kasus.endswith(".csv"):
+            print(f"{nama}: sudah pakai {os.path.basename(path_kasus)}")
+            continue
+        path_db, n = migrasi(path_kasus)
+        # Domain otomatis pindah ke .db (lihat Domain di cbr.domain); CSV lama
+        # dibiarkan sebagai arsip
+        print(f"{nama}: {n} kasus -> {path_db}")
+
+
+if __name__ == "__main__":
+    main()
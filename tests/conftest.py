@@ -0,0 +1,24 @@
+import pytest
+
+from cbr.benchmark import buat_data_sintetis
+from tests.referensi import DOMAIN, Data, paths_domain, query_domain, query_sintetis
+
+
+@pytest.fixture(scope="session")
+def data_sintetis(tmp_path_factory):
+    folder = str(tmp_path_factory.mktemp("sintetis"))
+    paths = buat_data_sintetis(folder, n_gejala=40, n_kasus=300, n_solusi=10, seed=5)
+    # Kasus tepi: gejala dobel dalam satu kasus, gejala di luar katalog
+    with open(paths[2], "a", encoding="utf-8") as f:
+        f.write('K9001,"G0001,G0001,G0002",S001\n')
+        f.write('K9002,"G0003,GX99",S002\n')
+        f.write('K9003,GX98,S003\n')
+    return Data(*paths, queries=query_sintetis)
+
+
+# data/*.csv (semua domain) + case base sintetis kecil
+@pytest.fixture(scope="session", params=DOMAIN + ("sintetis",))
+def data(request):
+    if request.param == "sintetis":
+        return request.getfixturevalue("data_sintetis")
+    return Data(*paths_domain(request.param), queries=query_domain)
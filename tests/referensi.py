@@ -0,0 +1,82 @@
+import os
+
+import pandas as pd
+
+from cbr.benchmark import buat_query
+from cbr.casebase import CaseBase
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data")
+DOMAIN = ("laptop", "cabai")
+
+
+def paths_domain(slug, data_dir=DATA_DIR):
+    return tuple(os.path.join(data_dir, f"{nama}_{slug}.csv") for nama in ("gejala", "solusi", "kasus"))
+
+
+# --- REFERENSI: LOOP BARIS-PER-BARIS (VERSI AWAL app.py) ---
+def hitung_similarity_lama(user_gejala, df_kasus, df_gejala):
+    results = []
+    total_bobot_user = 0
+    for u_gejala in user_gejala:
+        bobot_data = df_gejala[df_gejala['id_gejala'] == u_gejala]['bobot'].values
+        if len(bobot_data) > 0: total_bobot_user += int(bobot_data[0])
+
+    for index, row in df_kasus.iterrows():
+        kasus_gejala_list = str(row['gejala_terkait']).split(',')
+        match_bobot = 0
+        total_bobot_kasus = 0
+
+        for k_gejala in kasus_gejala_list:
+            bobot_data = df_gejala[df_gejala['id_gejala'] == k_gejala]['bobot'].values
+            if len(bobot_data) > 0:
+                bobot = int(bobot_data[0])
+                total_bobot_kasus += bobot
+                if k_gejala in user_gejala: match_bobot += bobot
+
+        pembagi = (total_bobot_kasus + total_bobot_user) / 2
+        similarity = (match_bobot / pembagi) * 100 if pembagi > 0 else 0
+
+        results.append({
+            'id_kasus': row['id_kasus'],
+            'similarity': similarity,
+            'solusi_id': row['solusi_final'],
+            'gejala_kasus': kasus_gejala_list
+        })
+    results.sort(key=lambda x: x['similarity'], reverse=True)
+    return results
+
+
+def ringkas(hasil):
+    return [(str(h['id_kasus']), str(h['solusi_id']), float(h['similarity'])) for h in hasil]
+
+
+# --- DATA UJI ---
+# Case base + DataFrame mentahnya; hasil referensi di-memo per query karena
+# loop lama lambat
+class Data:
+    def __init__(self, path_gejala, path_solusi, path_kasus, queries):
+        self.paths = (path_gejala, path_solusi, path_kasus)
+        self.cb = CaseBase.from_csv(path_gejala, path_solusi, path_kasus)
+        self.df_gejala = pd.read_csv(path_gejala)
+        self.df_kasus = pd.read_csv(path_kasus)
+        self.queries = queries(self.cb)
+        self._referensi = {}
+
+    def referensi(self, q):
+        kunci = tuple(q)
+        if kunci not in self._referensi:
+            self._referensi[kunci] = ringkas(hitung_similarity_lama(q, self.df_kasus, self.df_gejala))
+        return self._referensi[kunci]
+
+
+def query_domain(cb):
+    # Gejala tiap kasus, potongannya, semua gejala, plus kasus tepi:
+    # kosong, id tidak dikenal, id dobel
+    ids = list(cb.gejala_ids)
+    queries = [list(g) for g in cb.gejala_kasus] + [list(g[:1]) for g in cb.gejala_kasus]
+    return queries + [ids, [], ["XX"], [ids[0], ids[0]], [ids[1], "XX", ids[2]]]
+
+
+def query_sintetis(cb):
+    ids = list(cb.gejala_ids)
+    return buat_query(cb, 40, 1.1, seed=3) + [[], ["XX"], [ids[0], ids[0], ids[1]]]
@@ -0,0 +1,66 @@
+import os
+
+import pandas as pd
+import pytest
+
+from cbr.analitik import BATAS_RENDAH, MAKS_RENDAH, hapus_analitik, perbarui
+from cbr.riwayat import HistoryWriter, buat_record, daftar_segmen
+
+
+def _record(i):
+    domain = "Laptop" if i % 3 else "Tanaman Cabai"
+    gejala = ["G01 (G01)", f"G{i % 7:02d} (G{i % 7:02d})"]
+    return buat_record(domain, gejala, f"Solusi {i}", float(i * 37 % 101))
+
+
+def _tulis(path, records, max_bytes):
+    # tutup() = semua baris sudah di disk sebelum perbarui
+    writer = HistoryWriter(path, max_bytes=max_bytes)
+    for record in records:
+        writer.catat(record)
+    writer.tutup()
+
+
+def _sama(a, b):
+    for kunci in ("total", "per_hari", "histogram", "kombinasi", "rendah_terbaru"):
+        assert a[kunci] == b[kunci], kunci
+    assert a["per_domain"].keys() == b["per_domain"].keys()
+    for domain, d in a["per_domain"].items():
+        e = b["per_domain"][domain]
+        assert (d["n"], d["n_skor"], d["rendah"]) == (e["n"], e["n_skor"], e["rendah"])
+        # Urutan penjumlahan beda per chunk
+        assert d["jumlah_skor"] == pytest.approx(e["jumlah_skor"])
+
+
+# --- INKREMENTAL vs HITUNG ULANG ---
+def test_inkremental_sama_dengan_hitung_ulang(tmp_path):
+    path = str(tmp_path / "riwayat_diagnosis.csv")
+    n = 0
+    # Update di antara tulisan: kadang di tengah file aktif, kadang tepat
+    # setelah rotasi
+    for langkah in (7, 30, 1, 55, 120, 3, 250):
+        _tulis(path, [_record(i) for i in range(n, n + langkah)], 1500)
+        n += langkah
+        assert perbarui(path)["total"] == n
+    assert len(daftar_segmen(path)) > 3
+
+    inkremental = perbarui(path)
+    hapus_analitik(path)
+    assert not os.path.exists(str(tmp_path / "riwayat_diagnosis.analitik.json"))
+    _sama(inkremental, perbarui(path))
+
+
+def test_rendah_terbaru_seratus_baris_terakhir(tmp_path):
+    path = str(tmp_path / "riwayat_diagnosis.csv")
+    records = [_record(i) for i in range(600)]
+    for awal in range(0, len(records), 97):
+        _tulis(path, records[awal:awal + 97], 4000)
+        perbarui(path)
+
+    df = pd.DataFrame(records)
+    skor = df["Akurasi"].str.rstrip("%").astype(float)
+    rendah = df[skor < BATAS_RENDAH].tail(MAKS_RENDAH)
+    ring = perbarui(path)["rendah_terbaru"]
+    assert len(ring) == MAKS_RENDAH
+    assert [r[3] for r in ring] == rendah["Hasil"].tolist()
+    assert [r[4] for r in ring] == [round(s, 1) for s in skor[rendah.index]]
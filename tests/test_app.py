@@ -0,0 +1,59 @@
+import json
+import os
+import shutil
+
+import pytest
+
+st = pytest.importorskip("streamlit")
+from streamlit.testing.v1 import AppTest
+
+AKAR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+# App dijalankan dari salinan repo (data, gambar, static sendiri), jadi data/
+# di repo tidak tersentuh. cache_resource dikosongkan supaya pemanasan &
+# registry dibuat ulang dari folder salinan.
+@pytest.fixture
+def app_dir(tmp_path):
+    shutil.copy(os.path.join(AKAR, "app.py"), tmp_path)
+    for nama in ("data", "images", "styles", ".streamlit"):
+        if os.path.exists(os.path.join(AKAR, nama)):
+            shutil.copytree(os.path.join(AKAR, nama), tmp_path / nama)
+    st.cache_resource.clear()
+    yield tmp_path
+    st.cache_resource.clear()
+
+
+def _buka_aplikasi(app_dir):
+    at = AppTest.from_file(str(app_dir / "app.py"), default_timeout=60)
+    at.run()
+    at.button[0].click().run()
+    return at
+
+
+def _ubah_manifest(app_dir, ubah):
+    path = app_dir / "data" / "domains.json"
+    with open(path, encoding="utf-8") as f:
+        manifest = json.load(f)
+    ubah(manifest)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f)
+
+
+# --- MANIFEST ---
+def test_kunci_manifest_asing_diabaikan(app_dir):
+    _ubah_manifest(app_dir, lambda m: m["domains"][0].update(bannner="salah_ketik.jpg"))
+    at = _buka_aplikasi(app_dir)
+    assert not at.exception
+    assert any("Database Laptop Aktif" in s.value for s in at.success)
+
+
+def test_manifest_rusak_tampil_data_error(app_dir):
+    with open(app_dir / "data" / "domains.json", "w", encoding="utf-8") as f:
+        f.write("{bukan json")
+    at = _buka_aplikasi(app_dir)
+    assert not at.exception
+    assert any("Data Error" in e.value for e in at.error)
+    # Rerun berikutnya tetap pesan yang sama, bukan traceback
+    at.run()
+    assert not at.exception and any("Data Error" in e.value for e in at.error)
@@ -0,0 +1,28 @@
+import numpy as np
+import pytest
+
+from cbr.batch import diagnosa_batch, skor_chunk
+from tests.referensi import ringkas
+
+
+# --- BATCH vs REFERENSI ---
+@pytest.mark.parametrize("k", [1, 5, 12])
+def test_diagnosa_batch_sama_dengan_referensi(data, k):
+    queries = list(enumerate(data.queries))
+    hasil = list(diagnosa_batch(queries, data.cb, k=k, chunk=7))
+    assert [h["id"] for h in hasil] == [i for i, _ in queries]
+    for (_, q), h in zip(queries, hasil):
+        assert ringkas(h["hasil"]) == data.referensi(q)[:k], q
+
+
+@pytest.mark.parametrize("maks_elemen_blok", [1, 500, 10 ** 9])
+def test_skor_chunk_tidak_tergantung_ukuran_blok(data_sintetis, maks_elemen_blok):
+    # Sub-blok query cuma membatasi buffer; hasilnya harus sama persis
+    snap = data_sintetis.cb.snapshot()
+    skor, row = skor_chunk(data_sintetis.queries, snap, 3, maks_elemen_blok=maks_elemen_blok)
+    acuan_skor, acuan_row = skor_chunk(data_sintetis.queries, snap, 3)
+    assert np.array_equal(skor, acuan_skor) and np.array_equal(row, acuan_row)
+
+
+def test_diagnosa_batch_kosong(data_sintetis):
+    assert list(diagnosa_batch([], data_sintetis.cb, k=3)) == []
@@ -0,0 +1,93 @@
+import shutil
+
+import pytest
+
+from cbr import cache as modul_cache
+from cbr.cache import QueryCache
+from cbr.casebase import CaseBase
+from cbr.engine import retrieve_top_k
+from tests.referensi import paths_domain
+
+
+@pytest.fixture
+def cb(tmp_path):
+    for path in paths_domain("laptop"):
+        shutil.copy(path, tmp_path)
+    return CaseBase.from_csv(*paths_domain("laptop", str(tmp_path)))
+
+
+class Jam:
+    def __init__(self):
+        self.t = 1000.0
+
+    def __call__(self):
+        return self.t
+
+
+# --- KUNCI ---
+def test_kunci_kanonik(cb):
+    cache = QueryCache()
+    a = cache.retrieve_top_k(["G05", "G01", "G05"], cb, 3)
+    b = cache.retrieve_top_k(["G01", "G05"], cb, 3)
+    assert b is a
+    assert (cache.hit, cache.miss) == (1, 1)
+    # Yang diskor query kanon (tanpa gejala dobel), bukan input mentah
+    assert a == retrieve_top_k(["G01", "G05"], cb, 3)
+    # k beda = kunci beda
+    cache.retrieve_top_k(["G01", "G05"], cb, 2)
+    assert cache.miss == 2
+
+
+def test_ttl_dan_lru(cb, monkeypatch):
+    jam = Jam()
+    monkeypatch.setattr(modul_cache.time, "monotonic", jam)
+    cache = QueryCache(maks_entri=2, ttl=10)
+    cache.retrieve_top_k(["G01"], cb)
+    jam.t += 9
+    cache.retrieve_top_k(["G01"], cb)
+    assert cache.hit == 1
+    jam.t += 2
+    cache.retrieve_top_k(["G01"], cb)
+    assert (cache.hit, cache.miss) == (1, 2)
+
+    # G01 paling baru dipakai, jadi G02 yang dibuang saat G03 masuk
+    cache.retrieve_top_k(["G02"], cb)
+    cache.retrieve_top_k(["G01"], cb)
+    cache.retrieve_top_k(["G03"], cb)
+    assert cache.statistik()["entri"] == 2
+    hit = cache.hit
+    cache.retrieve_top_k(["G01"], cb)
+    cache.retrieve_top_k(["G02"], cb)
+    assert cache.hit == hit + 1
+
+
+# --- SIMPAN KASUS BARU ---
+def test_simpan_kasus_baru_tidak_pakai_hasil_lama(cb):
+    # Urutan yang sama dengan simpan_kasus_baru di app.py: append lalu
+    # invalidasi entri case base itu saja
+    lain = CaseBase.from_csv(*paths_domain("cabai"))
+    cache = QueryCache()
+    q = ["G02", "G04", "G09"]
+    lama = cache.retrieve_top_k(q, cb, 1)
+    cache.retrieve_top_k(["G01"], lain, 1)
+    assert lama[0]["similarity"] < 100
+
+    new_id = cb.append_kasus("K", q, "S01")
+    cache.invalidasi(cb)
+    assert cache.statistik()["entri"] == 1
+    baru = cache.retrieve_top_k(q, cb, 1)
+    assert baru[0]["id_kasus"] == new_id and baru[0]["similarity"] == 100.0
+    # Entri case base lain tetap ada
+    hit = cache.hit
+    cache.retrieve_top_k(["G01"], lain, 1)
+    assert cache.hit == hit + 1
+
+
+def test_versi_naik_tanpa_invalidasi(cb):
+    # Append dari proses lain (tanpa invalidasi di proses ini) tetap terlihat
+    # karena jumlah kasus bagian dari kunci
+    cache = QueryCache()
+    q = ["G02", "G04", "G09"]
+    cache.retrieve_top_k(q, cb, 1)
+    cb.tambah_kasus("K99", q, "S01")
+    assert cache.retrieve_top_k(q, cb, 1)[0]["id_kasus"] == "K99"
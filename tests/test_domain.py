@@ -0,0 +1,87 @@
+import json
+import shutil
+
+import numpy as np
+import pytest
+
+from cbr.casebase import CaseBase
+from cbr.domain import RegistryDomain, perkiraan_memori, temukan_domain
+from cbr.kompilasi import load_casebase
+from tests.referensi import DOMAIN, paths_domain
+
+
+@pytest.fixture
+def data_dir(tmp_path):
+    for slug in DOMAIN:
+        for path in paths_domain(slug):
+            shutil.copy(path, tmp_path)
+    return tmp_path
+
+
+def _manifest(data_dir, **opsi_laptop):
+    with open(data_dir / "domains.json", "w", encoding="utf-8") as f:
+        json.dump({"domains": [{"nama": "Laptop", "slug": "laptop", **opsi_laptop},
+                               {"nama": "Tanaman Cabai", "slug": "cabai"}]}, f)
+
+
+# --- PERKIRAAN MEMORI ---
+def test_domain_mmap_tidak_dihitung_resident(data_dir):
+    paths = paths_domain("laptop", str(data_dir))
+    cb = load_casebase(*paths)
+    for nama in ("indptr", "indices", "data", "rows", "total_bobot_kasus", "posting_rows", "posting_ptr"):
+        assert isinstance(getattr(cb, nama), np.memmap), nama
+    assert perkiraan_memori(cb) == 0
+    assert perkiraan_memori(CaseBase.from_csv(*paths)) > 0
+
+    # Append pertama menyalin array ke memori: mulai dihitung
+    cb.append_kasus("K", ["G01", "G02"], "S01")
+    assert not isinstance(cb.indptr, np.memmap)
+    assert perkiraan_memori(cb) >= cb.indptr.nbytes + cb.indices.nbytes + 100
+
+
+# --- EVICTION ---
+def test_eviction_anggaran(data_dir):
+    _manifest(data_dir)
+    dibuang = []
+    registry = RegistryDomain(str(data_dir), anggaran_mb=1e-6, saat_buang=dibuang.append)
+    laptop = registry.casebase("Laptop")
+    registry.casebase("Tanaman Cabai")
+    # Dua-duanya mmap (0 byte resident), masih muat anggaran
+    assert set(registry.statistik()) == {"Laptop", "Tanaman Cabai"} and dibuang == []
+
+    laptop.append_kasus("K", ["G01"], "S01")
+    registry._buang("Tanaman Cabai")
+    registry.casebase("Tanaman Cabai")
+    # Laptop sekarang resident dan melebihi anggaran; domain yang baru
+    # dipakai tidak pernah dibuang
+    assert list(registry.statistik()) == ["Tanaman Cabai"]
+    assert dibuang[-1] is laptop
+    # Dipakai lagi -> load ulang, kasus yang sudah di-append tetap ada
+    assert registry.casebase("Laptop") is not laptop
+    assert len(registry.casebase("Laptop")) == len(laptop)
+
+
+def test_eviction_batas_per_domain(data_dir):
+    _manifest(data_dir, maks_mb=1e-6)
+    dibuang = []
+    registry = RegistryDomain(str(data_dir), anggaran_mb=1024, saat_buang=dibuang.append)
+    laptop = registry.casebase("Laptop")
+    registry.casebase("Tanaman Cabai")
+    assert dibuang == []
+    laptop.append_kasus("K", ["G01"], "S01")
+    registry._buang("Tanaman Cabai")
+    registry.casebase("Tanaman Cabai")
+    # Anggaran total masih longgar, tapi Laptop melewati maks_mb-nya sendiri
+    assert list(registry.statistik()) == ["Tanaman Cabai"] and laptop in dibuang
+
+
+# --- MANIFEST ---
+def test_manifest_kunci_asing_dan_entri_rusak(data_dir, caplog):
+    with open(data_dir / "domains.json", "w", encoding="utf-8") as f:
+        json.dump({"domains": [{"nama": "Laptop", "slug": "laptop", "bannner": "x.jpg"},
+                               {"nama": "Tanpa Slug"}, "bukan objek"]}, f)
+    daftar = temukan_domain(str(data_dir))
+    # Entri rusak dilewati; cabai tetap ketemu lewat scan folder
+    assert list(daftar) == ["Laptop", "Cabai"]
+    assert daftar["Laptop"].banner is None
+    assert "bannner" in caplog.text and "Tanpa Slug" in caplog.text
@@ -0,0 +1,9 @@
+from cbr.engine import hitung_similarity
+from tests.referensi import ringkas
+
+
+# --- ENGINE vs REFERENSI ---
+# Skor dan urutan seri harus sama persis dengan loop baris-per-baris
+def test_hitung_similarity_sama_dengan_referensi(data):
+    for q in data.queries:
+        assert ringkas(hitung_similarity(q, data.cb)) == data.referensi(q), q
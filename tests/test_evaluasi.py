@@ -0,0 +1,68 @@
+import numpy as np
+import pytest
+
+from cbr.evaluasi import evaluasi
+
+
+# --- REFERENSI: LOO / K-FOLD DENGAN LOOP BIASA ---
+# Skor seperti loop lama app.py (bobot gejala pertama di katalog, gejala
+# dobel di kasus dihitung per kemunculan), dicari kasus terbaik satu per satu
+def _matriks_brute(cb):
+    bobot = {}
+    for id_gejala, _, b in cb.baris_gejala:
+        bobot.setdefault(id_gejala, b)
+    kasus = [list(g) for g in cb.gejala_kasus]
+    total = [sum(bobot.get(g, 0) for g in gs) for gs in kasus]
+    sim = np.zeros((len(kasus), len(kasus)))
+    for i, query in enumerate(kasus):
+        for j, gs in enumerate(kasus):
+            match = sum(bobot.get(g, 0) for g in gs if g in query)
+            pembagi = (total[j] + total[i]) / 2
+            sim[i, j] = (match / pembagi) * 100 if pembagi > 0 else 0
+    return sim
+
+
+def _evaluasi_brute(cb, mode, k, seed=42, n_fold=5):
+    n = len(cb)
+    fold = np.arange(n) if mode == "loo" else np.random.default_rng(seed).permutation(n) % n_fold
+    sim = _matriks_brute(cb)
+    pred, hit = [], []
+    for i in range(n):
+        calon = [j for j in range(n) if fold[j] != fold[i]]
+        calon.sort(key=lambda j: -sim[i, j])
+        top = [cb.solusi_id[j] for j in calon[:k]]
+        pred.append(top[0] if top else None)
+        hit.append(cb.solusi_id[i] in top)
+    benar = [p == s for p, s in zip(pred, cb.solusi_id)]
+    return pred, 100 * np.mean(benar), 100 * np.mean(hit)
+
+
+@pytest.mark.parametrize("mode", ["loo", "kfold"])
+def test_evaluasi_sama_dengan_loop_biasa(data, mode):
+    pred, akurasi, hit = _evaluasi_brute(data.cb, mode, 3)
+    # Blok kecil supaya pemotongan query per blok ikut teruji
+    hasil = evaluasi(data.cb, mode=mode, k=3, maks_elemen_blok=500)
+    assert hasil["logs"]["Pred"].tolist() == pred
+    assert hasil["akurasi"] == pytest.approx(akurasi, abs=1e-9)
+    assert hasil["top_k_hit"] == pytest.approx(hit, abs=1e-9)
+
+
+def test_evaluasi_dukungan_dan_aktif(data_sintetis):
+    # Dukungan > 1: kembaran masih ada, jadi kasus boleh memakai dirinya
+    # sendiri; kasus nonaktif tidak pernah jadi referensi
+    cb = data_sintetis.cb
+    n = len(cb)
+    dukungan = np.ones(n, dtype=np.int64)
+    dukungan[::3] = 2
+    aktif = np.ones(n, dtype=bool)
+    aktif[1::4] = False
+    hasil = evaluasi(cb, k=1, dukungan=dukungan, aktif=aktif)
+
+    sim = _matriks_brute(cb)
+    sim[:, ~aktif] = -np.inf
+    diri = np.flatnonzero(dukungan <= 1)
+    sim[diri, diri] = -np.inf
+    pred = [cb.solusi_id[int(np.argmax(baris))] if np.isfinite(baris.max()) else None for baris in sim]
+    assert hasil["logs"]["Pred"].tolist() == pred
+    benar = np.array([p == s for p, s in zip(pred, cb.solusi_id)])
+    assert hasil["akurasi"] == pytest.approx(100 * np.average(benar, weights=dukungan), abs=1e-9)
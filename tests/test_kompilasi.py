@@ -0,0 +1,79 @@
+import os
+import shutil
+
+import numpy as np
+import pytest
+
+from cbr.casebase import CaseBase
+from cbr.engine import hitung_similarity
+from cbr.kompilasi import baca_header, load_casebase, path_biner
+from tests.referensi import DOMAIN, paths_domain, ringkas
+
+
+@pytest.fixture(params=DOMAIN)
+def paths(request, tmp_path):
+    for path in paths_domain(request.param):
+        shutil.copy(path, tmp_path)
+    return paths_domain(request.param, str(tmp_path))
+
+
+def _sama(a, b):
+    assert len(a) == len(b)
+    for nama in ("indptr", "indices", "data", "rows", "total_bobot_kasus"):
+        assert np.array_equal(getattr(a, nama), getattr(b, nama)), nama
+    assert list(a.id_kasus) == list(b.id_kasus)
+    assert list(a.solusi_id) == list(b.solusi_id)
+    assert [list(g) for g in a.gejala_kasus] == [list(g) for g in b.gejala_kasus]
+    assert a.max_kelipatan == b.max_kelipatan
+    for q in [list(g) for g in b.gejala_kasus] + [list(b.gejala_ids[:4])]:
+        assert ringkas(hitung_similarity(q, a)) == ringkas(hitung_similarity(q, b)), q
+
+
+# --- .cbrbin vs CSV ---
+def test_load_biner_sama_dengan_csv(paths):
+    cb = load_casebase(*paths)
+    assert os.path.exists(path_biner(paths[2]))
+    assert isinstance(cb.posting_rows, np.memmap)
+    _sama(cb, CaseBase.from_csv(*paths))
+    # Load kedua memakai file biner yang sama (tidak dikompilasi ulang)
+    mtime = os.stat(path_biner(paths[2])).st_mtime_ns
+    _sama(load_casebase(*paths), CaseBase.from_csv(*paths))
+    assert os.stat(path_biner(paths[2])).st_mtime_ns == mtime
+
+
+def test_load_biner_setelah_append(paths):
+    cb = load_casebase(*paths)
+    mtime = os.stat(path_biner(paths[2])).st_mtime_ns
+    ids = list(cb.gejala_ids)
+    # Gejala dobel + gejala di luar katalog ikut disimpan apa adanya
+    baru = [cb.append_kasus("K", [ids[0], ids[1]], cb.solusi_id[0]),
+            cb.append_kasus("K", [ids[2], ids[2], "GX99"], cb.solusi_id[1])]
+    assert [cb.id_kasus[i] for i in range(len(cb) - 2, len(cb))] == baru
+    _sama(cb, CaseBase.from_csv(*paths))
+
+    # Proses lain: biner lama + ekor kasus dibaca dari storage
+    lagi = load_casebase(*paths)
+    assert os.stat(path_biner(paths[2])).st_mtime_ns == mtime
+    assert baca_header(path_biner(paths[2]))["n_kasus"] == len(cb) - 2
+    _sama(lagi, CaseBase.from_csv(*paths))
+
+
+def test_katalog_berubah_kompilasi_ulang(paths):
+    load_casebase(*paths)
+    # File katalog di repo tidak diakhiri newline
+    with open(paths[0], "a", encoding="utf-8") as f:
+        f.write("\nGBARU,Gejala baru,3\n")
+    cb = load_casebase(*paths)
+    assert "GBARU" in cb.gejala_pos
+    _sama(cb, CaseBase.from_csv(*paths))
+
+
+def test_format_lama_kompilasi_ulang(paths):
+    load_casebase(*paths)
+    # File dari format sebelumnya (header masih punya nomor_terakhir)
+    with open(path_biner(paths[2]), "r+b") as f:
+        f.write(b"CBRBIN01")
+    cb = load_casebase(*paths)
+    header = baca_header(path_biner(paths[2]))
+    assert "nomor_terakhir" not in header
+    _sama(cb, CaseBase.from_csv(*paths))
@@ -0,0 +1,63 @@
+import pytest
+
+from cbr.benchmark import buat_data_sintetis, buat_query
+from cbr.casebase import CaseBase
+from cbr.engine import hitung_similarity, retrieve_top_k
+from cbr.lsh import IndeksLSH, ukur_recall
+from tests.referensi import ringkas
+
+
+@pytest.fixture(scope="module")
+def paths(tmp_path_factory):
+    folder = str(tmp_path_factory.mktemp("lsh"))
+    return buat_data_sintetis(folder, n_gejala=200, n_kasus=4000, n_solusi=20, seed=2)
+
+
+@pytest.fixture
+def cb(paths):
+    cb = CaseBase.from_csv(*paths)
+    cb.lsh = IndeksLSH(cb, band=30, baris=3)
+    return cb
+
+
+# --- RECALL vs EKSAK ---
+def test_recall_dan_skor_persis(cb):
+    queries = buat_query(cb, 200, 1.1, seed=3)
+    laporan = ukur_recall(cb, queries, k=5, band=30, baris=3)
+    assert laporan["recall_at_k"] >= 0.95 and laporan["top1_sama"] >= 0.95
+    assert laporan["kandidat_persen"] < 50
+    # Kandidat diskor ulang persis: skor tiap hasil = skor eksak kasus itu
+    for q in queries[:50]:
+        eksak = {h["id_kasus"]: h["similarity"] for h in hitung_similarity(q, cb)}
+        for h in retrieve_top_k(q, cb, 5):
+            assert h["similarity"] == eksak[h["id_kasus"]], q
+
+
+def test_jatuh_ke_eksak(cb):
+    q = list(cb.gejala_ids[:2])
+    # Kandidat berskor > 0 kurang dari k, dan query tanpa gejala dikenal
+    for query, k in ((q, len(cb)), (["XX"], 3), ([], 3)):
+        n_eksak = cb.lsh.n_eksak
+        assert ringkas(retrieve_top_k(query, cb, k)) == ringkas(retrieve_top_k(query, cb, k, eksak=True))
+        assert cb.lsh.n_eksak == n_eksak + 1
+
+
+# --- EKOR & BANGUN ULANG ---
+def test_ekor_diskor_persis_lalu_bangun_ulang(cb):
+    n_awal = len(cb)
+    queries = buat_query(cb, 50, 1.1, seed=4)
+    # Ekor kecil: index tidak dibangun ulang, kasus baru tetap ketemu
+    for i, q in enumerate(queries):
+        cb.tambah_kasus(f"T{i}", q, "S001")
+    for q in queries:
+        assert retrieve_top_k(q, cb, 1)[0]["similarity"] == 100.0
+    assert cb.lsh.n == n_awal and cb.lsh.n_bangun == 0
+
+    # Ekor melewati batas: query memicu bangun ulang di background
+    for i in range(1100):
+        cb.tambah_kasus(f"U{i}", queries[i % len(queries)], "S002")
+    retrieve_top_k(queries[0], cb, 3)
+    assert cb.lsh.tunggu(timeout=60)
+    assert cb.lsh.n == len(cb) and cb.lsh.n_bangun == 1
+    for q in queries:
+        assert retrieve_top_k(q, cb, 3)[0]["similarity"] == 100.0
@@ -0,0 +1,27 @@
+from cbr.casebase import CaseBase
+from cbr.engine import hitung_similarity
+from cbr.paralel import PoolShard
+from tests.referensi import paths_domain, ringkas
+
+
+# --- POOL SHARD vs REFERENSI ---
+def test_pool_shard_sama_dengan_referensi(data_sintetis):
+    queries = data_sintetis.queries[:15]
+    with PoolShard(data_sintetis.cb, shard=2) as pool:
+        assert pool.shard == 2
+        for q in queries:
+            assert ringkas(pool.retrieve_top_k(q, 3)) == data_sintetis.referensi(q)[:3], q
+        hasil = list(pool.diagnosa_batch(list(enumerate(queries)), k=3, chunk=4))
+        for q, h in zip(queries, hasil):
+            assert ringkas(h["hasil"]) == data_sintetis.referensi(q)[:3], q
+
+
+def test_pool_shard_ikut_skor_kasus_baru():
+    # Kasus yang ditambahkan setelah pool dibuat diskor di proses induk
+    cb = CaseBase.from_csv(*paths_domain("laptop"))
+    with PoolShard(cb, shard=2) as pool:
+        q = list(cb.gejala_ids[:3])
+        cb.tambah_kasus("K999", q, cb.solusi_id[0])
+        hasil = pool.retrieve_top_k(q, 2)
+        assert hasil[0]["id_kasus"] == "K999" and hasil[0]["similarity"] == 100.0
+        assert ringkas(hasil) == ringkas(hitung_similarity(q, cb)[:2])
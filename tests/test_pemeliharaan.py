@@ -0,0 +1,34 @@
+import json
+import shutil
+
+import pandas as pd
+
+from cbr.kompilasi import load_casebase
+from cbr.pemeliharaan import gabung_duplikat, main
+from cbr.storage import buka_storage
+from tests.referensi import paths_domain
+
+
+# --- --tulis ---
+def test_tulis_tidak_menyimpan_dukungan(tmp_path, capsys):
+    for path in paths_domain("laptop"):
+        shutil.copy(path, tmp_path)
+    paths = paths_domain("laptop", str(tmp_path))
+    cb = load_casebase(*paths)
+    gejala, solusi = list(cb.gejala_kasus[0]), cb.solusi_id[0]
+    storage = buka_storage(paths[2])
+    for _ in range(2):
+        storage.tambah("K", gejala[::-1], solusi)
+    storage.tambah("K", ["G01"], solusi)
+
+    main(["--data-dir", str(tmp_path), "--tulis"])
+    laporan = json.loads(capsys.readouterr().out)
+    assert laporan["kasus_akhir"] == laporan["kasus_awal"] - 2
+
+    # Dukungan asli cuma ada di laporan kompaksi
+    df = pd.read_csv(tmp_path / "kasus_laptop.kompaksi.csv")
+    assert df["dukungan"].iloc[0] == 3
+    # File kasus cuma berisi wakil: kompaksi berikutnya mulai dari dukungan 1
+    lagi, _ = gabung_duplikat(load_casebase(*paths))
+    assert len(lagi) == laporan["kasus_akhir"]
+    assert (lagi["dukungan"] == 1).all()
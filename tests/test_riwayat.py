@@ -0,0 +1,67 @@
+import gzip
+import os
+
+import pandas as pd
+
+from cbr.riwayat import HistoryWriter, baca_halaman, buat_record, daftar_segmen
+
+
+def _record(i):
+    return buat_record("Laptop", [f"G{i:02d}", "G02"], f"Solusi {i}", float(i % 100))
+
+
+def _semua_baris(path):
+    # Urut lama -> baru, gabungan semua segmen + file aktif
+    return pd.concat([pd.read_csv(seg, compression="infer") for seg in reversed(daftar_segmen(path))],
+                     ignore_index=True)
+
+
+# --- ROTASI ---
+def test_rotasi_tidak_kehilangan_baris(tmp_path):
+    path = str(tmp_path / "riwayat_diagnosis.csv")
+    writer = HistoryWriter(path, max_bytes=2000, interval_flush=0.05, batch=7)
+    for i in range(300):
+        writer.catat(_record(i))
+    writer.tutup()
+
+    segmen = daftar_segmen(path)
+    assert len(segmen) > 3 and all(s.endswith(".csv.gz") for s in segmen[1:])
+    df = _semua_baris(path)
+    assert df["Hasil"].tolist() == [f"Solusi {i}" for i in range(300)]
+    # Halaman 1 = terbaru, halaman berikutnya menyambung lintas segmen
+    h1, lagi = baca_halaman(path, 1, 50)
+    h2, _ = baca_halaman(path, 2, 50)
+    assert lagi and h1["Hasil"].tolist() + h2["Hasil"].tolist() == [f"Solusi {i}" for i in range(299, 199, -1)]
+
+
+def test_segmen_setengah_jadi_dipulihkan(tmp_path):
+    # Proses mati setelah rename tapi sebelum gzip: segmen .csv polos
+    path = str(tmp_path / "riwayat_diagnosis.csv")
+    polos = str(tmp_path / "riwayat_diagnosis.20260101-000000-000000.csv")
+    pd.DataFrame([_record(1)]).to_csv(polos, index=False)
+    sudah = str(tmp_path / "riwayat_diagnosis.20260102-000000-000000.csv")
+    pd.DataFrame([_record(2)]).to_csv(sudah, index=False)
+    with open(sudah, "rb") as src, gzip.open(sudah + ".gz", "wb") as dst:
+        dst.write(src.read())
+
+    HistoryWriter(path).tutup()
+    assert not os.path.exists(polos) and not os.path.exists(sudah)
+    assert _semua_baris(path)["Hasil"].tolist() == ["Solusi 1", "Solusi 2"]
+
+
+def test_tulis_gagal_dicoba_lagi(tmp_path):
+    # Folder belum ada: thread tetap hidup, batch disimpan lalu ditulis
+    # begitu folder tersedia
+    path = str(tmp_path / "belum_ada" / "riwayat_diagnosis.csv")
+    writer = HistoryWriter(path, interval_flush=0.05)
+    writer.catat(_record(1))
+    try:
+        writer.flush()
+    except OSError:
+        pass
+    assert writer.gagal >= 1 and writer.galat_terakhir
+    os.makedirs(os.path.dirname(path))
+    writer.catat(_record(2))
+    writer.tutup()
+    assert writer.galat_terakhir is None
+    assert pd.read_csv(path)["Hasil"].tolist() == ["Solusi 1", "Solusi 2"]
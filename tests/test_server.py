@@ -0,0 +1,70 @@
+import asyncio
+import json
+import shutil
+from types import SimpleNamespace
+
+import pytest
+
+from cbr.engine import retrieve_top_k
+from cbr.server import Layanan, _Galat, diagnosa, diagnosa_batch_endpoint, tambah_kasus
+from tests.referensi import paths_domain
+
+
+# Cukup untuk endpoint: request.json() + request.app.state.layanan
+class Permintaan:
+    def __init__(self, layanan, body):
+        self.app = SimpleNamespace(state=SimpleNamespace(layanan=layanan))
+        self._body = body
+
+    async def json(self):
+        return self._body
+
+
+def _panggil(endpoint, layanan, body):
+    return json.loads(asyncio.run(endpoint(Permintaan(layanan, body))).body)
+
+
+@pytest.fixture
+def layanan(tmp_path):
+    # Manifest tanpa domain Laptop
+    for path in paths_domain("cabai"):
+        shutil.copy(path, tmp_path)
+    with open(tmp_path / "domains.json", "w", encoding="utf-8") as f:
+        json.dump({"domains": [{"nama": "Tanaman Cabai", "slug": "cabai", "prefix": "KC"}]}, f)
+    layanan = Layanan(str(tmp_path), workers=2)
+    yield layanan
+    layanan.tutup()
+
+
+# --- DOMAIN DEFAULT ---
+def test_tanpa_domain_pakai_domain_pertama(layanan):
+    cb = layanan.registry.casebase("Tanaman Cabai")
+    q = list(cb.gejala_ids[:2])
+    hasil = _panggil(diagnosa, layanan, {"gejala": q, "k": 2})
+    assert hasil["domain"] == "Tanaman Cabai"
+    assert [h["id_kasus"] for h in hasil["hasil"]] == [h["id_kasus"] for h in retrieve_top_k(q, cb, 2)]
+
+    batch = _panggil(diagnosa_batch_endpoint, layanan, {"queries": [q[:1], q[1:]]})
+    assert batch["domain"] == "Tanaman Cabai" and len(batch["hasil"]) == 2
+
+    baru = _panggil(tambah_kasus, layanan, {"gejala": q, "solusi_id": cb.solusi_id[0]})
+    assert baru["domain"] == "Tanaman Cabai" and baru["id_kasus"].startswith("KC")
+
+
+def test_domain_salah(layanan):
+    with pytest.raises(_Galat) as e:
+        _panggil(diagnosa, layanan, {"domain": "Laptop", "gejala": ["GC01"]})
+    assert e.value.status == 404
+    with pytest.raises(_Galat) as e:
+        _panggil(diagnosa, layanan, {"domain": ["Laptop"], "gejala": ["GC01"]})
+    assert e.value.status == 400
+
+
+def test_folder_tanpa_domain(tmp_path):
+    layanan = Layanan(str(tmp_path), workers=1)
+    try:
+        with pytest.raises(_Galat) as e:
+            _panggil(diagnosa, layanan, {"gejala": ["GC01"]})
+        assert e.value.status == 404
+    finally:
+        layanan.tutup()
@@ -0,0 +1,42 @@
+import multiprocessing as mp
+import shutil
+
+import numpy as np
+import pytest
+
+from cbr.storage import buka_storage, migrasi
+from tests.referensi import paths_domain
+
+
+# --- APPEND KONKUREN ---
+def _penulis(path, n, keluar):
+    storage = buka_storage(path)
+    keluar.put([storage.tambah("K", ["G01", "G02"], "S01") for _ in range(n)])
+
+
+@pytest.mark.parametrize("jenis", ["csv", "sqlite"])
+def test_append_konkuren(tmp_path, jenis):
+    path = str(tmp_path / "kasus_laptop.csv")
+    shutil.copy(paths_domain("laptop")[2], path)
+    if jenis == "sqlite":
+        path, _ = migrasi(path)
+    awal, _ = buka_storage(path).baca_semua()
+
+    proses, n = 6, 15
+    ctx = mp.get_context("spawn")
+    keluar = ctx.Queue()
+    semua = [ctx.Process(target=_penulis, args=(path, n, keluar)) for _ in range(proses)]
+    for p in semua:
+        p.start()
+    ids = [i for _ in semua for i in keluar.get(timeout=60)]
+    for p in semua:
+        p.join()
+        assert p.exitcode == 0
+
+    df, _ = buka_storage(path).baca_semua()
+    # Tiap append dapat id unik dan tidak ada baris yang hilang / tertimpa
+    assert len(ids) == len(set(ids)) == proses * n
+    assert len(df) == len(awal) + proses * n
+    assert df.id_kasus.astype(str).is_unique
+    assert set(ids) <= set(df.id_kasus.astype(str))
+    assert np.all(df.id_kasus.astype(str).values[:len(awal)] == awal.id_kasus.astype(str).values)
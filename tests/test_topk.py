@@ -0,0 +1,31 @@
+import pytest
+
+from cbr.casebase import CaseBase
+from cbr.engine import hitung_similarity, retrieve_top_k
+from tests.referensi import paths_domain, ringkas
+
+
+# --- TOP-K vs REFERENSI ---
+@pytest.mark.parametrize("k", [1, 3, 10])
+def test_retrieve_top_k_sama_dengan_referensi(data, k):
+    for q in data.queries:
+        assert ringkas(retrieve_top_k(q, data.cb, k)) == data.referensi(q)[:k], q
+
+
+def test_retrieve_top_k_batas(data_sintetis):
+    cb = data_sintetis.cb
+    q = data_sintetis.queries[0]
+    assert retrieve_top_k(q, cb, 0) == []
+    assert ringkas(retrieve_top_k(q, cb, len(cb) + 5)) == data_sintetis.referensi(q)
+
+
+def test_retrieve_top_k_setelah_tambah_kasus():
+    # Kasus baru masuk posting_baru dulu lalu digabung saat rebuild; dua
+    # jalur itu harus memberi hasil yang sama dengan skor penuh
+    cb = CaseBase.from_csv(*paths_domain("laptop"))
+    ids = list(cb.gejala_ids)
+    for i in range(1500):
+        cb.tambah_kasus(f"T{i}", [ids[i % len(ids)], ids[(i * 7) % len(ids)]], cb.solusi_id[i % 5])
+        if i in (0, 10, 1499):
+            for q in ([ids[0]], ids[:3], [ids[i % len(ids)], ids[(i * 7) % len(ids)]]):
+                assert ringkas(retrieve_top_k(q, cb, 5)) == ringkas(hitung_similarity(q, cb)[:5]), (i, q)